@@ -0,0 +1,476 @@
+import sys
+import time
+import numpy as np
+import pandas as pd
+from inputs import ModelInputs
+
+DRIVETRAINS = ['BEV', 'Diesel', 'LNG']
+DRIVETRAIN_FUELS = {'BEV': ['Electricity'], 'Diesel': ['B20', 'HVO'], 'LNG': ['LNG', 'BioLNG']}
+FUELS = {
+    # fuel: (cost $/unit, emissions CO2/unit, uncertainty %)
+    'Electricity': (0.28, 0.0, 10),
+    'B20': (1.25, 2.7, 5),
+    'HVO': (1.65, 0.7, 8),
+    'LNG': (1.05, 2.5, 5),
+    'BioLNG': (1.40, 0.6, 8),
+}
+DISTANCES = ['D1', 'D2', 'D3', 'D4']
+
+# synthetic dataset with the same schema as the challenge files; n_sizes scales every table linearly
+def make_dataset(n_years=16, n_sizes=4, start_year=2023, seed=0):
+    rng = np.random.default_rng(seed)
+    years = np.arange(start_year, start_year + n_years)
+    sizes = [f'S{i + 1}' for i in range(n_sizes)]
+
+    t, s, y = np.meshgrid(np.arange(len(DRIVETRAINS)), np.arange(n_sizes), years, indexing='ij')
+    t, s, y = t.ravel(), s.ravel(), y.ravel()
+    drivetrain = np.array(DRIVETRAINS)[t]
+    size_factor = 1 + 0.35 * (s % 4)
+    age = y - start_year
+    base_cost = np.array([190000, 90000, 110000])[t] * size_factor * (1 - np.where(t == 0, 0.03, 0.005)) ** age
+    bev_bucket = np.minimum(age // max(n_years // 4, 1), 3)
+    df_vehicles = pd.DataFrame({
+        'ID': [f'{a}_{b}_{c}' for a, b, c in zip(drivetrain, np.array(sizes)[s], y)],
+        'Vehicle': drivetrain,
+        'Size': np.array(sizes)[s],
+        'Year': y,
+        'Cost ($)': np.round(base_cost * rng.uniform(0.95, 1.05, len(t))).astype(int),
+        'Yearly range (km)': np.where(t == 0, 102000, 106000) + 1000 * (s % 4),
+        'Distance': np.array(DISTANCES)[np.where(t == 0, bev_bucket, 3)],
+    })
+
+    rows = []
+    for dt, fuels in DRIVETRAIN_FUELS.items():
+        ids = df_vehicles.loc[df_vehicles['Vehicle'] == dt, 'ID']
+        for f in fuels:
+            rows.append(pd.DataFrame({
+                'ID': ids.to_numpy(),
+                'Fuel': f,
+                'Consumption (unit_fuel/km)': np.round((1.0 if dt == 'BEV' else 0.3) * rng.uniform(0.9, 1.1, len(ids)), 3),
+            }))
+    df_vehicles_fuels = pd.concat(rows, ignore_index=True)
+
+    f, yf = np.meshgrid(np.arange(len(FUELS)), years, indexing='ij')
+    f, yf = f.ravel(), yf.ravel()
+    params = np.array(list(FUELS.values()))
+    df_fuels = pd.DataFrame({
+        'Fuel': np.array(list(FUELS.keys()))[f],
+        'Year': yf,
+        'Emissions (CO2/unit_fuel)': params[f, 1] * 0.99 ** (yf - start_year),
+        'Cost ($/unit_fuel)': np.round(params[f, 0] * 1.01 ** (yf - start_year), 3),
+        'Cost Uncertainty (±%)': params[f, 2],
+    })
+
+    yd, sd, dd = np.meshgrid(years, np.arange(n_sizes), np.arange(len(DISTANCES)), indexing='ij')
+    yd, sd, dd = yd.ravel(), sd.ravel(), dd.ravel()
+    demand_km = np.round(rng.uniform(3e5, 1.2e6, len(yd)) * 1.02 ** (yd - start_year))
+    df_demand = pd.DataFrame({'Year': yd, 'Size': np.array(sizes)[sd], 'Distance': np.array(DISTANCES)[dd], 'Demand (km)': demand_km})
+
+    # limit declines from 90% to 30% of an all-diesel fleet
+    diesel = pd.Series(demand_km * 0.3 * FUELS['B20'][1]).groupby(yd).sum()
+    df_carbon_emissions = pd.DataFrame({
+        'Year': years,
+        'Carbon emission CO2/kg': np.round(diesel.to_numpy() * np.linspace(0.9, 0.3, n_years)),
+    })
+
+    end_of_year = np.arange(1, 11)
+    df_cost_profiles = pd.DataFrame({
+        'End of Year': end_of_year,
+        'Resale Value %': 90 - 6 * (end_of_year - 1),
+        'Insurance Cost %': 5 + 1 * (end_of_year - 1),
+        'Maintenance Cost %': 1 + 2 * (end_of_year - 1),
+    })
+
+    return {
+        'demand': df_demand,
+        'vehicles': df_vehicles,
+        'fuels': df_fuels,
+        'vehicles_fuels': df_vehicles_fuels,
+        'carbon_emissions': df_carbon_emissions,
+        'cost_profiles': df_cost_profiles,
+    }
+
+def model_args(data):
+    return data['demand'], data['vehicles'], data['fuels'], data['vehicles_fuels'], data['carbon_emissions'], data['cost_profiles'], data.get('start')
+
+def timeit(fn, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+def bench_inputs(scales=(1, 2, 4, 8, 16, 32, 64)):
+    print(f"{'scale':>6} {'rows':>10} {'secs':>10} {'us/row':>10}")
+    for k in scales:
+        data = make_dataset(n_sizes=4 * k)
+        rows = sum(len(df) for df in data.values())
+        secs = timeit(lambda: ModelInputs(*model_args(data)).processInputs())
+        print(f'{k:>6} {rows:>10} {secs:>10.4f} {1e6 * secs / rows:>10.2f}')
+
+def build_model(data, **options):
+    from opti_model import OptiModel
+    m = OptiModel(*model_args(data), **options)
+    m.model.setParam('OutputFlag', 0)
+    m.create()
+    m.model.update()
+    return m
+
+def canonical_model(model):
+    # constraint matrix, rows and columns keyed by name
+    A = model.getA().tocoo()
+    vs, cs = model.getVars(), model.getConstrs()
+    vn, cn = model.getAttr('VarName', vs), model.getAttr('ConstrName', cs)
+    entries = {}
+    for r, c, a in zip(A.row, A.col, A.data):
+        if a != 0:
+            entries[cn[r], vn[c]] = entries.get((cn[r], vn[c]), 0) + a
+    rows = dict(zip(cn, zip(model.getAttr('Sense', cs), model.getAttr('RHS', cs))))
+    cols = dict(zip(vn, zip(model.getAttr('Obj', vs), model.getAttr('LB', vs), model.getAttr('UB', vs), model.getAttr('VType', vs))))
+    return entries, rows, cols, model.ObjCon
+
+def same_model(a, b, rtol=1e-12):
+    ea, ra, ca, oa = canonical_model(a)
+    eb, rb, cb, ob = canonical_model(b)
+    if set(ra) != set(rb) or set(ca) != set(cb) or not np.isclose(oa, ob, rtol=rtol):
+        return False
+    if any(not np.isclose(ea.get(k, 0), eb.get(k, 0), rtol=rtol, atol=0) for k in set(ea) | set(eb)):
+        return False
+    if any(ra[k][0] != rb[k][0] or not np.isclose(ra[k][1], rb[k][1], rtol=rtol) for k in ra):
+        return False
+    return all(ca[k][3] == cb[k][3] and np.allclose(ca[k][:3], cb[k][:3], rtol=rtol) for k in ca)
+
+def relaxed_objective(model):
+    r = model.relax()
+    r.setParam('OutputFlag', 0)
+    r.optimize()
+    return r.ObjVal
+
+def bench_build(scales=(1, 2, 4, 8)):
+    # same formulation from both builders, checked row by row on a small instance
+    data = make_dataset(n_years=3, n_sizes=1)
+    for sparse in (False, True):
+        a = build_model(data, sparse=sparse)
+        b = build_model(data, sparse=sparse, builder='matrix')
+        print(f'sparse={sparse}: identical={same_model(a.model, b.model)} relaxed obj {relaxed_objective(a.model):.2f} / {relaxed_objective(b.model):.2f}')
+
+    print(f"{'scale':>6} {'sparse':>7} {'vars':>9} {'expr':>9} {'matrix':>9} {'no names':>9} {'speedup':>8}")
+    for k in scales:
+        data = make_dataset(n_sizes=4 * k)
+        for sparse in (False, True):
+            if not sparse and k > 2:
+                continue # the dense expression build takes minutes here
+            secs = {}
+            for name, options in [('expr', {}), ('matrix', {'builder': 'matrix'}), ('no names', {'builder': 'matrix', 'names': False})]:
+                t0 = time.perf_counter()
+                m = build_model(data, sparse=sparse, **options)
+                secs[name] = time.perf_counter() - t0
+            print(f"{k:>6} {str(sparse):>7} {m.model.NumVars:>9} {secs['expr']:>9.2f} {secs['matrix']:>9.2f} {secs['no names']:>9.2f} {secs['expr'] / secs['no names']:>7.1f}x")
+            m.model.dispose()
+
+def bench_fleet(horizons=(16, 22, 28)):
+    # cumulative sell sums vs explicit fleet inventory variables
+    print(f"{'years':>6} {'dense':>6} {'fleet':>11} {'vars':>9} {'nonzeros':>10} {'secs':>7}")
+    for n_years in horizons:
+        data = make_dataset(n_years=n_years)
+        for sparse in (False, True):
+            for fleet_state in (False, True):
+                t0 = time.perf_counter()
+                m = build_model(data, sparse=sparse, fleet_state=fleet_state, builder='matrix', names=False)
+                secs = time.perf_counter() - t0
+                print(f"{n_years:>6} {str(not sparse):>6} {'state' if fleet_state else 'cumulative':>11} {m.model.NumVars:>9} {m.model.NumNZs:>10} {secs:>7.2f}")
+                m.model.dispose()
+
+def bench_use_mode(targets=(0.05, 0.02, 0.01), time_limit=120, n_years=3, n_sizes=1):
+    # wall time to reach a target gap, integer use per Use row vs the aggregate mode with repair
+    data = make_dataset(n_years=n_years, n_sizes=n_sizes)
+    print(f"{'mode':>10} {'target':>7} {'ints':>6} {'secs':>8} {'objective':>14} {'bound':>14} {'gap':>7}")
+    for use_mode in ('ceiling', 'aggregate'):
+        for target in targets:
+            m = build_model(data, sparse=True, use_mode=use_mode)
+            ints = m.model.NumIntVars
+            m.setParams(time_limit)
+            m.model.setParam('OutputFlag', 0)
+            m.model.setParam('MIPGap', target)
+            t0 = time.perf_counter()
+            _, bound, _, _ = m.solve()
+            secs = time.perf_counter() - t0
+            print(f'{use_mode:>10} {target:>7.2%} {ints:>6} {secs:>8.2f} {m.model.ObjVal:>14.2f} {bound:>14.2f} {m.optGap():>7.2%}')
+            m.model.dispose()
+
+def with_dominated_copies(data, share=0.5, seed=1):
+    # pricier, thirstier copies of a share of the vehicles, which the dominance pruning should remove
+    rng = np.random.default_rng(seed)
+    vh, vf = data['vehicles'], data['vehicles_fuels']
+    copies = vh.sample(frac=share, random_state=seed).copy()
+    new_ids = copies['Vehicle'] + '_' + copies['Size'] + 'b_' + copies['Year'].astype(str)
+    rename = dict(zip(copies['ID'], new_ids))
+    copies['ID'] = new_ids
+    copies['Cost ($)'] = np.round(copies['Cost ($)'] * rng.uniform(1.0, 1.1, len(copies)))
+    fuels = vf[vf['ID'].isin(rename)].copy()
+    fuels['ID'] = fuels['ID'].map(rename)
+    fuels['Consumption (unit_fuel/km)'] *= 1.05
+    return dict(data, vehicles=pd.concat([vh, copies], ignore_index=True), vehicles_fuels=pd.concat([vf, fuels], ignore_index=True))
+
+def bench_prune(n_years=3, n_sizes=1, time_limit=60):
+    data = with_dominated_copies(make_dataset(n_years=n_years, n_sizes=n_sizes))
+    print(f"{'prune':>6} {'pruned':>7} {'vars':>6} {'secs':>8} {'objective':>14}")
+    for prune in (False, True):
+        m = build_model(data, sparse=True, prune=prune)
+        m.setParams(time_limit)
+        m.model.setParam('OutputFlag', 0)
+        t0 = time.perf_counter()
+        m.model.optimize()
+        print(f'{str(prune):>6} {len(m.pruneReport()):>7} {m.model.NumVars:>6} {time.perf_counter() - t0:>8.2f} {m.model.ObjVal:>14.2f}')
+        m.model.dispose()
+
+def random_plan(m, seed=0):
+    # random solution values in place of a solve, so the result methods can be timed on models too large to solve here
+    rng = np.random.default_rng(seed)
+    buy = np.zeros(len(m.arrays.vehicle_ids))
+    buy[m.buy_ix] = rng.integers(0, 4, len(m.buy_ix))
+    sell = np.zeros(m.live.shape)
+    use = rng.integers(0, 3, len(m.use_ix[0])).astype(float) * (rng.random(len(m.use_ix[0])) < 0.2)
+    total_distance = use * m.arrays.range[m.use_ix[1]] * rng.uniform(0.5, 1.0, len(use))
+    m.solutionArrays = lambda: (buy, sell, use, total_distance)
+    m.result_dict = None
+    m.results_df = None
+    m.cube = None
+    m.getResults()
+
+def bench_kpi(scales=(1, 4, 16), repeat=5):
+    # latency per call of the breakdown methods behind the dashboard charts
+    calls = {
+        'cost': lambda m, r: m.cost_breakdown(r),
+        'cost BEV': lambda m, r: m.cost_breakdown(r, 'BEV', 'S1'),
+        'emissions': lambda m, r: m.emissions_breakdown(r),
+        'distance': lambda m, r: m.distance_covered_breakdown(r),
+        'use trend': lambda m, r: m.use_trend(r),
+        'cube build': lambda m, r: m.__setattr__('cube', None) or m.resultCube(),
+        'cost boxes': lambda m, r: m.resultCube().total(r, 'cost', by='Cat'),
+    }
+    print(f"{'scale':>6} {'rows':>8} " + ' '.join(f'{name:>10}' for name in calls) + '  (ms/call)')
+    for k in scales:
+        m = build_model(make_dataset(n_sizes=4 * k), sparse=True, builder='matrix', names=False)
+        random_plan(m)
+        r = (m.years[0], m.years[-1])
+        secs = [timeit(lambda: fn(m, r), repeat) for fn in calls.values()]
+        print(f"{k:>6} {len(m.result_dict['ID']):>8} " + ' '.join(f'{1e3 * t:>10.2f}' for t in secs))
+        m.model.dispose()
+
+def bench_model_cache(scales=(1, 4, 16)):
+    # Create without the cache, with a cache miss (build and save) and with a hit read back from disk,
+    # with and without the parsed inputs still in memory
+    import tempfile
+    from opti_model import OptiModel
+    from model_cache import ModelCache
+    import inputs
+
+    def create(data, cache=None):
+        m = OptiModel(*model_args(data), sparse=True, tighten_bounds=True)
+        m.model.setParam('OutputFlag', 0)
+        t0 = time.perf_counter()
+        m.create(cache=cache)
+        m.model.update()
+        secs = time.perf_counter() - t0
+        m.model.dispose()
+        return secs
+
+    print(f"{'scale':>6} {'build':>10} {'miss':>10} {'hit':>10} {'hit+mem':>10} {'MB':>8}")
+    for k in scales:
+        data = make_dataset(n_sizes=4 * k)
+        cache = ModelCache(tempfile.mkdtemp())
+        inputs.parsed_inputs.clear()
+        build = create(data)
+        inputs.parsed_inputs.clear()
+        miss = create(data, cache)
+        inputs.parsed_inputs.clear()
+        hit = create(data, cache)
+        hit_mem = create(data, cache)
+        print(f"{k:>6} {build:>10.3f} {miss:>10.3f} {hit:>10.3f} {hit_mem:>10.3f} {cache.stats()['bytes'] / 1e6:>8.1f}")
+
+def first_years(data, n_years):
+    # the dataset cut to its first n_years
+    last = data['vehicles']['Year'].min() + n_years - 1
+    return {k: df[df['Year'] <= last] if 'Year' in df.columns else df for k, df in data.items()}
+
+def first_incumbent():
+    # Gurobi callback recording the time and objective of the first incumbent, and the dict it records them in
+    from gurobipy import GRB
+    first = {}
+    def record(model, where):
+        if where == GRB.Callback.MIPSOL and not first:
+            first.update(time=model.cbGet(GRB.Callback.RUNTIME), obj=model.cbGet(GRB.Callback.MIPSOL_OBJ))
+    return record, first
+
+def bench_warm_start(n_years=5, n_sizes=1, time_limit=30):
+    # horizon shifted one year forward: the first year of an earlier plan becomes the start file, a
+    # cold solve of the new horizon vs one warm started from the earlier plan
+    data = make_dataset(n_years=n_years + 1, n_sizes=n_sizes)
+    base = build_model(first_years(data, n_years), sparse=True, tighten_bounds=True)
+    base.setParams(time_limit=time_limit)
+    plan = pd.DataFrame(base.solve()[0])
+    base.model.dispose()
+    first = plan['Year'].min()
+    shifted = {**data, 'start': plan[(plan['Year'] == first) & plan['Type'].isin(['Buy', 'Sell'])]}
+
+    print(f"{'start':>6} {'values':>8} {'first inc (s)':>14} {'first obj':>14} {'objective':>14} {'gap':>8}")
+    for warm in (False, True):
+        m = build_model(shifted, sparse=True, tighten_bounds=True)
+        m.setParams(time_limit=time_limit)
+        values = m.warmStart(plan) if warm else 0
+        record, first_solution = first_incumbent()
+        m.callbacks.append(record)
+        m.solve()
+        print(f"{'warm' if warm else 'cold':>6} {values:>8} {first_solution.get('time', float('nan')):>14.2f} {first_solution.get('obj', float('nan')):>14.1f} {m.objVal():>14.1f} {100 * m.optGap():>7.2f}%")
+        m.model.dispose()
+
+def bench_heuristic(n_years=3, n_sizes=1, time_limit=30):
+    # the greedy plan alone (time, objective, rules broken) and as MIP start: first incumbent and final
+    # objective of a cold solve vs one started from the greedy plan
+    data = make_dataset(n_years=n_years, n_sizes=n_sizes)
+    m = build_model(data, sparse=True, tighten_bounds=True)
+    t0 = time.perf_counter()
+    m.heuristicSolve()
+    elapsed = time.perf_counter() - t0
+    print(f"greedy plan: {elapsed:.3f}s, objective {m.objVal():.1f}, {len(m.outcome['violations'])} rules broken")
+    m.model.dispose()
+
+    print(f"{'start':>6} {'first inc (s)':>14} {'first obj':>14} {'objective':>14} {'gap':>8}")
+    for greedy in (False, True):
+        m = build_model(data, sparse=True, tighten_bounds=True)
+        m.setParams(time_limit=time_limit)
+        if greedy:
+            m.greedyStart()
+        record, first_solution = first_incumbent()
+        m.callbacks.append(record)
+        m.solve()
+        print(f"{'greedy' if greedy else 'cold':>6} {first_solution.get('time', float('nan')):>14.2f} {first_solution.get('obj', float('nan')):>14.1f} {m.objVal():>14.1f} {100 * m.optGap():>7.2f}%")
+        m.model.dispose()
+
+def bench_lns(n_years=3, n_sizes=1, time_limit=30, workers=3):
+    # plain solve vs LNS from the greedy plan, same time limit: final objective and the LNS incumbent history
+    data = make_dataset(n_years=n_years, n_sizes=n_sizes)
+    m = build_model(data)
+    m.setParams(time_limit=time_limit)
+    m.solve()
+    print(f"solve: objective {m.objVal():.1f}, gap {100 * m.optGap():.2f}%, {m.stop_reason}")
+    m.model.dispose()
+
+    m = build_model(data)
+    m.setParams(time_limit=time_limit)
+    m.lnsSolve(workers=workers)
+    print(f"LNS: objective {m.objVal():.1f}, gap {100 * m.optGap():.2f}%, {m.stop_reason}")
+    for seconds, objective, neighborhood in m.outcome['history']:
+        print(f"{seconds:>8.2f}s {objective:>14.1f} {neighborhood}")
+    m.model.dispose()
+
+def bench_decomposition(n_years=2, n_sizes=2, time_limit=60, workers=4):
+    # monolithic solve vs the experimental size class decomposition, same time limit: objective, bound and gap
+    from decomposition import SizeDecomposition
+    from opti_model import OptiModel
+    data = make_dataset(n_years=n_years, n_sizes=n_sizes)
+    print(f"{'solver':>14} {'seconds':>8} {'objective':>14} {'bound':>14} {'gap':>8}")
+    m = build_model(data)
+    m.setParams(time_limit=time_limit)
+    t0 = time.perf_counter()
+    m.solve()
+    print(f"{'monolithic':>14} {time.perf_counter() - t0:>8.1f} {m.objVal():>14.1f} {m.objBound():>14.1f} {100 * m.optGap():>7.2f}%")
+    m.model.dispose()
+
+    m = OptiModel(*model_args(data)) # built per size by the workers only
+    m.model.setParam('OutputFlag', 0)
+    m.model.setParam('TimeLimit', time_limit)
+    t0 = time.perf_counter()
+    search = SizeDecomposition(m, workers)
+    search.run()
+    objective = search.objective if search.objective is not None else float('nan')
+    gap = abs(objective - search.bound) / max(abs(objective), 1e-10)
+    print(f"{'decomposition':>14} {time.perf_counter() - t0:>8.1f} {objective:>14.1f} {search.bound:>14.1f} {100 * gap:>7.2f}%")
+    m.model.dispose()
+
+def bench_rolling(n_years=8, n_sizes=1, time_limit=60, window=4, overlap=1, lookahead=2):
+    # full solve vs rolling horizon, same total time limit: per window results and the cost gap to the full solve
+    from opti_model import OptiModel
+    data = make_dataset(n_years=n_years, n_sizes=n_sizes)
+    m = build_model(data, sparse=True, tighten_bounds=True)
+    m.setParams(time_limit=time_limit)
+    t0 = time.perf_counter()
+    m.solve()
+    full = m.objVal()
+    print(f"full: {time.perf_counter() - t0:.1f}s, objective {full:.1f}, gap {100 * m.optGap():.2f}%, {m.stop_reason}")
+    m.model.dispose()
+
+    m = OptiModel(*model_args(data), sparse=True, tighten_bounds=True)
+    m.model.setParam('OutputFlag', 0)
+    m.model.setParam('TimeLimit', time_limit)
+    t0 = time.perf_counter()
+    m.rollingSolve(window=window, overlap=overlap, lookahead=lookahead)
+    print(f"{'window':>10} {'kept to':>8} {'seconds':>8} {'objective':>14} {'gap':>8}")
+    for first, last, kept, seconds, objective, gap, reason in m.outcome['windows']:
+        print(f"{f'{first}-{last}':>10} {kept:>8} {seconds:>8.1f} {objective:>14.1f} {100 * gap:>7.2f}%")
+    print(f"rolling: {time.perf_counter() - t0:.1f}s, objective {m.objVal():.1f}, {100 * (m.objVal() - full) / abs(full):+.2f}% vs full")
+    m.model.dispose()
+
+def bench_time_buckets(n_years=8, n_sizes=1, time_limit=30, time_buckets=((2, 3), (0, 2))):
+    # yearly model vs time bucketed ones (size, time, objective on their own cost basis), then the yearly
+    # solve cold vs started from the bucketed plan: first incumbent and final objective
+    data = make_dataset(n_years=n_years, n_sizes=n_sizes)
+    print(f"{'buckets':>8} {'years':>6} {'vars':>6} {'rows':>6} {'seconds':>8} {'objective':>14} {'gap':>8}")
+    for tb in (None,) + tuple(time_buckets):
+        m = build_model(data, sparse=True, tighten_bounds=True, time_buckets=tb)
+        m.setParams(time_limit=time_limit)
+        t0 = time.perf_counter()
+        m.solve()
+        print(f"{str(tb):>8} {len(m.years):>6} {m.model.NumVars:>6} {m.model.NumConstrs:>6} {time.perf_counter() - t0:>8.1f} {m.objVal():>14.1f} {100 * m.optGap():>7.2f}%")
+        m.model.dispose()
+
+    print(f"{'start':>8} {'first inc (s)':>14} {'first obj':>14} {'objective':>14} {'gap':>8}")
+    for tb in (None, time_buckets[0]):
+        m = build_model(data, sparse=True, tighten_bounds=True)
+        if tb is not None:
+            m.aggregateStart(tb, time_limit / 3).model.dispose()
+        m.setParams(time_limit=time_limit)
+        record, first_solution = first_incumbent()
+        m.callbacks.append(record)
+        m.solve()
+        print(f"{str(tb) if tb else 'cold':>8} {first_solution.get('time', float('nan')):>14.2f} {first_solution.get('obj', float('nan')):>14.1f} {m.objVal():>14.1f} {100 * m.optGap():>7.2f}%")
+        m.model.dispose()
+
+def bench_scenarios(n_years=3, n_sizes=1, time_limit=20, threads=1, samples=4):
+    # a scenario grid and a sample solved in the process pool: the sweep table and its wall time
+    from result_store import INPUT_KEYS
+    from scenarios import ScenarioSweep, scenario_grid, scenario_samples
+    data = make_dataset(n_years=n_years, n_sizes=n_sizes)
+    inputs = dict(zip(INPUT_KEYS, model_args(data)))
+    sweep = ScenarioSweep(inputs, {'sparse': True, 'tighten_bounds': True}, threads=threads, time_limit=time_limit)
+    scenarios = scenario_grid(carbon_tightening=(0.0,), demand_growth=(0.0, 0.05)) + scenario_samples(samples, list(data['fuels']['Fuel'].unique()))
+    t0 = time.perf_counter()
+    table = sweep.run(scenarios)
+    print(f"{len(scenarios)} scenarios, {sweep.workers} workers x {threads} threads: {time.perf_counter() - t0:.1f}s")
+    with pd.option_context('display.width', 200, 'display.max_columns', 20):
+        print(table.drop(columns=['stop_reason'], errors='ignore').round(3))
+
+BENCHMARKS = {
+    'inputs': bench_inputs,
+    'build': bench_build,
+    'fleet': bench_fleet,
+    'use_mode': bench_use_mode,
+    'prune': bench_prune,
+    'kpi': bench_kpi,
+    'model_cache': bench_model_cache,
+    'warm_start': bench_warm_start,
+    'heuristic': bench_heuristic,
+    'lns': bench_lns,
+    'decomposition': bench_decomposition,
+    'rolling': bench_rolling,
+    'time_buckets': bench_time_buckets,
+    'scenarios': bench_scenarios,
+}
+
+if __name__ == '__main__':
+    names = sys.argv[1:] or list(BENCHMARKS.keys())
+    for name in names:
+        print(f'== {name}')
+        BENCHMARKS[name]()
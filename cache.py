@@ -0,0 +1,121 @@
+import os
+import threading
+import uuid
+from collections import OrderedDict
+
+# Bounded least-recently-used cache with hit/miss counters, safe to share between threads
+class LRUCache:
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self.lock:
+            if key in self.items:
+                self.items.move_to_end(key)
+                self.hits += 1
+                return self.items[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        with self.lock:
+            self.items[key] = value
+            self.items.move_to_end(key)
+            while len(self.items) > self.maxsize:
+                self.items.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+
+    def __contains__(self, key):
+        with self.lock:
+            return key in self.items
+
+    def __len__(self):
+        with self.lock:
+            return len(self.items)
+
+    def stats(self):
+        with self.lock:
+            total = self.hits + self.misses
+            return {'size': len(self.items), 'maxsize': self.maxsize, 'hits': self.hits, 'misses': self.misses, 'hit_rate': self.hits / total if total else 0.0}
+
+# Files named <key><extension> in a directory shared by every process using it. Least recently used keys
+# (by file modification time) are deleted once the directory holds more than max_bytes.
+class DiskCache:
+    EXTENSIONS = ()
+    TMP_PREFIX = 'tmp-' # files being written
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def paths(self, key):
+        return tuple(os.path.join(self.directory, key + ext) for ext in self.EXTENSIONS)
+
+    def tmpPath(self, ext):
+        # write here and os.replace() onto the final path, so other processes never read a partial file
+        return os.path.join(self.directory, f'{self.TMP_PREFIX}{uuid.uuid4().hex}{ext}')
+
+    def exists(self, key):
+        return all(os.path.exists(path) for path in self.paths(key))
+
+    def touch(self, key):
+        for path in self.paths(key):
+            try:
+                os.utime(path)
+            except FileNotFoundError:
+                pass
+
+    def count(self, hit):
+        with self.lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def files(self):
+        # (mtime, size, key) of every cached key, least recently used first
+        entries = {}
+        for name in os.listdir(self.directory):
+            key, ext = os.path.splitext(name)
+            if ext not in self.EXTENSIONS or key.startswith(self.TMP_PREFIX):
+                continue
+            try:
+                st = os.stat(os.path.join(self.directory, name))
+            except FileNotFoundError: # deleted by another process
+                continue
+            mtime, size = entries.get(key, (0, 0))
+            entries[key] = (max(mtime, st.st_mtime), size + st.st_size)
+        return sorted((mtime, size, key) for key, (mtime, size) in entries.items())
+
+    def remove(self, key):
+        for path in self.paths(key):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def evict(self):
+        files = self.files()
+        total = sum(size for _, size, _ in files)
+        for _, size, key in files:
+            if total <= self.max_bytes:
+                break
+            self.remove(key)
+            total -= size
+
+    def stats(self):
+        files = self.files()
+        with self.lock:
+            total = self.hits + self.misses
+            return {'entries': len(files), 'bytes': sum(size for _, size, _ in files), 'max_bytes': self.max_bytes, 'hits': self.hits, 'misses': self.misses, 'hit_rate': self.hits / total if total else 0.0}
@@ -0,0 +1,234 @@
+import logging
+import time
+import numpy as np
+import gurobipy as gp
+from inputs import start_ending
+from model_cache import BUILD_OPTIONS
+from worker_pool import process_pool, worker
+
+logger = logging.getLogger(__name__)
+
+ITERATIONS = 30 # subgradient iterations at most
+SUB_TIME_LIMIT = 10 # seconds per size subproblem solve
+SUB_THREADS = 1 # Gurobi threads per pool worker
+REPAIR_SHARE = 0.25 # of the time limit kept for the repair solves
+STEP_SCALE = 2.0 # initial Polyak step scale, halved after STALL_ITERATIONS without a better bound
+STALL_ITERATIONS = 3
+SELL_SHARE = 0.2
+
+def worker_inputs(inputs, options, threads):
+    # the inputs of a pool worker and the size subproblems it has built, by size
+    return {'inputs': inputs, 'options': options, 'threads': threads, 'subproblems': {}}
+
+def size_inputs(inputs, size):
+    # the input frames of one size class
+    vehicles = inputs['vehicles'][inputs['vehicles']['Size'] == size]
+    ids = vehicles['ID']
+    start = inputs['start']
+    return {
+        **inputs,
+        'demand': inputs['demand'][inputs['demand']['Size'] == size],
+        'vehicles': vehicles,
+        'vehicles_fuels': inputs['vehicles_fuels'][inputs['vehicles_fuels']['ID'].isin(ids)],
+        # every size keeps the horizon of the full model, which the coupling rows are indexed by
+        'start': start_ending(start[start['ID'].isin(ids)], start['Year'].max(), vehicles) if start is not None else None,
+    }
+
+def subproblem(size):
+    # the model of one size class without the emissions and sales rows, which are kept as coefficient rows
+    if size in worker['subproblems']:
+        return worker['subproblems'][size]
+    from opti_model import OptiModel
+    from result_store import INPUT_KEYS
+    inputs = size_inputs(worker['inputs'], size)
+    opti = OptiModel(*[inputs[k] for k in INPUT_KEYS], **{**worker['options'], 'names': True}) # coupling rows found by name
+    opti.model.setParam('OutputFlag', 0)
+    opti.create()
+    opti.setParams(SUB_TIME_LIMIT)
+    opti.model.setParam('Threads', worker['threads'])
+    model = opti.model
+    model.update()
+    xs = model.getVars()
+    Y = len(opti.years)
+    emissions, sales, sales_rhs = np.zeros((Y, len(xs))), np.zeros((Y, len(xs))), np.zeros(Y)
+    coupling = []
+    for yi, yr in enumerate(opti.years):
+        for name, a in ((f'emissions_limit_{yr}', emissions), (f'20pct_sale_{yr}', sales)):
+            c = model.getConstrByName(name)
+            if c is None: # no sales row in the last year
+                continue
+            row = model.getRow(c)
+            for k in range(row.size()):
+                a[yi, row.getVar(k).index] += row.getCoeff(k)
+            if a is sales:
+                sales_rhs[yi] = c.RHS
+            coupling.append(c)
+    model.remove(coupling)
+    sub = {'opti': opti, 'xs': xs, 'cost': np.array(model.getAttr('Obj', xs)), 'emissions': emissions, 'sales': sales, 'sales_rhs': sales_rhs}
+    worker['subproblems'][size] = sub
+    return sub
+
+def solve_priced(size, prices, time_limit):
+    # the size subproblem with the emissions and sales rows priced into the objective:
+    # (size, valid bound of its Lagrangian term, emissions per year, sales over the cap per year)
+    sub = subproblem(size)
+    model = sub['opti'].model
+    carbon, sale = prices
+    model.setAttr('Obj', sub['xs'], (sub['cost'] + carbon @ sub['emissions'] + sale @ sub['sales']).tolist())
+    model.setParam('TimeLimit', time_limit)
+    sub['opti'].runSolver()
+    bound = model.ObjBound - sale @ sub['sales_rhs']
+    if model.SolCount == 0:
+        return size, bound, None, None
+    x = np.array(model.getAttr('X', sub['xs']))
+    return size, bound, sub['emissions'] @ x, sub['sales'] @ x - sub['sales_rhs']
+
+def solve_budgeted(size, emissions_budget, sales_budget, time_limit, plan=None):
+    # the size subproblem at its own cost within its share of the yearly emissions and sales budgets, started
+    # from the rows of `plan` if given: (size, objective, result_dict), objective None if it has no plan
+    sub = subproblem(size)
+    opti, model = sub['opti'], sub['opti'].model
+    model.setAttr('Obj', sub['xs'], sub['cost'].tolist())
+    if plan is not None:
+        opti.warmStart(plan)
+    def row(a):
+        nz = np.nonzero(a)[0]
+        return gp.LinExpr(a[nz].tolist(), [sub['xs'][i] for i in nz.tolist()])
+    rows = [model.addConstr(row(sub['emissions'][yi]) <= emissions_budget[yi]) for yi in range(len(opti.years))]
+    rows += [model.addConstr(row(sub['sales'][yi]) <= sub['sales_rhs'][yi] + sales_budget[yi]) for yi in range(len(opti.years) - 1)]
+    model.setParam('TimeLimit', time_limit)
+    opti.runSolver()
+    result = None
+    if model.SolCount > 0:
+        opti.result_dict = None
+        opti.getResults()
+        result = (model.ObjVal, opti.result_dict)
+    model.remove(rows)
+    return (size, *result) if result else (size, None, None)
+
+# Size class decomposition: demand rows are per size, only the yearly emissions limit and 20% sales cap
+# couple the sizes. Both are priced with Lagrangian multipliers updated by projected subgradient steps;
+# each iteration solves every size's priced subproblem in parallel in a process pool, and the sum of their
+# bounds minus the priced budgets is a valid lower bound on the full model. The plan is repaired by splitting
+# each year's budgets between sizes and solving the sizes again within their shares: once around what the
+# sizes used at the best multipliers, once around the greedy plan (whose shares it keeps, so it is the start).
+# The cheapest of the two and the greedy plan itself is the answer.
+# Experimental, and not an OptiModel solve mode: on the instances bench_decomposition can build it hasn't
+# beaten the monolithic solve, whose bound and gap are tighter in the same time; meant for models too large
+# to solve whole.
+class SizeDecomposition:
+    def __init__(self, opti, workers=4, iterations=ITERATIONS, sub_time_limit=SUB_TIME_LIMIT, threads=SUB_THREADS):
+        if opti.use_mode != 'ceiling':
+            raise ValueError(f"size decomposition needs use_mode 'ceiling', not {opti.use_mode!r}")
+        self.opti = opti
+        self.workers = workers
+        self.iterations = iterations
+        self.sub_time_limit = sub_time_limit
+        self.threads = threads
+        self.history = [] # (seconds, lower bound, step scale) per iteration
+        self.bound = -np.inf
+        self.objective = None
+        self.stop_reason = None
+
+    def greedyUsage(self):
+        # emissions and sales over the cap per (size, year) of the greedy plan, with its objective and the plan
+        opti, arr = self.opti, self.opti.arrays
+        Y, V, F, S, D = arr.shape()
+        opti.heuristicSolve()
+        buy, sell, use, total_distance, covered = opti.planArrays(opti.result_dict)
+        uy, uv, uf, ud = opti.use_ix
+        per_km = arr.consumption[uv, uf] * arr.fuel_emissions[uf, uy]
+        emissions = np.zeros((S, Y))
+        np.add.at(emissions, (arr.size_idx[uv], uy), total_distance * per_km)
+        sales = np.zeros((S, Y))
+        for s in range(S):
+            vs = arr.size_idx == s
+            sales[s] = sell[:, vs].sum(axis=1) - SELL_SHARE * opti.fleet_matrix[:, vs].sum(axis=1)
+        sales[:, -1] = 0
+        return emissions, sales, opti.objVal(), opti.outcome['violations'], opti.result_dict
+
+    def budgets(self, emissions, sales):
+        # per (size, year) budgets summing to the yearly limits: each size's use plus a demand share of what is left
+        arr = self.opti.arrays
+        demand = arr.demand.sum(axis=(0, 2))
+        share = demand / demand.sum() if demand.sum() > 0 else np.full(len(demand), 1 / len(demand))
+        emissions_budget = emissions + share[:, None] * (arr.carbon_limit - emissions.sum(axis=0))[None, :]
+        sales_budget = sales + share[:, None] * (0 - sales.sum(axis=0))[None, :]
+        return emissions_budget, sales_budget
+
+    def repair(self, pool, emissions, sales, time_limit, plan=None):
+        # (objective, plans) of every size within its budgets, None if a size has none
+        sizes = self.opti.arrays.sizes
+        emissions_budget, sales_budget = self.budgets(emissions, sales)
+        futures = [pool.submit(solve_budgeted, size, emissions_budget[s], sales_budget[s], time_limit, plan) for s, size in enumerate(sizes)]
+        results = [f.result() for f in futures]
+        if any(objective is None for size, objective, plan in results):
+            return None
+        return sum(objective for size, objective, plan in results), [plan for size, objective, plan in results]
+
+    def run(self):
+        # the repaired plan as a result_dict, None if there is none; self.bound and self.objective are set
+        opti = self.opti
+        opti.loadIndex() # the full model doesn't need to be built
+        arr = opti.arrays
+        Y, V, F, S, D = arr.shape()
+        start = time.time()
+        time_limit = opti.model.Params.TimeLimit
+        repair_limit = time_limit * (1 - REPAIR_SHARE)
+
+        # the greedy plan is the first upper bound and the fallback repair
+        greedy_emissions, greedy_sales, upper, violations, greedy_plan = self.greedyUsage()
+        best_usage = None
+        carbon, sale = np.zeros(Y), np.zeros(Y)
+        scale, stall = STEP_SCALE, 0
+
+        inputs = dict(zip(['demand', 'vehicles', 'fuels', 'vehicles_fuels', 'carbon_emissions', 'cost_profiles', 'start'],
+                          [opti.demand_df, opti.vehicles_df, opti.fuels_df, opti.vehicles_fuels_df, opti.carbon_emissions_df, opti.cost_profiles_df, opti.start_df]))
+        options = {k: getattr(opti, k) for k in BUILD_OPTIONS}
+        with process_pool(min(self.workers, S), worker_inputs, inputs, options, self.threads) as pool:
+            self.stop_reason = 'iteration limit'
+            for it in range(self.iterations):
+                remaining = repair_limit - (time.time() - start)
+                if remaining < 1:
+                    self.stop_reason = 'time limit'
+                    break
+                futures = [pool.submit(solve_priced, size, (carbon, sale), min(self.sub_time_limit, remaining)) for size in arr.sizes]
+                results = [f.result() for f in futures]
+                if any(r[2] is None for r in results):
+                    self.stop_reason = 'a size subproblem found no plan'
+                    break
+                emissions = np.array([r[2] for r in results])
+                sales = np.array([r[3] for r in results])
+                bound = sum(r[1] for r in results) - carbon @ arr.carbon_limit
+                if bound > self.bound:
+                    self.bound, stall, best_usage = bound, 0, (emissions, sales)
+                else:
+                    stall += 1
+                    if stall >= STALL_ITERATIONS:
+                        scale, stall = scale / 2, 0
+                self.history.append((time.time() - start, bound, scale))
+                logger.info('decomposition %d: bound %.1f, upper %.1f', it, bound, upper)
+
+                # projected subgradient step towards the greedy plan's objective
+                carbon_grad = emissions.sum(axis=0) - arr.carbon_limit
+                sale_grad = sales.sum(axis=0)
+                carbon_grad[(carbon <= 0) & (carbon_grad < 0)] = 0
+                sale_grad[(sale <= 0) & (sale_grad < 0)] = 0
+                norm = carbon_grad @ carbon_grad + sale_grad @ sale_grad
+                if norm <= 0:
+                    self.stop_reason = 'subproblem plans keep the shared budgets'
+                    break
+                step = scale * max(upper - bound, 1e-6 * abs(upper)) / norm
+                carbon = np.maximum(carbon + step * carbon_grad, 0)
+                sale = np.maximum(sale + step * sale_grad, 0)
+
+            candidates = [] if violations else [(upper, [greedy_plan])]
+            if best_usage is not None:
+                candidates.append(self.repair(pool, *best_usage, max((time_limit - (time.time() - start)) / 2, 1)))
+            if not violations:
+                candidates.append(self.repair(pool, greedy_emissions, greedy_sales, max(time_limit - (time.time() - start), 1), greedy_plan))
+        candidates = [c for c in candidates if c is not None]
+        if not candidates:
+            return None
+        self.objective, plans = min(candidates, key=lambda c: c[0])
+        return {k: sum((plan[k] for plan in plans), []) for k in plans[0]}
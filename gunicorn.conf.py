@@ -0,0 +1,12 @@
+import os
+
+bind = os.environ.get('FLEET_BIND', '0.0.0.0:8080')
+# few workers: each runs its own solves, and proto.py splits the cores between all of them (FLEET_WORKERS)
+workers = int(os.environ.get('FLEET_WORKERS', 2))
+os.environ['FLEET_WORKERS'] = str(workers) # read by the forked workers
+# solves run in background threads of a worker; the request threads only poll and draw charts
+worker_class = 'gthread'
+threads = int(os.environ.get('FLEET_THREADS', 4))
+timeout = 120
+# no preload: every worker process opens its own Gurobi environment
+preload_app = False
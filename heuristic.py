@@ -0,0 +1,210 @@
+import logging
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+SELL_SHARE = 0.2 # of the fleet, per year
+LIFE = 10 # years a vehicle can be kept
+MARGIN_KM = 1.0 # moved on top of what brings a year exactly to its carbon limit
+
+# Year by year construction of a feasible plan, in the solutionArrays() layout of the model:
+#  - demand of each (size, bucket), longest buckets first, goes to the vehicles already in the fleet with the
+#    cheapest fuel, then to new vehicles of the year with the lowest yearly cost per km over their holding time
+#  - while the year is over its carbon limit, the use row with the cheapest cost per saved kg switches fuel;
+#    without a switch left, the worst emitting row moves to idle or new lower emission vehicles
+#  - vehicles in their 10th year are sold; with the sale cap left, vehicles due in the coming years (as many
+#    as those years' caps wouldn't cover) and idle vehicles, oldest first
+# Rules it can't keep (no vehicle for a demand cell, carbon limit, sale cap) are listed in violations.
+class GreedyPlanner:
+    def __init__(self, opti):
+        self.opti = opti
+        self.arr = opti.arrays
+        self.violations = []
+
+    def perKm(self, yi):
+        # V x F fuel cost and emissions per km in year yi, inf for incompatible fuels
+        arr = self.arr
+        cost = np.where(arr.fuel_ok, arr.consumption * arr.fuel_cost[:, yi][None, :], np.inf)
+        emissions = np.where(arr.fuel_ok, arr.consumption * arr.fuel_emissions[:, yi][None, :], np.inf)
+        return cost, emissions
+
+    def newVehicleScore(self, yi, fuel_cost):
+        # yearly ownership cost per km of a vehicle bought in year yi and kept to its 10th year or the end, plus its cheapest fuel
+        arr = self.arr
+        held = min(LIFE, len(arr.years) - yi)
+        ages = np.arange(1, held + 1)
+        upkeep = (arr.ageRate(arr.insure_rate, ages) + arr.ageRate(arr.maintain_rate, ages)).sum()
+        ownership = arr.cost * (1 - arr.ageRate(arr.resale_rate, held) + upkeep) / held
+        return ownership / arr.range + fuel_cost.min(axis=1)
+
+    def assign(self, rows, idle, v, f, d, km):
+        # km of bucket d on vehicle v with fuel f, on as few units as cover it
+        n = int(np.ceil(km / self.arr.range[v]))
+        rows.append([v, f, d, n, km])
+        idle[v] -= n
+
+    def coverDemand(self, yi, fleet, buy, rows, idle):
+        arr = self.arr
+        year = arr.years[yi]
+        fuel_cost, _ = self.perKm(yi)
+        best_fuel = fuel_cost.argmin(axis=1)
+        score = self.newVehicleScore(yi, fuel_cost)
+        new = arr.yrp == year
+        for s in range(len(arr.sizes)):
+            for d in reversed(range(len(arr.distances))):
+                need = arr.demand[yi, s, d]
+                fits = (arr.size_idx == s) & (arr.dist_idx >= d)
+                for v in np.nonzero(fits & (idle > 0))[0][np.argsort(fuel_cost[fits & (idle > 0)].min(axis=1), kind='stable')]:
+                    if need <= 0:
+                        break
+                    km = min(need, idle[v] * arr.range[v])
+                    self.assign(rows, idle, v, best_fuel[v], d, km)
+                    need -= km
+                if need <= 0:
+                    continue
+                candidates = np.nonzero(fits & new)[0]
+                if len(candidates) == 0:
+                    self.violations.append(f'{year}: no vehicle for {need:.0f} km of {arr.sizes[s]} {arr.distances[d]}')
+                    continue
+                v = candidates[np.argmin(score[candidates])]
+                n = int(np.ceil(need / arr.range[v]))
+                buy[v] += n
+                fleet[v] += n
+                idle[v] += n
+                self.assign(rows, idle, v, best_fuel[v], d, need)
+
+    def capEmissions(self, yi, fleet, buy, rows, idle):
+        arr = self.arr
+        year = arr.years[yi]
+        fuel_cost, fuel_emissions = self.perKm(yi)
+        score = self.newVehicleScore(yi, fuel_cost)
+        new = arr.yrp == year
+        limit = arr.carbon_limit[yi]
+
+        def total():
+            return sum(km * fuel_emissions[v, f] for v, f, d, n, km in rows)
+
+        excess = total() - limit
+        while excess > 0:
+            # cheapest fuel switch per kg saved
+            best = None
+            for i, (v, f, d, n, km) in enumerate(rows):
+                saved = fuel_emissions[v, f] - fuel_emissions[v]
+                for g in np.nonzero(saved > 0)[0]:
+                    ratio = (fuel_cost[v, g] - fuel_cost[v, f]) / saved[g]
+                    if best is None or ratio < best[0]:
+                        best = (ratio, i, g, saved[g])
+            if best is not None:
+                _, i, g, saved = best
+                v, f, d, n, km = rows[i]
+                moved = excess / saved + MARGIN_KM
+                if moved < km and idle[v] >= 1:
+                    # part of the row is enough: split it, the extra unit comes from the idle ones
+                    rows.pop(i)
+                    idle[v] += n
+                    self.assign(rows, idle, v, f, d, km - moved)
+                    self.assign(rows, idle, v, g, d, moved)
+                else:
+                    rows[i][1] = g
+                excess = total() - limit
+                continue
+
+            # move the worst emitting row that has an alternative to idle or new vehicles with lower emissions, idle ones first
+            cleaner = fuel_emissions.min(axis=1)
+            move = None
+            for i in sorted(range(len(rows)), key=lambda i: -fuel_emissions[rows[i][0], rows[i][1]]):
+                v, f, d, n, km = rows[i]
+                fits = (arr.size_idx == arr.size_idx[v]) & (arr.dist_idx >= d) & (cleaner < fuel_emissions[v, f])
+                candidates = [(0, score[w], w) for w in np.nonzero(fits & (idle > 0))[0]] + [(1, score[w], w) for w in np.nonzero(fits & new)[0]]
+                if candidates:
+                    move = i, min(candidates)[2]
+                    break
+            if move is None:
+                self.violations.append(f'{year}: {excess:.0f} kg over the carbon limit')
+                break
+            i, w = move
+            v, f, d, n, km = rows[i]
+            g = fuel_emissions[w].argmin()
+            moved = min(km, excess / (fuel_emissions[v, f] - cleaner[w]) + MARGIN_KM)
+            if idle[w] <= 0 or idle[w] * arr.range[w] < moved:
+                n_new = int(np.ceil(moved / arr.range[w])) - max(idle[w], 0)
+                buy[w] += n_new
+                fleet[w] += n_new
+                idle[w] += n_new
+            rows.pop(i)
+            idle[v] += n
+            if km - moved > 0:
+                self.assign(rows, idle, v, f, d, km - moved)
+            self.assign(rows, idle, w, g, d, moved)
+            excess = total() - limit
+
+    def sellVehicles(self, yi, fleet, sell, idle):
+        arr = self.arr
+        years = arr.years
+        year = years[yi]
+        if yi == len(years) - 1:
+            return # the last year's fleet is sold off at its end
+        budget = SELL_SHARE * fleet.sum()
+        alive = fleet > 0
+
+        # due: 10th year of vehicles that would otherwise be kept beyond it
+        due = alive & (arr.yrp + LIFE - 1 == year) & (arr.yrp + LIFE - 1 < years[-1])
+        forced = fleet[due].sum()
+        if forced > budget + 1e-9:
+            self.violations.append(f'{year}: {forced:.0f} vehicles due for sale, sale cap {budget:.1f}')
+        sell[yi, due] = fleet[due]
+        budget -= forced
+        fleet[due] = 0
+
+        # vehicles due in the coming years beyond what the caps of those years cover, sold now, soonest due first
+        # (they are still used this year); the caps are taken on the fleet left after these sales
+        def overflow():
+            ahead = np.arange(1, LIFE)
+            due_ahead = np.array([fleet[due_year == year + k].sum() for k in ahead])
+            return (np.cumsum(due_ahead) - ahead * np.floor(SELL_SHARE * fleet.sum())).max()
+
+        due_year = np.where((fleet > 0) & (arr.yrp + LIFE - 1 < years[-1]), arr.yrp + LIFE - 1, np.inf)
+        for v in np.nonzero(due_year < np.inf)[0][np.argsort(due_year[due_year < np.inf], kind='stable')]:
+            while fleet[v] > 0 and budget >= 1 and overflow() > 0:
+                sell[yi, v] += 1
+                fleet[v] -= 1
+                budget -= 1
+
+        # idle vehicles, oldest first
+        for v in np.nonzero((fleet > 0) & (idle > 0))[0][np.argsort(arr.yrp[(fleet > 0) & (idle > 0)], kind='stable')]:
+            n = min(idle[v], fleet[v], np.floor(budget))
+            if n <= 0:
+                break
+            sell[yi, v] += n
+            fleet[v] -= n
+            budget -= n
+
+    def plan(self):
+        # (buy, sell, use, total_distance) as returned by OptiModel.solutionArrays()
+        opti, arr = self.opti, self.arr
+        Y, V, F, S, D = arr.shape()
+        self.violations = []
+        buy = np.zeros(V)
+        sell = np.zeros((Y, V))
+        use_rows = []
+        fleet = np.array([opti.fleet_start.get(v, 0) for v in arr.vehicle_ids], dtype=float)
+        for yi in range(Y):
+            fleet[arr.yrp + LIFE - 1 < arr.years[yi]] = 0 # out of the 10 year window
+            idle = fleet.copy()
+            rows = []
+            self.coverDemand(yi, fleet, buy, rows, idle)
+            self.capEmissions(yi, fleet, buy, rows, idle)
+            use_rows += [(yi, v, f, d, n, km) for v, f, d, n, km in rows if n > 0]
+            self.sellVehicles(yi, fleet, sell, idle)
+
+        # rows onto use_index positions; rows of the same variable are merged on as few units as cover them
+        use, total_distance = np.zeros(len(opti.use_index)), np.zeros(len(opti.use_index))
+        if use_rows:
+            yi, vi, fi, di, n, km = (np.array(c) for c in zip(*use_rows))
+            pos = pd.Index(np.ravel_multi_index(opti.use_ix, (Y, V, F, D))).get_indexer(np.ravel_multi_index((yi.astype(int), vi.astype(int), fi.astype(int), di.astype(int)), (Y, V, F, D)))
+            np.add.at(total_distance, pos[pos >= 0], km[pos >= 0])
+            use = np.ceil(total_distance / arr.range[opti.use_ix[1]])
+        for violation in self.violations:
+            logger.warning('greedy plan: %s', violation)
+        return buy, sell, use, total_distance
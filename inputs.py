@@ -1,24 +1,127 @@
+import hashlib
+import threading
 import numpy as np
 import pandas as pd
+from cache import LRUCache
+
+PARSED_CACHE_SIZE = 8 # processed input sets kept in memory, by content
+
+# Function to get compatible fuel types for a vehicle
+def get_compatible_fuels(v):
+    v_type = v.split('_')[0]
+    if v_type == 'BEV':
+        return ['Electricity']
+    elif v_type == 'LNG':
+        return ['LNG', 'BioLNG']
+    return ['HVO', 'B20']
+
+def index_of(labels, values):
+    # position of each value in labels, -1 if missing
+    return pd.Index(labels).get_indexer(pd.Index(values))
+
+def frames_digest(*dfs):
+    # content hash of the input frames: column names, dtypes and values, not the row labels
+    h = hashlib.sha256()
+    for df in dfs:
+        if df is None:
+            h.update(b'none')
+            continue
+        h.update(repr([(str(c), str(t)) for c, t in df.dtypes.items()]).encode())
+        h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+def start_ending(start, year, vehicles):
+    # start rows ending in `year`: the horizon begins the year after the last one of a start file, so rows
+    # ending earlier (or none) get a Sell row of 0 vehicles in `year`, on the oldest of `vehicles`
+    if len(start) and start['Year'].max() == year:
+        return start
+    oldest = vehicles.loc[vehicles['Year'].idxmin(), 'ID']
+    marker = pd.DataFrame([{'Year': year, 'ID': oldest, 'Num_Vehicles': 0, 'Type': 'Sell'}], columns=start.columns)
+    return pd.concat([start, marker], ignore_index=True) if len(start) else marker
+
+class InputArrays:
+    # integer-indexed view of the processed inputs
+    # axes: years (Y), vehicle ids (V), fuels (F), sizes (S), distances (D), age (A, index = 'End of Year')
+    def __init__(self, years, vehicle_ids, fuels, sizes, distances):
+        self.years = list(years)
+        self.vehicle_ids = list(vehicle_ids)
+        self.fuels = list(fuels)
+        self.sizes = list(sizes)
+        self.distances = list(distances)
+
+        self.year_index = {yr: i for i, yr in enumerate(self.years)}
+        self.vehicle_index = {v: i for i, v in enumerate(self.vehicle_ids)}
+        self.fuel_index = {f: i for i, f in enumerate(self.fuels)}
+        self.size_index = {s: i for i, s in enumerate(self.sizes)}
+        self.distance_index = {d: i for i, d in enumerate(self.distances)}
+        self.year_weight = np.ones(len(self.years), dtype=int) # years each model year stands for, > 1 for a time bucket
+
+    def shape(self):
+        return len(self.years), len(self.vehicle_ids), len(self.fuels), len(self.sizes), len(self.distances)
+
+    def ageRate(self, rate, age):
+        # vectorized rates.get(age, 0)
+        age = np.asarray(age)
+        inside = (age >= 0) & (age < len(rate))
+        return np.where(inside, rate[np.clip(age, 0, len(rate) - 1)], 0.0)
+
+    def yearEnds(self):
+        # last real year of each model year: itself, or the last year of its time bucket
+        return np.array(self.years) + self.year_weight - 1
+
+    def bucketRate(self, rate, yi, age):
+        # ageRate summed over the ages model year yi stands for: its own, or those of every year of its time bucket
+        w = self.year_weight[yi]
+        return sum(np.where(k < w, self.ageRate(rate, np.asarray(age) + k), 0.0) for k in range(int(self.year_weight.max())))
 
 class ModelInputs:
-    def __init__(self, df_demand, df_vehicles, df_fuels, df_vehicles_fuels, df_carbon_emissions, df_cost_profiles, df_start=None):
-        self.df_demand = df_demand 
+    def __init__(self, df_demand, df_vehicles, df_fuels, df_vehicles_fuels, df_carbon_emissions, df_cost_profiles, df_start=None, time_buckets=None):
+        self.df_demand = df_demand
         self.df_vehicles = df_vehicles
         self.df_fuels = df_fuels
         self.df_vehicles_fuels = df_vehicles_fuels
         self.df_carbon_emissions = df_carbon_emissions
         self.df_cost_profiles = df_cost_profiles
         self.df_start = df_start
- 
+        self.time_buckets = time_buckets # (yearly years, bucket length), see bucketYears
+        self.arrays = None
+
+    def bucketYears(self, years):
+        # the years after the first `yearly` ones merged into buckets of `length` years, each one a single model year
+        # (its first year): demand, carbon limit and fuel emissions are the bucket's mean, fuel cost its sum, as the km
+        # of a bucket's model year are driven in every year of it. Vehicles of the other years of a bucket can't be
+        # bought and are dropped, unless they are in the start file. Returns the model years and their lengths.
+        yearly, length = self.time_buckets
+        years = list(years)
+        bucket = {yr: yr if i < yearly else years[yearly + (i - yearly) // length * length] for i, yr in enumerate(years)}
+        starts = sorted(set(bucket.values()))
+        weights = [list(bucket.values()).count(b) for b in starts]
+
+        def merge(df, sums, means):
+            df = df[df['Year'].isin(bucket)].assign(Year=lambda d: d['Year'].map(bucket))
+            means = [c for c in means if c in df.columns]
+            keys = ['Year'] + [c for c in df.columns if c not in sums + means + ['Year']]
+            merged = df.groupby(keys, sort=False).agg({**{c: 'sum' for c in sums}, **{c: 'mean' for c in means}}).reset_index()
+            return merged[list(df.columns)]
+
+        self.df_demand = merge(self.df_demand, [], ['Demand (km)'])
+        self.df_fuels = merge(self.df_fuels, ['Cost ($/unit_fuel)'], ['Emissions (CO2/unit_fuel)', 'Cost Uncertainty (±%)'])
+        self.df_carbon_emissions = merge(self.df_carbon_emissions, [], ['Carbon emission CO2/kg'])
+        owned = self.df_start['ID'] if self.df_start is not None else []
+        self.df_vehicles = self.df_vehicles[self.df_vehicles['Year'].isin(starts) | self.df_vehicles['ID'].isin(owned)]
+        return starts, weights
+
     def processInputs(self):
         ymin = 0
         if self.df_start is None: # zero rows
             ymin = min(self.df_vehicles['Year'])
         else:
             ymin = max(self.df_start['Year']) + 1 # start from next year
-            
-        years = range(ymin, max(self.df_vehicles['Year']) + 1)
+
+        years = range(int(ymin), int(max(self.df_vehicles['Year'])) + 1)
+        weights = [1] * len(years)
+        if self.time_buckets is not None:
+            years, weights = self.bucketYears(years)
         sizes = list(self.df_demand['Size'].unique())
         distances = list(self.df_demand['Distance'].unique())
         fuels = list(self.df_fuels['Fuel'].unique())
@@ -27,29 +130,109 @@ class ModelInputs:
         self.df_demand = self.df_demand[self.df_demand['Year'] >= years[0]]
         self.df_fuels = self.df_fuels[self.df_fuels['Year'] >= years[0]]
         self.df_carbon_emissions = self.df_carbon_emissions[self.df_carbon_emissions['Year'] >= years[0]]
-        
+
         # Create dictionaries for easy access
         del_demand = 1e-6
         del_emissions = 1e-8
         del_range = 1e-8
-        
-        demand = {(row['Year'], row['Size'], row['Distance']): row['Demand (km)'] + del_demand for _, row in self.df_demand.iterrows()}
-        vehicle_cost = {row['ID']: row['Cost ($)'] for _, row in self.df_vehicles.iterrows()}
-        vehicle_range = {row['ID']: row['Yearly range (km)'] - del_range for _, row in self.df_vehicles.iterrows() }
-        sb = {row['ID']: row['Size'] for _, row in self.df_vehicles.iterrows()}
-        db = {row['ID']: row['Distance'] for _, row in self.df_vehicles.iterrows()}
-        yrp = {row['ID']: int(row['ID'][-4:]) for _, row in self.df_vehicles.iterrows()}
-        vehicle_fuel_consumption = {(row['ID'], row['Fuel']): row['Consumption (unit_fuel/km)'] for _, row in self.df_vehicles_fuels.iterrows()}
-        fuel_emissions = {(row['Fuel'], row['Year']): row['Emissions (CO2/unit_fuel)'] for _, row in self.df_fuels.iterrows()}
-        fuel_cost = {(row['Fuel'], row['Year']): row['Cost ($/unit_fuel)'] for _, row in self.df_fuels.iterrows()}
-        # fuel_cost_uncertainty = {(row['Fuel'], row['Year']): row['Cost Uncertainty (±%)'] for _, row in self.df_fuels.iterrows()}
-        carbon_limit = {row['Year']: row['Carbon emission CO2/kg'] - del_emissions for _, row in self.df_carbon_emissions.iterrows()}
-        
-        resale_rates = {row['End of Year']: 0.01 * row['Resale Value %'] for _, row in self.df_cost_profiles.iterrows()}
-        insure_rates = {row['End of Year']: 0.01 * row['Insurance Cost %'] for _, row in self.df_cost_profiles.iterrows()}
-        maintain_rates = {row['End of Year']: 0.01 * row['Maintenance Cost %'] for _, row in self.df_cost_profiles.iterrows()}
+
+        dm, vh, fu, vf, ce, cp = self.df_demand, self.df_vehicles, self.df_fuels, self.df_vehicles_fuels, self.df_carbon_emissions, self.df_cost_profiles
+        ids = vh['ID'].tolist()
+        fuel_keys = list(zip(fu['Fuel'].tolist(), fu['Year'].tolist()))
+
+        demand = dict(zip(zip(dm['Year'].tolist(), dm['Size'].tolist(), dm['Distance'].tolist()), (dm['Demand (km)'] + del_demand).tolist()))
+        vehicle_cost = dict(zip(ids, vh['Cost ($)'].tolist()))
+        vehicle_range = dict(zip(ids, (vh['Yearly range (km)'] - del_range).tolist()))
+        sb = dict(zip(ids, vh['Size'].tolist()))
+        db = dict(zip(ids, vh['Distance'].tolist()))
+        yrp = dict(zip(ids, vh['ID'].str[-4:].astype(int).tolist()))
+        vehicle_fuel_consumption = dict(zip(zip(vf['ID'].tolist(), vf['Fuel'].tolist()), vf['Consumption (unit_fuel/km)'].tolist()))
+        fuel_emissions = dict(zip(fuel_keys, fu['Emissions (CO2/unit_fuel)'].tolist()))
+        fuel_cost = dict(zip(fuel_keys, fu['Cost ($/unit_fuel)'].tolist()))
+        # fuel_cost_uncertainty = dict(zip(fuel_keys, fu['Cost Uncertainty (±%)'].tolist()))
+        carbon_limit = dict(zip(ce['Year'].tolist(), (ce['Carbon emission CO2/kg'] - del_emissions).tolist()))
+
+        ages = cp['End of Year'].tolist()
+        resale_rates = dict(zip(ages, (0.01 * cp['Resale Value %']).tolist()))
+        insure_rates = dict(zip(ages, (0.01 * cp['Insurance Cost %']).tolist()))
+        maintain_rates = dict(zip(ages, (0.01 * cp['Maintenance Cost %']).tolist()))
+
+        self.arrays = self.buildArrays(years, list(vehicle_cost.keys()), fuels, sizes, distances, del_demand, del_emissions, del_range)
+        self.arrays.year_weight = np.array(weights, dtype=int)
 
         return years, sizes, distances, fuels, demand, vehicle_cost, vehicle_range, sb, db, yrp, vehicle_fuel_consumption, fuel_emissions, fuel_cost, carbon_limit, resale_rates, insure_rates, maintain_rates
-        
-        
-        
\ No newline at end of file
+
+    def buildArrays(self, years, vehicle_ids, fuels, sizes, distances, del_demand, del_emissions, del_range):
+        arr = InputArrays(years, vehicle_ids, fuels, sizes, distances)
+        Y, V, F, S, D = arr.shape()
+
+        # vehicles (duplicated ids keep the last row, same as the dicts)
+        vh = self.df_vehicles.drop_duplicates('ID', keep='last').set_index('ID').reindex(arr.vehicle_ids)
+        arr.cost = vh['Cost ($)'].to_numpy(dtype=float)
+        arr.range = vh['Yearly range (km)'].to_numpy(dtype=float) - del_range
+        arr.yrp = vh.index.str[-4:].astype(int).to_numpy()
+        arr.size_idx = index_of(arr.sizes, vh['Size'])
+        arr.dist_idx = index_of(arr.distances, vh['Distance'])
+        arr.drivetrain = vh.index.str.split('_').str[0].to_numpy()
+
+        # compatibility masks
+        arr.fuel_ok = np.zeros((V, F), dtype=bool)
+        for t in np.unique(arr.drivetrain):
+            fi = index_of(arr.fuels, get_compatible_fuels(t))
+            arr.fuel_ok[np.ix_(arr.drivetrain == t, fi[fi >= 0])] = True
+        arr.dist_ok = np.arange(D)[None, :] <= arr.dist_idx[:, None]
+
+        # vehicle x fuel consumption
+        vf = self.df_vehicles_fuels
+        vi, fi = index_of(arr.vehicle_ids, vf['ID']), index_of(arr.fuels, vf['Fuel'])
+        ok = (vi >= 0) & (fi >= 0)
+        arr.consumption = np.zeros((V, F))
+        arr.consumption[vi[ok], fi[ok]] = vf['Consumption (unit_fuel/km)'].to_numpy(dtype=float)[ok]
+
+        # fuel x year cost and emissions
+        fu = self.df_fuels
+        fi, yi = index_of(arr.fuels, fu['Fuel']), index_of(arr.years, fu['Year'])
+        ok = (fi >= 0) & (yi >= 0)
+        arr.fuel_cost = np.zeros((F, Y))
+        arr.fuel_cost[fi[ok], yi[ok]] = fu['Cost ($/unit_fuel)'].to_numpy(dtype=float)[ok]
+        arr.fuel_emissions = np.zeros((F, Y))
+        arr.fuel_emissions[fi[ok], yi[ok]] = fu['Emissions (CO2/unit_fuel)'].to_numpy(dtype=float)[ok]
+
+        # year x size x distance demand
+        dm = self.df_demand
+        yi, si, di = index_of(arr.years, dm['Year']), index_of(arr.sizes, dm['Size']), index_of(arr.distances, dm['Distance'])
+        ok = (yi >= 0) & (si >= 0) & (di >= 0)
+        arr.demand = np.zeros((Y, S, D))
+        arr.demand[yi[ok], si[ok], di[ok]] = dm['Demand (km)'].to_numpy(dtype=float)[ok] + del_demand
+
+        ce = self.df_carbon_emissions
+        yi = index_of(arr.years, ce['Year'])
+        ok = yi >= 0
+        arr.carbon_limit = np.zeros(Y)
+        arr.carbon_limit[yi[ok]] = ce['Carbon emission CO2/kg'].to_numpy(dtype=float)[ok] - del_emissions
+
+        # cost profiles by age, age = yr - yrp + 1; out of range ages are 0, same as rates.get(age, 0)
+        cp = self.df_cost_profiles
+        ages = cp['End of Year'].to_numpy(dtype=int)
+        n_age = max(int(ages.max()) + 1, 1) if len(ages) else 1
+        arr.resale_rate, arr.insure_rate, arr.maintain_rate = np.zeros(n_age), np.zeros(n_age), np.zeros(n_age)
+        arr.resale_rate[ages] = 0.01 * cp['Resale Value %'].to_numpy(dtype=float)
+        arr.insure_rate[ages] = 0.01 * cp['Insurance Cost %'].to_numpy(dtype=float)
+        arr.maintain_rate[ages] = 0.01 * cp['Maintenance Cost %'].to_numpy(dtype=float)
+        return arr
+
+parsed_inputs = LRUCache(PARSED_CACHE_SIZE)
+parsed_lock = threading.Lock()
+
+def process_inputs(df_demand, df_vehicles, df_fuels, df_vehicles_fuels, df_carbon_emissions, df_cost_profiles, df_start=None, time_buckets=None):
+    # (processInputs() result, InputArrays) of the frames, shared by every model built from the same content;
+    # nothing downstream modifies them
+    key = (frames_digest(df_demand, df_vehicles, df_fuels, df_vehicles_fuels, df_carbon_emissions, df_cost_profiles, df_start), time_buckets)
+    with parsed_lock:
+        parsed = parsed_inputs.get(key)
+    if parsed is None:
+        model_inputs = ModelInputs(df_demand, df_vehicles, df_fuels, df_vehicles_fuels, df_carbon_emissions, df_cost_profiles, df_start, time_buckets)
+        parsed = (model_inputs.processInputs(), model_inputs.arrays)
+        with parsed_lock:
+            parsed_inputs.put(key, parsed)
+    return parsed
@@ -0,0 +1,164 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from gurobipy import GRB
+
+# Solver telemetry published from a Gurobi callback; read from other threads through snapshot()
+class SolveTelemetry:
+    def __init__(self, time_limit=None):
+        self.time_limit = time_limit
+        self.lock = threading.Lock()
+        self.started = None
+        self.finished = None
+        self.values = {'incumbent': None, 'bound': None, 'gap': None, 'nodes': 0, 'solutions': 0, 'elapsed': 0.0}
+
+    def start(self):
+        self.started = time.time()
+
+    def finish(self):
+        self.finished = time.time()
+
+    def update(self, **values):
+        with self.lock:
+            self.values.update(values)
+            if self.started is not None:
+                self.values['elapsed'] = time.time() - self.started
+
+    def __call__(self, model, where):
+        if where == GRB.Callback.MIP:
+            incumbent, bound = model.cbGet(GRB.Callback.MIP_OBJBST), model.cbGet(GRB.Callback.MIP_OBJBND)
+            has_incumbent = incumbent < GRB.INFINITY
+            self.update(
+                incumbent=incumbent if has_incumbent else None,
+                bound=bound if abs(bound) < GRB.INFINITY else None,
+                gap=abs(incumbent - bound) / max(abs(incumbent), 1e-10) if has_incumbent else None,
+                nodes=int(model.cbGet(GRB.Callback.MIP_NODCNT)),
+                solutions=model.cbGet(GRB.Callback.MIP_SOLCNT),
+            )
+        elif where == GRB.Callback.MIPSOL:
+            self.update(incumbent=model.cbGet(GRB.Callback.MIPSOL_OBJBST))
+
+    def snapshot(self):
+        with self.lock:
+            values = dict(self.values)
+        if self.started is not None:
+            values['elapsed'] = (self.finished or time.time()) - self.started
+        values['time_limit'] = self.time_limit
+        return values
+
+PUBLISH_INTERVAL = 1.0 # seconds between status writes to the result store
+
+class SolveJob:
+    def __init__(self, job_id, model, session_id=None):
+        self.id = job_id
+        self.model = model
+        self.session_id = session_id
+        self.telemetry = SolveTelemetry(model.runtime())
+        self.state = 'queued'
+        self.future = None
+        self.result = None
+        self.error = None
+
+    def status(self):
+        return self.state
+
+    def snapshot(self):
+        status = self.status()
+        stop_reason = self.model.stop_reason if status == 'done' else None
+        return {'job_id': self.id, 'status': status, 'error': self.error, 'stop_reason': stop_reason, **self.telemetry.snapshot()}
+
+# Runs OptiModel.solve() in a thread pool, so a long solve doesn't hold a dashboard worker.
+# Threads rather than processes: the built gurobipy model can't be pickled to a worker process,
+# and Gurobi releases the GIL while it optimizes.
+# With a result store, job status is published every PUBLISH_INTERVAL and the results of a done job are
+# saved (before its status says done), for the other worker processes of the dashboard.
+class JobManager:
+    def __init__(self, max_workers=2, store=None, solutions=None):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='solve')
+        self.store = store
+        self.solutions = solutions # SolutionCache: replay identical solves, warm start the others
+        self.jobs = {}
+        self.lock = threading.Lock()
+
+    def submit(self, model, session_id=None):
+        job = SolveJob(uuid.uuid4().hex, model, session_id)
+        with self.lock:
+            self.jobs[job.id] = job
+        self.publish(job)
+        # looked up once: a cached solve is replayed here, done before the first progress poll; a miss (or an
+        # entry evicted meanwhile) is solved in the pool
+        entry = self.solutions.get(model) if self.solutions is not None else None
+        if entry is not None:
+            self.run(job, entry)
+        else:
+            job.future = self.executor.submit(self.run, job)
+        return job.id
+
+    def publish(self, job):
+        if self.store is not None:
+            self.store.saveJobStatus(job.id, job.snapshot(), job.session_id)
+
+    def publishWhileRunning(self, job, stopped):
+        while not stopped.wait(PUBLISH_INTERVAL):
+            self.publish(job)
+
+    def run(self, job, entry=None):
+        job.state = 'running'
+        job.telemetry.start()
+        job.model.callbacks.append(job.telemetry)
+        stopped = threading.Event()
+        if self.store is not None:
+            threading.Thread(target=self.publishWhileRunning, args=(job, stopped), daemon=True).start()
+        try:
+            if entry is not None:
+                job.result = job.model.replay(entry)
+            else:
+                job.result = job.model.solve(cache=self.solutions, lookup=False)
+            incumbent = job.model.objVal()
+            job.telemetry.update(
+                incumbent=incumbent,
+                bound=job.result[1],
+                gap=job.model.optGap() if incumbent is not None else None,
+            )
+            if self.store is not None:
+                self.store.saveSolve(job.id, job.model, job.result, job.session_id)
+            job.state = 'done'
+        except Exception as e:
+            job.error = f'{type(e).__name__}: {e}'
+            job.state = 'failed'
+        finally:
+            stopped.set()
+            job.model.callbacks.remove(job.telemetry)
+            job.telemetry.finish()
+            self.publish(job)
+        return job.result
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def status(self, job_id):
+        # status of a job of this process, else as last published to the store
+        job = self.get(job_id)
+        if job is not None:
+            return job.snapshot()
+        return self.store.jobStatus(job_id) if self.store is not None else None
+
+    def result(self, job_id):
+        # (result_dict, best bound, first year, last year) once the job is done, else None
+        job = self.get(job_id)
+        if job is not None:
+            return job.result if job.status() == 'done' else None
+        return self.store.result(job_id) if self.store is not None else None
+
+    def model(self, job_id):
+        # solved model of a done job: this process' own, or restored from the store
+        job = self.get(job_id)
+        if job is not None:
+            return job.model if job.status() == 'done' else None
+        return self.store.model(job_id) if self.store is not None else None
+
+    def forget(self, job_id):
+        with self.lock:
+            self.jobs.pop(job_id, None)
@@ -0,0 +1,206 @@
+import numpy as np
+import pandas as pd
+from inputs import index_of
+
+CATEGORY_MAP = {'Buy': 'Buy<br>Cost', 'Sell': 'Sell<br>Revenue', 'Use': 'Fuel<br>Cost'}
+
+# Cost, emissions and distance of a solved plan, computed with array lookups on the input arrays
+# instead of per-row dict lookups. Same output as the OptiModel breakdown methods it backs.
+class KpiEngine:
+    def __init__(self, opti):
+        self.opti = opti
+        self.arr = opti.arrays
+        # drivetrain and size as parsed from the ID, same as the results frame filters
+        parts = pd.Series(self.arr.vehicle_ids, dtype=object).str.split('_')
+        self.id_drivetrain = parts.str[0].to_numpy()
+        self.id_size = parts.str[1].to_numpy()
+
+    def lookup(self, df):
+        # positions of each row's year, vehicle and fuel on the input arrays (-1 if missing)
+        arr = self.arr
+        return index_of(arr.years, df['Year']), index_of(arr.vehicle_ids, df['ID']), index_of(arr.fuels, df['Fuel'])
+
+    def perKm(self, yi, vi, fi, table):
+        # consumption (unit_fuel/km) and table[fuel, year] of Use rows, 0 for rows without a fuel
+        arr = self.arr
+        ok = fi >= 0
+        consumption = np.where(ok, arr.consumption[vi, np.maximum(fi, 0)], 0.0)
+        per_unit = np.where(ok, table[np.maximum(fi, 0), yi], 0.0)
+        return consumption, per_unit
+
+    def fleetRows(self, r, t='All', s='All'):
+        # (year, vehicle) positions of fleet_index inside the range and filters
+        opti, arr = self.opti, self.arr
+        fy, fv = opti.fleet_ix
+        years = np.array(arr.years)[fy]
+        mask = (years >= r[0]) & (years <= r[1])
+        if t != 'All':
+            mask &= self.id_drivetrain[fv] == t
+        if s != 'All':
+            mask &= self.id_size[fv] == s
+        return fy[mask], fv[mask]
+
+    def resultCosts(self, df):
+        # Buy cost, Sell revenue and Fuel cost of each result row, unrounded
+        arr = self.arr
+        kind = df['Type'].astype(object).to_numpy()
+        num = df['Num_Vehicles'].to_numpy(dtype=float)
+        yi, vi, fi = self.lookup(df)
+        vehicle_cost = arr.cost[vi]
+        # a sale ends its model year: its age is the one in the last year of the row's time bucket
+        last_year = np.where(yi >= 0, arr.yearEnds()[yi], df['Year'].to_numpy())
+        age = last_year - arr.yrp[vi] + 1
+        consumption, fuel_cost = self.perKm(yi, vi, fi, arr.fuel_cost)
+        return kind, np.select(
+            [kind == 'Buy', kind == 'Sell', kind == 'Use'],
+            [num * vehicle_cost, num * vehicle_cost * arr.ageRate(arr.resale_rate, age), df['Distance_per_vehicle(km)'].to_numpy(dtype=float) * num * consumption * fuel_cost],
+            np.nan,
+        )
+
+    def resultEmissions(self, df):
+        # emissions of each result row, 0 for Buy/Sell rows
+        consumption, emissions = self.perKm(*self.lookup(df), self.arr.fuel_emissions)
+        return df['Distance_per_vehicle(km)'].to_numpy(dtype=float) * df['Num_Vehicles'].to_numpy(dtype=float) * consumption * emissions
+
+    def upkeepCosts(self, fy, fv):
+        # insurance and maintenance of the fleet at (year, vehicle) positions, from the fleet matrix
+        arr = self.arr
+        age = np.array(arr.years)[fy] - arr.yrp[fv] + 1
+        fleet_cost = self.opti.fleet_matrix[fy, fv] * arr.cost[fv]
+        return fleet_cost * arr.bucketRate(arr.insure_rate, fy, age), fleet_cost * arr.bucketRate(arr.maintain_rate, fy, age)
+
+    def costBreakdown(self, r, t='All', s='All'):
+        arr = self.arr
+        df = self.opti.filterResults(r, t, s)
+        if df.empty:
+            return {}
+        kind, cost = self.resultCosts(df)
+
+        # insurance and maintenance, one row each per (year, vehicle) of fleet_index
+        fy, fv = self.fleetRows(r, t, s)
+        upkeep = np.column_stack(self.upkeepCosts(fy, fv))
+
+        # one frame from plain lists, so the column dtypes are inferred as for the row dicts before
+        n = len(fv)
+        return pd.DataFrame({
+            'Fuel': np.where(kind == 'Use', df['Fuel'].astype(object).to_numpy(), None).tolist() + [None] * 2 * n,
+            'ID': df['ID'].astype(object).tolist() + np.repeat(np.array(arr.vehicle_ids, dtype=object)[fv], 2).tolist(),
+            'Year': df['Year'].tolist() + np.repeat(np.array(arr.years)[fy], 2).tolist(),
+            'Cat': pd.Series(kind, dtype=object).map(CATEGORY_MAP).tolist() + ['Insurance<br>Cost', 'Maintenance<br>Cost'] * n,
+            'Cost': np.round(cost, 1).tolist() + np.round(upkeep.ravel(), 1).tolist(),
+        })
+
+    def emissionsBreakdown(self, r, t='All', s='All'):
+        if t == 'BEV': # electric vehicles have no emissions
+            return {}
+
+        df = self.opti.filterResults(r, t, s, types=['Use'])
+        if df.empty:
+            return {}
+
+        return pd.DataFrame({
+            'Fuel': df['Fuel'].astype(df['Fuel'].cat.categories.dtype),
+            'ID': df['ID'].astype(df['ID'].cat.categories.dtype),
+            'Year': df['Year'],
+            'Emissions': np.round(self.resultEmissions(df), 1),
+            'Total': 'Total<br>Emissions',
+        })
+
+    def distanceBreakdown(self, r, t='All', s='All'):
+        df = self.opti.filterResults(r, t, s, types=['Use'])
+        if df.empty:
+            return {}
+
+        return pd.DataFrame({
+            'Fuel': df['Fuel'].astype(df['Fuel'].cat.categories.dtype),
+            'ID': df['ID'].astype(df['ID'].cat.categories.dtype),
+            'Distance_bucket': df['Distance_bucket'].astype(df['Distance_bucket'].cat.categories.dtype),
+            'Size': df['Size'].astype(df['Size'].cat.categories.dtype),
+            'Year': df['Year'],
+            'Distance': (df['Num_Vehicles'] * df['Distance_per_vehicle(km)']).round(1),
+            'Total': 'Total<br>Distance',
+        })
+
+CATEGORIES = ['Buy<br>Cost', 'Sell<br>Revenue', 'Fuel<br>Cost', 'Insurance<br>Cost', 'Maintenance<br>Cost']
+MEASURES = ['cost', 'emissions', 'distance', 'vehicles']
+CUBE_AXES = ['Year', 'Drivetrain', 'Size', 'Fuel', 'Distance_bucket', 'Cat']
+
+# Dense (year, drivetrain, size, fuel, distance bucket, category) x measure totals of a solved plan, with
+# prefix sums over the years so a year range total costs the same whatever the size of the result.
+# Row values are rounded as in the breakdowns; '' is the fuel/bucket of Buy, Sell and fleet rows.
+# vehicles counts Num_Vehicles for Buy/Sell/Use rows and the fleet size for insurance and maintenance.
+class ResultCube:
+    def __init__(self, engine):
+        opti, arr = engine.opti, engine.arr
+        self.years = list(arr.years)
+        self.drivetrains, dt_of = np.unique(engine.id_drivetrain, return_inverse=True)
+        self.sizes, size_of = np.unique(engine.id_size, return_inverse=True)
+        self.fuels = arr.fuels + ['']
+        self.distances = arr.distances + ['']
+        self.labels = dict(zip(CUBE_AXES, [self.years, list(self.drivetrains), list(self.sizes), self.fuels, self.distances, CATEGORIES]))
+        F, D = len(arr.fuels), len(arr.distances)
+
+        # result rows
+        df = opti.resultsFrame()
+        yi, vi, fi = engine.lookup(df)
+        di = index_of(arr.distances, df['Distance_bucket'])
+        kind, cost = engine.resultCosts(df)
+        cat = np.select([kind == 'Buy', kind == 'Sell'], [0, 1], 2)
+        num = df['Num_Vehicles'].to_numpy(dtype=float)
+        distance = np.where(kind == 'Use', np.round(num * df['Distance_per_vehicle(km)'].to_numpy(dtype=float), 1), 0.0)
+        values = np.column_stack([np.round(cost, 1), np.round(engine.resultEmissions(df), 1), distance, num])
+
+        # fleet rows
+        fy, fv = opti.fleet_ix
+        insurance, maintenance = engine.upkeepCosts(fy, fv)
+        fleet = opti.fleet_matrix[fy, fv]
+        zeros = np.zeros(len(fv))
+
+        shape = tuple(len(l) for l in self.labels.values()) + (len(MEASURES),)
+        self.cube = np.zeros(shape)
+        for y, v, f, d, c, vals in [
+            (yi, vi, np.where(fi >= 0, fi, F), np.where(di >= 0, di, D), cat, values),
+            (fy, fv, F, D, 3, np.column_stack([np.round(insurance, 1), zeros, zeros, fleet])),
+            (fy, fv, F, D, 4, np.column_stack([np.round(maintenance, 1), zeros, zeros, fleet])),
+        ]:
+            for m in range(len(MEASURES)):
+                np.add.at(self.cube, (y, dt_of[v], size_of[v], f, d, c, m), vals[:, m])
+        self.prefix = np.concatenate([np.zeros((1,) + shape[1:]), np.cumsum(self.cube, axis=0)])
+
+    def yearSlice(self, r):
+        return np.searchsorted(self.years, r[0]), np.searchsorted(self.years, r[1], side='right')
+
+    def select(self, block, measure, filters):
+        # block has the cube axes (Year first) and the measure axis; filters maps axis name -> label, 'All' keeps the whole axis
+        block = block[..., MEASURES.index(measure)]
+        for axis, label in filters.items():
+            if label != 'All':
+                labels = self.labels[axis]
+                block = np.take(block, [labels.index(label)] if label in labels else [], axis=CUBE_AXES.index(axis))
+        return block
+
+    def reduce(self, block, by):
+        # sum over every axis but Year and `by`
+        keep = [0] + ([CUBE_AXES.index(by)] if by is not None else [])
+        return block.sum(axis=tuple(i for i in range(block.ndim) if i not in keep))
+
+    def total(self, r, measure, by=None, **filters):
+        # measure over the year range, as a scalar or a Series over the labels of the `by` axis
+        a, b = self.yearSlice(r)
+        block = self.select((self.prefix[b] - self.prefix[a])[None], measure, filters)
+        totals = self.reduce(block, by)[0]
+        if by is None:
+            return float(totals)
+        labels = self.labels[by] if filters.get(by, 'All') == 'All' else [filters[by]]
+        return pd.Series(totals, index=labels[:len(totals)], name=measure)
+
+    def trend(self, r, measure, by=None, **filters):
+        # measure per year of the range (and per label of the `by` axis), long format
+        a, b = self.yearSlice(r)
+        years = self.years[a:b]
+        totals = self.reduce(self.select(self.cube[a:b], measure, filters), by)
+        if by is None:
+            return pd.DataFrame({'Year': years, measure: totals})
+        labels = self.labels[by] if filters.get(by, 'All') == 'All' else [filters[by]]
+        labels = labels[:totals.shape[1]]
+        return pd.DataFrame({'Year': np.repeat(years, len(labels)), by: np.tile(np.array(labels, dtype=object), len(years)), measure: totals.ravel()})
@@ -0,0 +1,155 @@
+import logging
+import os
+import tempfile
+import time
+import numpy as np
+import gurobipy as gp
+from gurobipy import GRB
+from termination import IMPROVEMENT_TOL
+from worker_pool import process_pool, worker
+
+logger = logging.getLogger(__name__)
+
+WINDOW = 3 # years per year window neighborhood
+START_SHARE = 0.2 # of the time limit for the first incumbent, when the model has none
+SUB_TIME_LIMIT = 10 # seconds per neighborhood sub-MIP
+SUB_THREADS = 1 # Gurobi threads per pool worker
+
+def read_model(mps_path, prm_path, threads):
+    # the model of a pool worker, read once per process
+    env = gp.Env(empty=True)
+    env.setParam('OutputFlag', 0)
+    env.start()
+    model = gp.read(mps_path, env)
+    model.read(prm_path)
+    model.setParam('Threads', threads)
+    xs = model.getVars()
+    return {'model': model, 'xs': xs, 'lb': model.getAttr('LB', xs), 'ub': model.getAttr('UB', xs)}
+
+def solve_neighborhood(name, fixed, x, time_limit):
+    # the model with the variables at positions `fixed` held at their incumbent values, from the incumbent
+    model, xs = worker['model'], worker['xs']
+    model.setAttr('LB', xs, worker['lb'])
+    model.setAttr('UB', xs, worker['ub'])
+    fixed_xs = [xs[i] for i in fixed.tolist()]
+    model.setAttr('LB', fixed_xs, x[fixed].tolist())
+    model.setAttr('UB', fixed_xs, x[fixed].tolist())
+    model.setAttr('Start', xs, x.tolist())
+    model.setParam('TimeLimit', time_limit)
+    model.optimize()
+    if model.SolCount == 0:
+        return name, None, None
+    return name, model.ObjVal, np.array(model.getAttr('X', xs))
+
+# Large neighborhood search around the MIP: from an incumbent, each round re-optimizes several neighborhoods
+# at once in a process pool, every other buy/sell/use decision held at its incumbent value, and keeps the
+# best improvement. Neighborhoods are a window of years, one size class or one drivetrain; the search ends
+# at the time limit or when no neighborhood improves the incumbent any more.
+# Workers read the model from an MPS file once each; the incumbent and the fixed positions are sent per task.
+class LargeNeighborhoodSearch:
+    def __init__(self, opti, workers=4, window=WINDOW, sub_time_limit=SUB_TIME_LIMIT, threads=SUB_THREADS):
+        if opti.use_mode != 'ceiling':
+            raise ValueError(f"LNS needs use_mode 'ceiling', not {opti.use_mode!r}")
+        self.opti = opti
+        self.workers = workers
+        self.window = window
+        self.sub_time_limit = sub_time_limit
+        self.threads = threads
+        self.history = [] # (seconds, objective, neighborhood) of every incumbent
+        self.stop_reason = None
+
+    def decisions(self):
+        # model positions of the buy/sell/use variables with the year, vehicle position of each
+        opti, arr = self.opti, self.arr
+        years = np.array(arr.years)
+        families = [
+            (opti.buy, arr.yrp[opti.buy_ix], opti.buy_ix),
+            (opti.sell, years[opti.sell_ix[0]], opti.sell_ix[1]),
+            (opti.use, years[opti.use_ix[0]], opti.use_ix[1]),
+        ]
+        pos = np.concatenate([[x.index for x in family.values()] for family, yr, v in families]).astype(int)
+        yr = np.concatenate([yr for family, yr, v in families])
+        v = np.concatenate([v for family, yr, v in families])
+        return pos, yr, v
+
+    def neighborhoods(self):
+        # (name, model positions held fixed) of every neighborhood
+        arr = self.arr
+        pos, yr, v = self.decisions()
+        free = []
+        step = max(self.window // 2, 1)
+        for start in range(0, max(len(arr.years) - self.window, 0) + 1, step):
+            window = arr.years[start:start + self.window]
+            free.append((f'years {window[0]}-{window[-1]}', np.isin(yr, window)))
+        for s, size in enumerate(arr.sizes):
+            free.append((f'size {size}', arr.size_idx[v] == s))
+        for t in np.unique(arr.drivetrain):
+            free.append((f'drivetrain {t}', arr.drivetrain[v] == t))
+        return [(name, pos[~mask]) for name, mask in free if mask.any() and not mask.all()] # freeing all is the full MIP again
+
+    def incumbent(self, time_limit):
+        # solution values of every model variable, from the model or a short solve started from the greedy plan
+        model = self.opti.model
+        if model.SolCount == 0:
+            self.opti.greedyStart()
+            model.setParam('TimeLimit', max(START_SHARE * time_limit, 1))
+            self.opti.runSolver()
+            model.setParam('TimeLimit', time_limit)
+        if model.SolCount == 0:
+            return None, None
+        x = np.array(model.getAttr('X', model.getVars()))
+        integer = np.array(model.getAttr('VType', model.getVars())) != GRB.CONTINUOUS
+        x[integer] = np.round(x[integer])
+        return model.ObjVal, x
+
+    def planArrays(self, x):
+        # (buy, sell, use, total_distance) of a solution vector, as OptiModel.solutionArrays() returns them
+        opti = self.opti
+        Y, V, F, S, D = self.arr.shape()
+        values = {name: x[[xv.index for xv in getattr(opti, name).values()]] for name in ('buy', 'sell', 'use', 'total_distance')}
+        buy = np.zeros(V)
+        buy[opti.buy_ix] = values['buy']
+        sell = np.zeros((Y, V))
+        sell[opti.sell_ix] = values['sell']
+        return buy, sell, values['use'], values['total_distance']
+
+    def run(self):
+        opti = self.opti
+        self.arr = opti.arrays
+        start = time.time()
+        time_limit = opti.model.Params.TimeLimit
+        objective, x = self.incumbent(time_limit)
+        if x is None:
+            self.stop_reason = 'no incumbent to improve'
+            return None, None, None
+        bound = opti.model.ObjBound
+        self.history = [(time.time() - start, objective, 'initial')]
+        logger.info('LNS start: %.1f', objective)
+
+        opti.model.update()
+        neighborhoods = self.neighborhoods()
+        untried = list(neighborhoods)
+        with tempfile.TemporaryDirectory() as tmp:
+            mps_path, prm_path = os.path.join(tmp, 'model.mps'), os.path.join(tmp, 'model.prm')
+            opti.model.write(mps_path)
+            opti.model.write(prm_path)
+            with process_pool(self.workers, read_model, mps_path, prm_path, self.threads) as pool:
+                while True:
+                    remaining = time_limit - (time.time() - start)
+                    if remaining < 1:
+                        self.stop_reason = 'time limit'
+                        break
+                    if not untried:
+                        self.stop_reason = 'no improving neighborhood'
+                        break
+                    batch, untried = untried[:self.workers], untried[self.workers:]
+                    futures = [pool.submit(solve_neighborhood, name, fixed, x, min(self.sub_time_limit, remaining)) for name, fixed in batch]
+                    results = [f.result() for f in futures]
+                    results = [r for r in results if r[1] is not None and r[1] < objective - IMPROVEMENT_TOL * max(abs(objective), 1.0)]
+                    if not results:
+                        continue
+                    name, objective, x = min(results, key=lambda r: r[1])
+                    self.history.append((time.time() - start, objective, name))
+                    logger.info('LNS %.1fs: %.1f from %s', time.time() - start, objective, name)
+                    untried = [n for n in neighborhoods if n[0] != name] # the others may improve on the new incumbent
+        return objective, bound, x
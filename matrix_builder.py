@@ -0,0 +1,269 @@
+import numpy as np
+import scipy.sparse as sp
+import gurobipy as gp
+from gurobipy import GRB
+
+EPS = 1e-12
+
+# Builds the same formulation as OptiModel.addConstraints/setObjective, one sparse (CSR) block per constraint family
+class MatrixBuilder:
+    def __init__(self, opti, names=True):
+        self.opti = opti
+        self.arr = opti.arrays
+        self.model = opti.model
+        self.names = names # per-row constraint names (and variable names), slow on large models
+
+    def addVariables(self, num_ub, total_dist_ub):
+        opti, arr = self.opti, self.arr
+        Y, V, F, S, D = arr.shape()
+        n_buy, n_sell, n_use = len(opti.buy_ix), len(opti.sell_ix[0]), len(opti.use_ix[0])
+        n_fleet = len(opti.fleet_var_ix[0]) if opti.fleet_state else 0
+
+        # column layout: buy | sell | total_distance | use | fleet (same order as the expression builder)
+        self.buy_off, self.sell_off, self.td_off, self.use_off = 0, n_buy, n_buy + n_sell, n_buy + n_sell + n_use
+        self.fleet_off = self.use_off + n_use
+        self.n = self.fleet_off + n_fleet
+
+        ub = np.concatenate([np.full(n_buy + n_sell, num_ub, dtype=float), np.full(n_use, total_dist_ub, dtype=float), np.full(n_use, num_ub, dtype=float), np.full(n_fleet, np.inf)])
+        vtype = np.full(self.n, GRB.INTEGER, dtype='S1')
+        vtype[self.td_off:self.use_off] = GRB.CONTINUOUS
+        if opti.use_mode == 'aggregate':
+            vtype[self.use_off:self.fleet_off] = GRB.CONTINUOUS
+        vtype[self.fleet_off:] = GRB.CONTINUOUS
+        self.x = self.model.addMVar(self.n, lb=0, ub=ub, vtype=vtype)
+
+        xs = self.x.tolist()
+        opti.buy = gp.tupledict(zip(opti.buy_index, xs[self.buy_off:self.sell_off]))
+        opti.sell = gp.tupledict(zip(opti.sell_index, xs[self.sell_off:self.td_off]))
+        opti.total_distance = gp.tupledict(zip(opti.use_index, xs[self.td_off:self.use_off]))
+        opti.use = gp.tupledict(zip(opti.use_index, xs[self.use_off:self.fleet_off]))
+        if opti.fleet_state:
+            opti.fleet_var = gp.tupledict(zip(opti.fleet_var_index, xs[self.fleet_off:]))
+
+        if self.names:
+            self.model.update()
+            names = [f'buy[{v}]' for v in opti.buy_index] + [f'sell[{yr},{v}]' for yr, v in opti.sell_index]
+            names += [f'total_distance[{yr},{v},{f},{d}]' for yr, v, f, d in opti.use_index]
+            names += [f'use[{yr},{v},{f},{d}]' for yr, v, f, d in opti.use_index]
+            if opti.fleet_state:
+                names += [f'fleet[{yr},{v}]' for yr, v in opti.fleet_var_index]
+            self.model.setAttr('VarName', xs, names)
+
+        # column of each variable by input-array position, -1 if not created
+        self.buy_col = np.full(V, -1)
+        self.buy_col[opti.buy_ix] = self.buy_off + np.arange(n_buy)
+        self.sell_col = np.full((Y, V), -1)
+        self.sell_col[opti.sell_ix] = self.sell_off + np.arange(n_sell)
+        self.fleet_col = np.full((Y, V), -1)
+        if opti.fleet_state:
+            self.fleet_col[opti.fleet_var_ix] = self.fleet_off + np.arange(n_fleet)
+
+    def fleetMatrix(self, fleet_start):
+        # fleet[yr][v] = const + Fm @ x for rows yr * V + v
+        opti, arr = self.opti, self.arr
+        Y, V, F, S, D = arr.shape()
+        years = np.array(arr.years)
+        age = years[:, None] - arr.yrp[None, :]
+        valid = opti.live & (age >= 0) & (arr.yearEnds()[:, None] - arr.yrp[None, :] < 10)
+
+        if opti.fleet_state:
+            # fleet is a variable, Fm just selects its column
+            y, v = opti.fleet_var_ix
+            self.fleet_const = np.zeros(Y * V)
+            self.Fm = sp.csr_matrix((np.ones(len(y)), (y * V + v, self.fleet_col[y, v])), shape=(Y * V, self.n))
+            return
+
+        self.fleet_const = np.where(valid, fleet_start[None, :], 0.0).ravel()
+
+        rows, cols, vals = [], [], []
+        y, v = np.nonzero(valid & (self.buy_col[None, :] >= 0))
+        rows.append(y * V + v); cols.append(self.buy_col[v]); vals.append(np.ones(len(y)))
+
+        # a sale in year ys reduces the fleet of every later year
+        sy, sv = opti.sell_ix
+        sold = years[sy] >= arr.yrp[sv]
+        sy, sv = sy[sold], sv[sold]
+        for k in range(1, Y):
+            y = sy + k
+            keep = y < Y
+            y, v, ys = y[keep], sv[keep], sy[keep]
+            keep = valid[y, v]
+            rows.append(y[keep] * V + v[keep]); cols.append(self.sell_col[ys[keep], v[keep]]); vals.append(-np.ones(keep.sum()))
+
+        self.Fm = sp.csr_matrix((np.concatenate(vals), (np.concatenate(rows), np.concatenate(cols))), shape=(Y * V, self.n))
+
+    def select(self, cols, coefs=None):
+        # one row per column, A[i, cols[i]] = coefs[i]
+        m = len(cols)
+        coefs = np.ones(m) if coefs is None else coefs
+        return sp.csr_matrix((coefs, (np.arange(m), cols)), shape=(m, self.n))
+
+    def grouped(self, rows, cols, coefs, m):
+        A = sp.csr_matrix((coefs, (rows, cols)), shape=(m, self.n))
+        A.sum_duplicates()
+        return A
+
+    def addBlock(self, A, sense, rhs, names):
+        if A.shape[0] == 0:
+            return
+        A = sp.csr_matrix(A)
+        A.eliminate_zeros()
+        constrs = self.model.addMConstr(A, self.x, sense, np.asarray(rhs, dtype=float))
+        if self.names:
+            self.model.update()
+            self.model.setAttr('ConstrName', constrs.tolist(), list(names()))
+
+    def addFleetBalance(self):
+        # fleet[first yr] = start + buy, fleet[yr] = fleet[yr - 1] - sell[yr - 1]
+        opti, arr = self.opti, self.arr
+        years = np.array(arr.years)
+        vids = arr.vehicle_ids
+        y, v = opti.fleet_var_ix
+        first = years[y] == np.maximum(arr.yrp[v], years[0])
+
+        yi, vi = y[first], v[first]
+        r = np.arange(len(yi))
+        has_buy = self.buy_col[vi] >= 0
+        A = self.grouped(np.concatenate([r, r[has_buy]]), np.concatenate([self.fleet_col[yi, vi], self.buy_col[vi[has_buy]]]), np.concatenate([np.ones(len(r)), -np.ones(has_buy.sum())]), len(r))
+        self.addBlock(A, '=', self.fleet_start[vi], lambda: (f'fleet_init_{vids[b]}' for b in vi))
+
+        yi, vi = y[~first], v[~first]
+        r = np.arange(len(yi))
+        prev_sell = self.sell_col[yi - 1, vi]
+        has_sell = prev_sell >= 0
+        rows = np.concatenate([r, r, r[has_sell]])
+        cols = np.concatenate([self.fleet_col[yi, vi], self.fleet_col[yi - 1, vi], prev_sell[has_sell]])
+        vals = np.concatenate([np.ones(len(r)), -np.ones(len(r)), np.ones(has_sell.sum())])
+        self.addBlock(self.grouped(rows, cols, vals, len(r)), '=', np.zeros(len(r)), lambda: (f'fleet_balance_{years[a]}_{vids[b]}' for a, b in zip(yi, vi)))
+
+    def addConstraints(self):
+        opti, arr = self.opti, self.arr
+        Y, V, F, S, D = arr.shape()
+        years = np.array(arr.years)
+        vids = arr.vehicle_ids
+        last = years[-1]
+        ends = arr.yearEnds() # a time bucket counts up to its last real year
+        yrp = arr.yrp
+
+        # no buy when the vehicle is not purchasable in the horizon
+        bv = opti.buy_ix[~np.isin(yrp[opti.buy_ix], years)]
+        self.addBlock(self.select(self.buy_col[bv]), '=', np.zeros(len(bv)), lambda: (f'no_buy_{vids[v]}' for v in bv))
+
+        # sell are zero when vehicle yrp and year mismatch
+        sy, sv = opti.sell_ix
+        syr = years[sy]
+        scol = self.sell_col[sy, sv]
+        m = yrp[sv] > syr
+        self.addBlock(self.select(scol[m]), '=', np.zeros(m.sum()), lambda: (f'no_sale_pre_yrp_{a}_{vids[b]}' for a, b in zip(syr[m], sv[m])))
+
+        # no sale after ten-year time frame and in the last year
+        m = ends[sy] >= yrp[sv] + 10
+        self.addBlock(self.select(scol[m]), '=', np.zeros(m.sum()), lambda: (f'no_sale_outside_ten_year_{a}_{vids[b]}' for a, b in zip(syr[m], sv[m])))
+        m = syr == last
+        self.addBlock(self.select(scol[m]), '=', np.zeros(m.sum()), lambda: (f'no_sale_{last}_{vids[b]}' for b in sv[m]))
+
+        if opti.fleet_state:
+            self.addFleetBalance()
+
+        # sell within fleet
+        fr = sy * V + sv
+        self.addBlock(self.select(scol) - self.Fm[fr], '<', self.fleet_const[fr], lambda: (f'sell_within_fleet_{a}_{vids[b]}' for a, b in zip(syr, sv)))
+
+        # ensure all vehicles that can reach their 10th year, are sold by that time
+        in_years = np.isin(yrp, years)
+        curr = (yrp + 9 < ends[-1]) & in_years
+        prev = (yrp + 9 < ends[-1]) & ~in_years & (yrp + 9 >= years[0])
+        row_of = np.full(V, -1)
+        vc = np.nonzero(curr)[0]
+        row_of[vc] = np.arange(len(vc))
+        m = curr[sv] & (syr >= yrp[sv]) & (syr < yrp[sv] + 10)
+        A = self.grouped(np.concatenate([row_of[vc], row_of[sv[m]]]), np.concatenate([self.buy_col[vc], scol[m]]), np.concatenate([np.ones(len(vc)), -np.ones(m.sum())]), len(vc))
+        self.addBlock(A, '=', np.zeros(len(vc)), lambda: (f'sell_curr_by_10th_year_{vids[v]}' for v in vc))
+        vp = np.nonzero(prev)[0]
+        row_of[vp] = np.arange(len(vp))
+        m = prev[sv] & (syr < yrp[sv] + 10)
+        A = self.grouped(row_of[sv[m]], scol[m], np.ones(m.sum()), len(vp))
+        self.addBlock(A, '=', self.fleet_start[vp], lambda: (f'sell_prev_by_10th_year_{vids[v]}' for v in vp))
+
+        # if incompatible fuel, total_distance[yr, v, f, d] = 0
+        uy, uv, uf, ud = opti.use_ix
+        n_use = len(uy)
+        td_col = self.td_off + np.arange(n_use)
+        use_col = self.use_off + np.arange(n_use)
+        ok = opti.compatible[uv, uf, ud]
+        labels = lambda prefix, m: (f'{prefix}_{k[0]}_{k[1]}_{k[2]}_{k[3]}' for k, keep in zip(opti.use_index, m) if keep)
+        self.addBlock(self.select(td_col[~ok]), '=', np.zeros((~ok).sum()), lambda: labels('incompatible_fuel_or_distance', ~ok))
+
+        # use within fleet, for every (yr, v) that has use variables
+        has_use = np.zeros((Y, V), dtype=bool)
+        has_use[uy, uv] = True
+        fy, fv = np.nonzero(opti.live & has_use)
+        row_of = np.full((Y, V), -1)
+        row_of[fy, fv] = np.arange(len(fy))
+        A = self.grouped(row_of[uy[ok], uv[ok]], use_col[ok], np.ones(ok.sum()), len(fy)) - self.Fm[fy * V + fv]
+        self.addBlock(A, '<', self.fleet_const[fy * V + fv], lambda: (f'use_within_fleet_{years[a]}_{vids[b]}' for a, b in zip(fy, fv)))
+
+        # ceiling: total_distance <= use * range <= total_distance + range * (1 - EPS)
+        rng = arr.range[uv]
+        r = np.arange(n_use)
+        A = self.grouped(np.concatenate([r, r]), np.concatenate([td_col, use_col]), np.concatenate([np.ones(n_use), -rng]), n_use)
+        self.addBlock(A, '<', np.zeros(n_use), lambda: labels('use_lb', np.ones(n_use, dtype=bool)))
+        if opti.use_mode == 'ceiling':
+            self.addBlock(-A, '<', rng * (1 - EPS), lambda: labels('use_ub', np.ones(n_use, dtype=bool)))
+
+        # carbon emissions limit
+        a = ok
+        A = self.grouped(uy[a], td_col[a], arr.consumption[uv[a], uf[a]] * arr.fuel_emissions[uf[a], uy[a]], Y)
+        self.addBlock(A, '<', arr.carbon_limit, lambda: (f'emissions_limit_{yr}' for yr in years))
+
+        # 20pct sale constraint
+        yy = np.arange(Y - 1)
+        sell_rows = self.grouped(sy, scol, np.ones(len(sy)), Y)[yy]
+        fleet_rows = sp.csr_matrix((np.ones(Y * V), (np.repeat(np.arange(Y), V), np.arange(Y * V))), shape=(Y, Y * V))
+        A = sell_rows - 0.2 * (fleet_rows @ self.Fm)[yy]
+        self.addBlock(A, '<', 0.2 * (fleet_rows @ self.fleet_const)[yy], lambda: (f'20pct_sale_{years[i]}' for i in yy))
+
+        # meet Sx, Dx demands each year
+        a = ok & (yrp[uv] <= years[uy]) & (arr.size_idx[uv] >= 0)
+        row = (uy[a] * S + arr.size_idx[uv[a]]) * D + ud[a]
+        A = self.grouped(row, td_col[a], np.ones(a.sum()), Y * S * D)
+        self.addBlock(A, '>', arr.demand.ravel(), lambda: (f'SxDx_demand_{yr}_{s}_{d}' for yr in years for s in arr.sizes for d in arr.distances))
+
+    def setObjective(self):
+        opti, arr = self.opti, self.arr
+        Y, V, F, S, D = arr.shape()
+        years = np.array(arr.years)
+        age = years[:, None] - arr.yrp[None, :] + 1
+        c = np.zeros(self.n)
+
+        c[self.buy_col[opti.buy_ix]] += arr.cost[opti.buy_ix]
+
+        uy, uv, uf, ud = opti.use_ix
+        ok = opti.compatible[uv, uf, ud]
+        td_col = self.td_off + np.arange(len(uy))
+        c[td_col[ok]] += arr.consumption[uv[ok], uf[ok]] * arr.fuel_cost[uf[ok], uy[ok]]
+
+        # a sale ends its model year, so it is priced at the age in the last year of its time bucket
+        sale_age = arr.yearEnds()[:, None] - arr.yrp[None, :] + 1
+        sy, sv = opti.sell_ix
+        c[self.sell_col[sy, sv]] -= arr.cost[sv] * arr.ageRate(arr.resale_rate, sale_age[sy, sv])
+
+        # insurance, maintenance and end-of-horizon resale act on the fleet
+        yi = np.arange(Y)[:, None]
+        w = np.where(opti.live, arr.cost[None, :] * (arr.bucketRate(arr.insure_rate, yi, age) + arr.bucketRate(arr.maintain_rate, yi, age)), 0.0)
+        w[-1] -= arr.cost * arr.ageRate(arr.resale_rate, sale_age[-1])
+        w = w.ravel()
+        c += self.Fm.T @ w
+        self.model.setObjective(c @ self.x + float(self.fleet_const @ w), GRB.MINIMIZE)
+
+    def build(self, num_ub, total_dist_ub):
+        opti = self.opti
+        self.fleet_start = np.zeros(len(self.arr.vehicle_ids))
+        for v, n in opti.fleet_start.items():
+            if v in self.arr.vehicle_index:
+                self.fleet_start[self.arr.vehicle_index[v]] = n
+
+        self.addVariables(num_ub, total_dist_ub)
+        self.fleetMatrix(self.fleet_start)
+        self.addConstraints()
+        self.setObjective()
@@ -0,0 +1,73 @@
+import hashlib
+import json
+import os
+import numpy as np
+import gurobipy as gp
+from cache import DiskCache
+from inputs import frames_digest
+
+BUILD_OPTIONS = ['sparse', 'builder', 'names', 'fleet_state', 'tighten_bounds', 'use_mode', 'prune', 'time_buckets']
+FORMAT_VERSION = 1 # bump when the formulation changes, so models built by older code are not reloaded
+
+# (variable family attribute, index attribute it is keyed on)
+FAMILIES = [('buy', 'buy_index'), ('sell', 'sell_index'), ('total_distance', 'use_index'), ('use', 'use_index'), ('fleet_var', 'fleet_var_index')]
+
+def model_key(opti):
+    # content hash of the input frames and the build options: same key, same model
+    inputs = frames_digest(opti.demand_df, opti.vehicles_df, opti.fuels_df, opti.vehicles_fuels_df, opti.carbon_emissions_df, opti.cost_profiles_df, opti.start_df)
+    options = {k: getattr(opti, k) for k in BUILD_OPTIONS}
+    return hashlib.sha256(json.dumps({'inputs': inputs, 'options': options, 'version': FORMAT_VERSION}, sort_keys=True).encode()).hexdigest()
+
+def variable_families(opti):
+    # (family, index attribute, variables) of every family the model has
+    return [(family, index, list(getattr(opti, family).values())) for family, index in FAMILIES if hasattr(opti, family)]
+
+# Built Gurobi models on disk, by model_key(). <key>.mps is the model, <key>.npz the position of every
+# variable of each family in it, so a model built before is read back instead of built again.
+class ModelCache(DiskCache):
+    EXTENSIONS = ('.mps', '.npz')
+
+    def __init__(self, directory, max_bytes=2 * 1024 ** 3):
+        super().__init__(directory, max_bytes)
+
+    def load(self, opti):
+        # read the model of opti's inputs and options into opti, False if it isn't cached
+        key = model_key(opti)
+        mps_path, index_path = self.paths(key)
+        if not self.exists(key):
+            self.count(hit=False)
+            return False
+        positions = np.load(index_path)
+        model = gp.read(mps_path)
+
+        # parameters already set on opti's model carry over
+        prm_path = self.tmpPath('.prm')
+        opti.model.write(prm_path)
+        model.read(prm_path)
+        os.remove(prm_path)
+        opti.model.dispose()
+        opti.model = model
+
+        opti.loadInputs()
+        opti.buildIndex()
+        opti.fleet_start = opti.startFleet()
+        xs = model.getVars()
+        for family, index in FAMILIES:
+            if family in positions:
+                setattr(opti, family, gp.tupledict(zip(getattr(opti, index), [xs[i] for i in positions[family].tolist()])))
+        self.touch(key)
+        self.count(hit=True)
+        return True
+
+    def save(self, opti):
+        model = opti.model
+        model.update()
+        mps_path, index_path = self.paths(model_key(opti))
+        positions = {family: np.array([x.index for x in xs], dtype=np.int64) for family, index, xs in variable_families(opti)}
+
+        tmp_mps, tmp_index = self.tmpPath('.mps'), self.tmpPath('.npz')
+        np.savez(tmp_index, **positions)
+        model.write(tmp_mps)
+        os.replace(tmp_index, index_path)
+        os.replace(tmp_mps, mps_path)
+        self.evict()
@@ -2,25 +2,56 @@ import numpy as np
 import pandas as pd
 import gurobipy as gp
 from gurobipy import GRB
-from inputs import ModelInputs
-# import time
+from inputs import process_inputs, get_compatible_fuels, index_of
+from matrix_builder import MatrixBuilder
+from model_cache import BUILD_OPTIONS
+from presolve import BoundTightener, DominancePruner
+from kpi import KpiEngine, ResultCube
+from termination import TerminationPolicy, STATUS_REASONS
+from heuristic import GreedyPlanner
+from lns import LargeNeighborhoodSearch
+from rolling import RollingHorizon
+import time
 
 def get_compatible_distances(d, distances):
     idx = distances.index(d)
     return distances[: idx + 1]
-    
-# Function to get compatible fuel types for a vehicle
-def get_compatible_fuels(v):
-    v_type = v.split('_')[0]
-    if v_type == 'BEV':
-        return ['Electricity']
-    elif v_type == 'LNG':
-        return ['LNG', 'BioLNG']
-    return ['HVO', 'B20']
+
+BUILDERS = ('expr', 'matrix')
+USE_MODES = ('ceiling', 'aggregate')
+REPAIR_SHARE = 0.2 # share of the time limit kept for the aggregate mode repair solve
+MIN_LAST_KM = 1.0 # in the repair, the last vehicle of a Use row drives at least this far
+
+def plain_columns(df):
+    # categorical columns back to their plain dtype for the frames handed to the charts
+    return df.astype({c: df[c].cat.categories.dtype for c in df.columns if isinstance(df[c].dtype, pd.CategoricalDtype)})
     
 class OptiModel:
-    def __init__(self, df_demand, df_vehicles, df_fuels, df_vehicles_fuels, df_carbon_emissions, df_cost_profiles, df_start=None):
+    def __init__(self, df_demand, df_vehicles, df_fuels, df_vehicles_fuels, df_carbon_emissions, df_cost_profiles, df_start=None, sparse=False, builder='expr', names=True, fleet_state=False, tighten_bounds=False, use_mode='ceiling', prune=False, time_buckets=None):
+        if builder not in BUILDERS:
+            raise ValueError(f'unknown builder {builder!r}, expected one of {BUILDERS}')
+        if use_mode not in USE_MODES:
+            raise ValueError(f'unknown use_mode {use_mode!r}, expected one of {USE_MODES}')
+        if time_buckets is not None and (time_buckets[0] < 0 or time_buckets[1] < 1):
+            raise ValueError(f'time_buckets {time_buckets!r} must be (yearly years >= 0, bucket length >= 1)')
+        if time_buckets is not None and fleet_state:
+            raise ValueError('time_buckets needs fleet_state=False: the fleet balance links consecutive years')
         self.model = gp.Model('Fleet Optimization')
+        self.sparse = sparse # only create variables for feasible (year, vehicle, fuel, distance) tuples
+        self.builder = builder # 'expr': one addConstr per row, 'matrix': sparse matrices with addMConstr
+        self.names = names # per-row names in the matrix builder
+        self.fleet_state = fleet_state # explicit fleet inventory variables instead of cumulative sell sums
+        self.tighten_bounds = tighten_bounds # data-driven variable bounds instead of NUM_UB / TOTAL_DIST_UB everywhere
+        self.tightener = None
+        self.prune = prune # drop vehicles dominated by a same size and purchase year alternative before building
+        self.pruner = None
+        # 'ceiling': integer use per (year, vehicle, fuel, distance) with the EPS ceiling
+        # 'aggregate': continuous use bounded by the integer fleet, then a fixed-fleet repair restores integer Use rows
+        self.use_mode = use_mode
+        # (yearly years, bucket length): strategic mode, the years after the first ones merged into multi-year buckets
+        self.time_buckets = tuple(time_buckets) if time_buckets is not None else None
+        self.relaxed_bound = None
+        self.repaired = None # (fixed buy/sell, their LB and UB, use, use_ceil rows) of the last repair, undone before the next optimize
         self.demand_df = df_demand
         self.vehicles_df = df_vehicles
         self.fuels_df = df_fuels
@@ -31,7 +62,16 @@ class OptiModel:
         self.start_df = df_start
         
         self.result_dict = None
+        self.results_df = None
         self.fleet = None
+        self.fleet_matrix = None
+        self.kpi = None
+        self.cube = None
+        self.callbacks = [] # called as fn(model, where) from the Gurobi callback of every optimize
+        self.termination = TerminationPolicy()
+        self.stop_reason = None
+        self.outcome = None # objective, bound and gap of results not from optimizing self.model: a SolutionCache replay or a greedy plan
+        self.start_given = False # a MIP start was set for the next solve (prior plan, greedy or bucketed plan); a SolutionCache keeps it
 
     def startFleet(self):
         if self.start_df is None:
@@ -63,108 +103,429 @@ class OptiModel:
                 fleet[v] += buy_init[v] - sum(sell_init[yrs, v] for yrs in range(self.yrp[v], last_year + 1)) # consider all sales till the end of last year
         return fleet
 
+    def buildIndex(self):
+        # variable index; dense mode keeps the full cross product, sparse mode only feasible tuples
+        arr = self.arrays
+        Y, V, F, S, D = arr.shape()
+        years = np.array(arr.years)
+        vehicle_ids = np.array(arr.vehicle_ids, dtype=object)
+        fuels = np.array(arr.fuels, dtype=object)
+        distances = np.array(arr.distances, dtype=object)
+
+        compatible = arr.fuel_ok[:, :, None] & arr.dist_ok[:, None, :] # V x F x D
+        if self.sparse:
+            # Y x V: bought by the start of the model year and within the 10 year life up to its last real year
+            live = (arr.yrp[None, :] <= years[:, None]) & (arr.yearEnds()[:, None] < arr.yrp[None, :] + 10)
+            buy_mask = np.isin(arr.yrp, years)
+            sell_mask = live.copy()
+            sell_mask[-1] = False # no sale in the last year
+            use_mask = live[:, :, None, None] & compatible[None, :, :, :]
+        else:
+            live = np.ones((Y, V), dtype=bool)
+            buy_mask = np.ones(V, dtype=bool)
+            sell_mask = np.ones((Y, V), dtype=bool)
+            use_mask = np.ones((Y, V, F, D), dtype=bool)
+
+        # integer positions (into the input arrays) of every variable, same order as the labelled index
+        self.live = live
+        self.compatible = compatible
+        self.buy_ix = np.nonzero(buy_mask)[0]
+        self.sell_ix = np.nonzero(sell_mask)
+        self.fleet_ix = np.nonzero(live)
+        self.use_ix = np.nonzero(use_mask)
+
+        self.buy_index = vehicle_ids[self.buy_ix].tolist()
+        y, v = self.sell_ix
+        self.sell_index = list(zip(years[y].tolist(), vehicle_ids[v].tolist()))
+        y, v = self.fleet_ix
+        self.fleet_index = list(zip(years[y].tolist(), vehicle_ids[v].tolist()))
+        y, v, f, d = self.use_ix
+        self.use_index = list(zip(years[y].tolist(), vehicle_ids[v].tolist(), fuels[f].tolist(), distances[d].tolist()))
+
+        # (yr, v) with a vehicle possibly in the fleet, i.e. yrp <= yr and the last real year of yr < yrp + 10
+        age = years[:, None] - arr.yrp[None, :]
+        last_age = arr.yearEnds()[:, None] - arr.yrp[None, :]
+        self.fleet_var_ix = np.nonzero(live & (age >= 0) & (last_age < 10))
+        fy, fv = self.fleet_var_ix
+        self.fleet_var_index = list(zip(years[fy].tolist(), vehicle_ids[fv].tolist()))
+
+        # (yr, v) -> [(f, d)] of all use variables and of the compatible ones
+        self.use_keys = {key: [] for key in self.fleet_index}
+        self.active_keys = {key: [] for key in self.fleet_index}
+        ok = compatible[v, f, d]
+        for (yr, vid, fu, di), c in zip(self.use_index, ok.tolist()):
+            self.use_keys[yr, vid].append((fu, di))
+            if c:
+                self.active_keys[yr, vid].append((fu, di))
+
+    def lastYear(self, yr):
+        # last real year model year yr stands for: itself, or the last year of its time bucket
+        return yr + self.year_weight[yr] - 1
+
+    def sellTerms(self, v, yrs):
+        return [self.sell[yr, v] for yr in yrs if (yr, v) in self.sell]
+
+    def addFleetBalance(self, fleet):
+        # fleet[first yr] = start + buy, fleet[yr] = fleet[yr - 1] - sell[yr - 1]
+        for yr, v in self.fleet_var_index:
+            fleet[yr][v] = self.fleet_var[yr, v]
+            if yr == max(self.yrp[v], self.years[0]):
+                self.model.addConstr(self.fleet_var[yr, v] == self.fleet_start.get(v, 0) + self.buy.get(v, 0), name=f'fleet_init_{v}')
+            else:
+                self.model.addConstr(self.fleet_var[yr, v] == self.fleet_var[yr - 1, v] - gp.quicksum(self.sellTerms(v, [yr - 1])), name=f'fleet_balance_{yr}_{v}')
+
     def addConstraints(self):
         vehicle_ids = self.vehicle_cost.keys()
         
-        for v in vehicle_ids:
+        for v in self.buy_index:
             if self.yrp[v] not in self.years:
                 self.model.addConstr(self.buy[v] == 0, name=f'no_buy_{v}')
                 
         # sell are zero when vehicle yrp and year mismatch 
-        for yr in self.years:
-            for v in vehicle_ids:
-                if self.yrp[v] > yr:
-                    self.model.addConstr(self.sell[yr, v] == 0, name=f'no_sale_pre_yrp_{yr}_{v}')
+        for yr, v in self.sell_index:
+            if self.yrp[v] > yr:
+                self.model.addConstr(self.sell[yr, v] == 0, name=f'no_sale_pre_yrp_{yr}_{v}')
 
-        # no sale after ten-year time frame and in 2038
+        # no sale after ten-year time frame and in 2038; a time bucket counts up to its last real year
         for v in vehicle_ids:
-            for yr in range(max(self.yrp[v] + 10, self.years[0]), self.years[-1] + 1):
-                self.model.addConstr(self.sell[yr, v] == 0, name=f'no_sale_outside_ten_year_{yr}_{v}')
-            self.model.addConstr(self.sell[self.years[-1], v] == 0, name=f'no_sale_{self.years[-1]}_{v}')
+            for yr in self.years:
+                if self.lastYear(yr) >= self.yrp[v] + 10 and (yr, v) in self.sell:
+                    self.model.addConstr(self.sell[yr, v] == 0, name=f'no_sale_outside_ten_year_{yr}_{v}')
+            if (self.years[-1], v) in self.sell:
+                self.model.addConstr(self.sell[self.years[-1], v] == 0, name=f'no_sale_{self.years[-1]}_{v}')
 
         # compute vehicles in fleet at the start of each year
         fleet = {yr: {v: 0 for v in vehicle_ids} for yr in self.years}
-        for yr in self.years:
-            for v in vehicle_ids:
-                if self.yrp[v] <= yr and yr - self.yrp[v] < 10:
-                    fleet[yr][v] += self.fleet_start.get(v, 0) + self.buy[v] - gp.quicksum(self.sell[yrs, v] for yrs in range(max(self.yrp[v], self.years[0]), yr))
+        if self.fleet_state:
+            self.addFleetBalance(fleet)
+        else:
+            for yr, v in self.fleet_index:
+                if self.yrp[v] <= yr and self.lastYear(yr) - self.yrp[v] < 10:
+                    fleet[yr][v] += self.fleet_start.get(v, 0) + self.buy.get(v, 0) - gp.quicksum(self.sellTerms(v, range(max(self.yrp[v], self.years[0]), yr)))
 
         # sell as many ids in fleet and as many of each id in fleet
-        for yr in self.years:
-            for v in vehicle_ids:
-                self.model.addConstr(self.sell[yr, v] <= fleet[yr][v], name=f'sell_within_fleet_{yr}_{v}')
+        for yr, v in self.sell_index:
+            self.model.addConstr(self.sell[yr, v] <= fleet[yr][v], name=f'sell_within_fleet_{yr}_{v}')
 
         # ensure all vehicles that can reach their 10th year, are sold by that time
+        last_year = self.lastYear(self.years[-1])
         for v in vehicle_ids:
-            if self.yrp[v] + 9 < self.years[-1]:
+            if self.yrp[v] + 9 < last_year:
                 if self.yrp[v] in self.years:
-                    self.model.addConstr(self.buy[v] == gp.quicksum(self.sell[yr, v] for yr in range(self.yrp[v], self.yrp[v] + 10)), name=f'sell_curr_by_10th_year_{v}')
+                    self.model.addConstr(self.buy[v] == gp.quicksum(self.sellTerms(v, range(self.yrp[v], self.yrp[v] + 10))), name=f'sell_curr_by_10th_year_{v}')
                 elif self.yrp[v] + 9 >= self.years[0]:
-                    self.model.addConstr(gp.quicksum(self.sell[yr, v] for yr in range(self.years[0], self.yrp[v] + 10)) == self.fleet_start.get(v, 0), name=f'sell_prev_by_10th_year_{v}')
+                    self.model.addConstr(gp.quicksum(self.sellTerms(v, range(self.years[0], self.yrp[v] + 10))) == self.fleet_start.get(v, 0), name=f'sell_prev_by_10th_year_{v}')
 
         # if incompatible fuel, total_distance[yr, v, f, d] = 0
-        for yr in self.years:
-            for v in vehicle_ids:
-                for f in self.fuels:
-                    for d in self.distances:
-                        if f not in get_compatible_fuels(v) or d not in get_compatible_distances(self.db[v], self.distances):
-                            self.model.addConstr(self.total_distance[yr, v, f, d] == 0, name=f'incompatible_fuel_or_distance_{yr}_{v}_{f}_{d}')
+        for yr, v, f, d in self.use_index:
+            if f not in get_compatible_fuels(v) or d not in get_compatible_distances(self.db[v], self.distances):
+                self.model.addConstr(self.total_distance[yr, v, f, d] == 0, name=f'incompatible_fuel_or_distance_{yr}_{v}_{f}_{d}')
         
         # use an many ids in fleet and as many of each id in fleet
         EPS = 1e-12
-        for yr in self.years:
-            for v in vehicle_ids:
-                self.model.addConstr(gp.quicksum(self.use[yr, v, f, d] for f in get_compatible_fuels(v) for d in get_compatible_distances(self.db[v], self.distances)) <= fleet[yr][v], name=f'use_within_fleet_{yr}_{v}')
-                
-                # Add constraints to enforce ceiling function
-                for f in self.fuels:
-                    for d in self.distances:
-                        self.model.addConstr(self.total_distance[yr, v, f, d] <= self.use[yr, v, f, d] * self.vehicle_range[v], name=f'use_lb_{yr}_{v}_{f}_{d}')
-                        self.model.addConstr(self.use[yr, v, f, d] * self.vehicle_range[v] <= self.total_distance[yr, v, f, d] + self.vehicle_range[v] * (1 - EPS), name=f'use_ub_{yr}_{v}_{f}_{d}')
+        for yr, v in self.fleet_index:
+            if not self.use_keys[yr, v]:
+                continue
+            self.model.addConstr(gp.quicksum(self.use[yr, v, f, d] for f, d in self.active_keys[yr, v]) <= fleet[yr][v], name=f'use_within_fleet_{yr}_{v}')
+            
+            # Add constraints to enforce ceiling function
+            for f, d in self.use_keys[yr, v]:
+                self.model.addConstr(self.total_distance[yr, v, f, d] <= self.use[yr, v, f, d] * self.vehicle_range[v], name=f'use_lb_{yr}_{v}_{f}_{d}')
+                if self.use_mode == 'ceiling':
+                    self.model.addConstr(self.use[yr, v, f, d] * self.vehicle_range[v] <= self.total_distance[yr, v, f, d] + self.vehicle_range[v] * (1 - EPS), name=f'use_ub_{yr}_{v}_{f}_{d}')
 
         # carbon emissions limit
         for yr in self.years:
-            self.model.addConstr(gp.quicksum(self.total_distance[yr, v, f, d] * self.vehicle_fuel_consumption.get((v, f), 0) * self.fuel_emissions[f, yr] for v in vehicle_ids for f in get_compatible_fuels(v) for d in get_compatible_distances(self.db[v], self.distances)) <= self.emissions_limit[yr], name=f'emissions_limit_{yr}')
+            self.model.addConstr(gp.quicksum(self.total_distance[yr, v, f, d] * self.vehicle_fuel_consumption.get((v, f), 0) * self.fuel_emissions[f, yr] for v in vehicle_ids for f, d in self.active_keys.get((yr, v), [])) <= self.emissions_limit[yr], name=f'emissions_limit_{yr}')
 
         # 20pct sale constraint
         for yr in self.years:
             if yr < self.years[-1]:
-               self.model.addConstr(gp.quicksum(self.sell[yr, v] for v in vehicle_ids) <= 0.2 * gp.quicksum(fleet[yr][v] for v in vehicle_ids), name=f'20pct_sale_{yr}')
+               self.model.addConstr(gp.quicksum(self.sell[yr, v] for v in vehicle_ids if (yr, v) in self.sell) <= 0.2 * gp.quicksum(fleet[yr][v] for v in vehicle_ids), name=f'20pct_sale_{yr}')
 
         # meet Sx, Dx demands each year
+        demand_terms = {(yr, s, d): [] for yr in self.years for s in self.sizes for d in self.distances}
+        for yr, v in self.fleet_index:
+            if self.yrp[v] <= yr:
+                for f, d in self.active_keys[yr, v]:
+                    demand_terms[yr, self.sb[v], d].append(self.total_distance[yr, v, f, d])
         for yr in self.years:
             for s in self.sizes:
                 for d in self.distances:
-                    self.model.addConstr(gp.quicksum(self.total_distance[yr, v, f, d] for v in vehicle_ids for f in get_compatible_fuels(v) if self.sb[v] == s and d in get_compatible_distances(self.db[v], self.distances) and self.yrp[v] <= yr) >= self.demand.get((yr, s, d), 0), name=f'SxDx_demand_{yr}_{s}_{d}')
+                    self.model.addConstr(gp.quicksum(demand_terms[yr, s, d]) >= self.demand.get((yr, s, d), 0), name=f'SxDx_demand_{yr}_{s}_{d}')
                     
         return fleet
 
+    def bucketRate(self, rates, yr, v):
+        # rates.get(age) summed over the ages yr stands for: its own, or those of every year of its time bucket
+        age = yr - self.yrp[v] + 1
+        return sum(rates.get(age + k, 0) for k in range(self.year_weight[yr]))
+
     def setObjective(self, fleet):
         vehicle_ids = self.vehicle_cost.keys()
         
-        cost_buy = gp.quicksum(self.buy[v] * self.vehicle_cost[v] for v in vehicle_ids)
-        cost_fuel = gp.quicksum(self.total_distance[yr, v, f, d] * self.vehicle_fuel_consumption.get((v, f), 0) * self.fuel_cost[f, yr] for yr in self.years for v in vehicle_ids for f in get_compatible_fuels(v) for d in get_compatible_distances(self.db[v], self.distances))
-        revenue_sell = gp.quicksum(self.sell[yr, v] * self.vehicle_cost[v] * self.resale_rates.get(yr - self.yrp[v] + 1, 0) for yr in self.years for v in vehicle_ids) + gp.quicksum(fleet[self.years[-1]][v] * self.vehicle_cost[v] * self.resale_rates.get(self.years[-1] - self.yrp[v] + 1, 0) for v in vehicle_ids)
+        cost_buy = gp.quicksum(self.buy[v] * self.vehicle_cost[v] for v in self.buy_index)
+        cost_fuel = gp.quicksum(self.total_distance[yr, v, f, d] * self.vehicle_fuel_consumption.get((v, f), 0) * self.fuel_cost[f, yr] for yr, v in self.fleet_index for f, d in self.active_keys[yr, v])
+        revenue_sell = gp.quicksum(self.sell[yr, v] * self.vehicle_cost[v] * self.resale_rates.get(self.lastYear(yr) - self.yrp[v] + 1, 0) for yr, v in self.sell_index) + gp.quicksum(fleet[self.years[-1]][v] * self.vehicle_cost[v] * self.resale_rates.get(self.lastYear(self.years[-1]) - self.yrp[v] + 1, 0) for v in vehicle_ids)
         
         # insurance and maintenance costs
-        cost_insure = gp.quicksum(fleet[yr][v] * self.vehicle_cost[v] * self.insure_rates.get(yr - self.yrp[v] + 1, 0) for yr in self.years for v in vehicle_ids)
-        cost_maintain = gp.quicksum(fleet[yr][v] * self.vehicle_cost[v] * self.maintain_rates.get(yr - self.yrp[v] + 1, 0) for yr in self.years for v in vehicle_ids)
+        cost_insure = gp.quicksum(fleet[yr][v] * self.vehicle_cost[v] * self.bucketRate(self.insure_rates, yr, v) for yr, v in self.fleet_index)
+        cost_maintain = gp.quicksum(fleet[yr][v] * self.vehicle_cost[v] * self.bucketRate(self.maintain_rates, yr, v) for yr, v in self.fleet_index)
         
         self.model.setObjective(cost_buy + cost_fuel + cost_insure + cost_maintain - revenue_sell, GRB.MINIMIZE)
 
-    def setParams(self, time_limit):
-        # Set the solver parameters
+    def setParams(self, time_limit, target_gap=None, abs_gap=None, no_improvement=None, bound_stagnation=None, threads=None):
+        # Set the solver parameters; threads None leaves Gurobi's default of one thread per core
         self.model.setParam('TimeLimit', time_limit)
-        self.model.setParam('NumericFocus', 3)
-        # self.model.setParam('Heuristics', 0.05)
-        self.model.setParam('IntegralityFocus', 1)
+        if threads is not None:
+            self.model.setParam('Threads', threads)
+        # early stop rules, see TerminationPolicy
+        if self.termination in self.callbacks:
+            self.callbacks.remove(self.termination)
+        self.termination = TerminationPolicy(target_gap, abs_gap, no_improvement, bound_stagnation)
+        if self.termination.active():
+            self.callbacks.append(self.termination)
+        if self.use_mode == 'ceiling': # the EPS ceiling needs both
+            self.model.setParam('NumericFocus', 3)
+            # self.model.setParam('Heuristics', 0.05)
+            self.model.setParam('IntegralityFocus', 1)
+
+    def warmStart(self, plan):
+        # Start values from a plan in the result format: an earlier result_dict or an uploaded output.csv.
+        # Rows are matched on labels, so the plan of a shifted horizon covers the years both have: there,
+        # variables without a row start at 0; the other years are left for Gurobi to complete.
+        # Returns the number of variables given a start value.
+        df = pd.DataFrame(plan)
+        if df.empty:
+            return 0
+        buy, sell, use, total_distance, covered = self.planArrays(df)
+        years = np.array(self.arrays.years)
+        # Sell rows of the plan's last year sell off the remaining fleet, not a decision of a longer horizon
+        sell_covered = covered & (years != df['Year'].max())
+        buy_start = np.where(np.isin(self.arrays.yrp[self.buy_ix], years[covered]), buy[self.buy_ix], GRB.UNDEFINED)
+        sy, sv = self.sell_ix
+        sell_start = np.where(sell_covered[sy], sell[sy, sv], GRB.UNDEFINED)
+        use_covered = covered[self.use_ix[0]]
+        use_start = np.where(use_covered, use, GRB.UNDEFINED)
+        total_distance_start = np.where(use_covered, total_distance, GRB.UNDEFINED)
+        return self.setStart(buy_start, sell_start, use_start, total_distance_start)
+
+    def planArrays(self, plan):
+        # (buy, sell, use, total_distance) of a plan in the result format, in the solutionArrays() layout,
+        # and the mask of the model years the plan has rows for
+        df = pd.DataFrame(plan)
+        arr = self.arrays
+        Y, V, F, S, D = arr.shape()
+        years = np.array(arr.years)
+        yi, vi, fi = index_of(arr.years, df['Year']), index_of(arr.vehicle_ids, df['ID']), index_of(arr.fuels, df['Fuel'])
+        di = index_of(arr.distances, df['Distance_bucket'])
+        kind = df['Type'].astype(object).to_numpy()
+        num = df['Num_Vehicles'].to_numpy(dtype=float)
+        covered = np.isin(years, df['Year'].to_numpy())
+
+        buy = np.zeros(V)
+        rows = (kind == 'Buy') & (vi >= 0)
+        np.add.at(buy, vi[rows], num[rows])
+
+        sell = np.zeros((Y, V))
+        rows = (kind == 'Sell') & (yi >= 0) & (vi >= 0)
+        np.add.at(sell, (yi[rows], vi[rows]), num[rows])
+
+        # Use rows onto use_index positions through their flat (year, vehicle, fuel, bucket) position
+        rows = (kind == 'Use') & (yi >= 0) & (vi >= 0) & (fi >= 0) & (di >= 0)
+        pos = pd.Index(np.ravel_multi_index(self.use_ix, (Y, V, F, D))).get_indexer(np.ravel_multi_index((yi[rows], vi[rows], fi[rows], di[rows]), (Y, V, F, D)))
+        found = pos >= 0
+        use, total_distance = np.zeros(len(self.use_index)), np.zeros(len(self.use_index))
+        np.add.at(use, pos[found], num[rows][found])
+        np.add.at(total_distance, pos[found], (num * df['Distance_per_vehicle(km)'].to_numpy(dtype=float))[rows][found])
+        return buy, sell, use, total_distance, covered
+
+    def setStart(self, buy, sell, use, total_distance):
+        # Start values per variable, in the order of buy_index, sell_index and use_index; GRB.UNDEFINED leaves one open
+        self.model.update()
+        starts = [(self.buy, buy), (self.sell, sell), (self.use, use), (self.total_distance, total_distance)]
+        for family, values in starts:
+            self.model.setAttr('Start', list(family.values()), np.asarray(values, dtype=float).tolist())
+        self.start_given = True
+        return int(sum((np.asarray(values) < GRB.UNDEFINED).sum() for family, values in starts))
+
+    def greedyStart(self):
+        # the GreedyPlanner plan as MIP start; returns the planner, whose violations say if the plan is feasible
+        planner = GreedyPlanner(self)
+        buy, sell, use, total_distance = planner.plan()
+        self.setStart(buy[self.buy_ix], sell[self.sell_ix], use, total_distance)
+        return planner
+
+    def aggregateStart(self, time_buckets, time_limit):
+        # the plan of a time bucketed copy of this model as MIP start. Its Use rows cover a bucket's mean
+        # demand and don't fit a single year, so only the fleet is carried over: the buys and sales of the
+        # bucket start years, everything else left for Gurobi to complete.
+        # Returns the bucketed model, whose outcome is the quick strategic answer. The copy has this model's build
+        # options but always the cumulative fleet: the fleet_state balance links consecutive years, not buckets.
+        options = {k: getattr(self, k) for k in BUILD_OPTIONS}
+        options.update(time_buckets=time_buckets, fleet_state=False)
+        bucketed = OptiModel(self.demand_df, self.vehicles_df, self.fuels_df, self.vehicles_fuels_df, self.carbon_emissions_df, self.cost_profiles_df, self.start_df, **options)
+        bucketed.model.setParam('OutputFlag', 0)
+        bucketed.create()
+        bucketed.setParams(time_limit)
+        plan = bucketed.solve()[0]
+        if not plan:
+            return bucketed
+        buy, sell, use, total_distance, covered = self.planArrays(plan)
+        years = np.array(self.arrays.years)
+        buy_start = np.where(np.isin(self.arrays.yrp[self.buy_ix], years[covered]), buy[self.buy_ix], GRB.UNDEFINED)
+        sy, sv = self.sell_ix
+        sell_start = np.where(covered[sy] & (years[sy] != years[covered].max()), sell[sy, sv], GRB.UNDEFINED)
+        open_use = np.full(len(self.use_index), GRB.UNDEFINED)
+        self.setStart(buy_start, sell_start, open_use, open_use)
+        return bucketed
+
+    def heuristicSolve(self):
+        # the GreedyPlanner plan in place of a solve: a quick answer, with no bound
+        planner = GreedyPlanner(self)
+        arrays = planner.plan()
+        self.result_dict = None
+        self.results_df = None
+        self.cube = None
+        self.resultsFromArrays(*arrays)
+        self.outcome = {'objective': self.planCost(), 'bound': None, 'gap': None, 'violations': planner.violations}
+        self.stop_reason = 'greedy plan' + (f', {len(planner.violations)} rules broken' if planner.violations else '')
+        return self.result_dict, None, self.years[0], self.years[-1]
+
+    def planCost(self):
+        # objective value of the current results, from the result cube
+        cost = self.resultCube().total((self.years[0], self.years[-1]), 'cost', by='Cat')
+        return cost.drop('Sell<br>Revenue').sum() - cost['Sell<br>Revenue']
+
+    def lnsSolve(self, workers=4, **options):
+        # large neighborhood search from the current incumbent (or the greedy plan) within the time limit
+        search = LargeNeighborhoodSearch(self, workers, **options)
+        objective, bound, x = search.run()
+        self.result_dict = None
+        self.results_df = None
+        self.cube = None
+        if x is None:
+            self.outcome = None
+            self.stop_reason = search.stop_reason
+            return None, None, self.years[0], self.years[-1]
+        self.resultsFromArrays(*search.planArrays(x))
+        self.resultCube()
+        gap = abs(objective - bound) / max(abs(objective), 1e-10)
+        self.outcome = {'objective': objective, 'bound': bound, 'gap': gap, 'history': search.history}
+        self.stop_reason = f'LNS, {search.stop_reason}'
+        return self.result_dict, bound, self.years[0], self.years[-1]
+
+    def rollingSolve(self, **options):
+        # rolling horizon within the time limit, split evenly between the windows; no bound
+        self.loadIndex()
+        search = RollingHorizon(self, **options)
+        plan = search.run()
+        self.result_dict = None
+        self.results_df = None
+        self.cube = None
+        if plan is None:
+            self.outcome = None
+            self.stop_reason = f'rolling horizon, no plan for {search.windows[-1][0]}-{search.windows[-1][1]}'
+            return None, None, self.years[0], self.years[-1]
+        self.outcome = {'objective': self.planResults(plan), 'bound': None, 'gap': None, 'windows': search.windows}
+        self.stop_reason = f'rolling horizon, {len(search.windows)} windows'
+        return self.result_dict, None, self.years[0], self.years[-1]
+
+    def loadIndex(self):
+        # inputs, variable index and start fleet, for plans put together without the full model
+        if self.kpi is None:
+            self.loadInputs()
+            self.buildIndex()
+            self.fleet_start = self.startFleet()
+            self.kpi = KpiEngine(self)
+
+    def planResults(self, plan):
+        # results of a plan in the result format, put together outside this model; returns its objective
+        buy, sell, use, total_distance, covered = self.planArrays(plan)
+        sell[-1] = 0 # the sell-off of the last year follows from the fleet
+        self.resultsFromArrays(buy, sell, use, total_distance)
+        return self.planCost()
 
     def runtime(self):
         return self.model.Params.TimeLimit
     
+    def solverCallback(self, model, where):
+        for callback in self.callbacks:
+            callback(model, where)
+
+    def runSolver(self):
+        if self.callbacks:
+            self.model.optimize(self.solverCallback)
+        else:
+            self.model.optimize()
+
     def optimize(self):
         # Solve the model
-        self.model.optimize()
+        if self.use_mode == 'aggregate':
+            self.optimizeAggregate()
+            return
+        self.runSolver()
+
+    def optimizeAggregate(self):
+        self.undoRepair()
+        time_limit = self.model.Params.TimeLimit
+        self.model.setParam('TimeLimit', time_limit * (1 - REPAIR_SHARE))
+        self.runSolver()
+        elapsed = self.model.Runtime
+        # the aggregate model is a relaxation, its bound is valid for the exact formulation
+        self.relaxed_bound = self.model.ObjBound
+        if self.model.SolCount > 0:
+            self.model.setParam('TimeLimit', max(time_limit - elapsed, 1))
+            self.repairUse()
+        self.model.setParam('TimeLimit', time_limit)
+
+    def repairUse(self):
+        # fix buy/sell of the aggregate solution, make use integer again and re-solve the allocation
+        fixed = [self.buy[v] for v in self.buy_index] + [self.sell[k] for k in self.sell_index]
+        values = np.round(self.model.getAttr('X', fixed)).tolist()
+        lb, ub = self.model.getAttr('LB', fixed), self.model.getAttr('UB', fixed)
+        self.model.setAttr('LB', fixed, values)
+        self.model.setAttr('UB', fixed, values)
+
+        use = [self.use[k] for k in self.use_index]
+        self.model.setAttr('VType', use, [GRB.INTEGER] * len(use))
+        rows = self.model.addConstrs((self.use[k] * self.vehicle_range[k[1]] <= self.total_distance[k] + self.vehicle_range[k[1]] - MIN_LAST_KM for k in self.use_index), name='use_ceil')
+        self.repaired = (fixed, lb, ub, use, list(rows.values()))
+        start = time.time()
+        self.runSolver()
+
+        if self.model.SolCount == 0:
+            # rounding needs a different fleet: free buy/sell again, start from the aggregate fleet
+            self.model.setAttr('LB', fixed, lb)
+            self.model.setAttr('UB', fixed, ub)
+            self.model.setAttr('Start', fixed, values)
+            self.model.setParam('TimeLimit', max(self.model.Params.TimeLimit - (time.time() - start), 1))
+            self.runSolver()
+
+    def undoRepair(self):
+        # back to the aggregate model. Not done right after the repair: the pending changes would drop the
+        # repaired solution at the next model update, before its results are read
+        if self.repaired is None:
+            return
+        fixed, lb, ub, use, rows = self.repaired
+        self.model.setAttr('LB', fixed, lb)
+        self.model.setAttr('UB', fixed, ub)
+        self.model.setAttr('VType', use, [GRB.CONTINUOUS] * len(use))
+        self.model.remove(rows)
+        self.repaired = None
+
+    def objVal(self):
+        # objective of the plan, None without one
+        if self.outcome is not None:
+            return self.outcome['objective']
+        return self.model.ObjVal if self.model.SolCount > 0 else None
+
+    def objBound(self):
+        if self.outcome is not None:
+            return self.outcome['bound']
+        if self.use_mode == 'aggregate' and self.relaxed_bound is not None:
+            return self.relaxed_bound
+        return self.model.ObjBound
 
     def insertRowToResult(self, result_dict, yr, v, n, t, f, d, dist):
         result_dict['Year'].append(yr)
@@ -175,48 +536,105 @@ class OptiModel:
         result_dict['Distance_bucket'].append(d)
         result_dict['Distance_per_vehicle(km)'].append(dist)
         
+    def solutionArrays(self):
+        # one getAttr('X') per variable family, scattered onto the input axes
+        arr = self.arrays
+        Y, V, F, S, D = arr.shape()
+        buy = np.zeros(V)
+        buy[self.buy_ix] = self.model.getAttr('X', list(self.buy.values()))
+        sell = np.zeros((Y, V))
+        sell[self.sell_ix] = self.model.getAttr('X', list(self.sell.values()))
+        use = np.array(self.model.getAttr('X', list(self.use.values())))
+        total_distance = np.array(self.model.getAttr('X', list(self.total_distance.values())))
+        return buy, sell, use, total_distance
+
     def getResults(self):
         if self.result_dict is not None:
             return
-        
-        # compute fleet
+        self.resultsFromArrays(*self.solutionArrays())
+
+    def resultsFromArrays(self, buy, sell, use, total_distance):
+        # result_dict, fleet and fleet matrix of a plan in the solutionArrays() layout
+        arr = self.arrays
+        years = np.array(arr.years)
+        vehicle_ids = np.array(arr.vehicle_ids, dtype=object)
+        fuels = np.array(arr.fuels, dtype=object)
+        distances = np.array(arr.distances, dtype=object)
+
+        # compute fleet: start + buy - sales from the purchase year up to the previous year
+        fleet_start = np.array([self.fleet_start.get(v, 0) for v in arr.vehicle_ids], dtype=float)
+        sold = np.where(years[:, None] >= arr.yrp[None, :], sell, 0.0)
+        sold_before = np.zeros_like(sold)
+        sold_before[1:] = np.cumsum(sold, axis=0)[:-1]
+        age = years[:, None] - arr.yrp[None, :]
+        in_fleet = self.live & (age >= 0) & (arr.yearEnds()[:, None] - arr.yrp[None, :] < 10)
+        fleet_arr = np.where(in_fleet, (fleet_start + buy)[None, :] - sold_before, 0.0)
         fleet = {yr: {v: 0 for v in self.vehicle_cost.keys()} for yr in self.years}
-        for yr in self.years:
-            for v in self.vehicle_cost.keys():
-                if self.yrp[v] <= yr and yr - self.yrp[v] < 10:
-                    fleet[yr][v] += self.fleet_start.get(v, 0) + self.buy[v].x - sum(self.sell[yrs, v].x for yrs in range(max(self.yrp[v], self.years[0]), yr))
-    
+        for (yi, vi), n in zip(zip(*np.nonzero(in_fleet)), fleet_arr[in_fleet].tolist()):
+            fleet[self.years[yi]][arr.vehicle_ids[vi]] = n
+
+        # Buy rows at (yrp, v), Use rows at (yr, v, f, d), Sell rows at (yr, v)
+        bv = self.buy_ix[(buy[self.buy_ix] > 1e-4) & np.isin(arr.yrp[self.buy_ix], years)]
+        by = np.searchsorted(years, arr.yrp[bv])
+        bv, by = bv[self.live[by, bv]], by[self.live[by, bv]]
+        uy, uv, uf, ud = self.use_ix
+        up = np.nonzero(use > 1e-4)[0]
+        sy, sv = self.sell_ix
+        sp = np.nonzero(sell[self.sell_ix] > 1e-4)[0]
+        sy, sv = sy[sp], sv[sp]
+
+        # same order as looping over fleet_index: by (year, vehicle), then Buy, Use in index order, Sell
+        n_buy, n_use, n_sell = len(bv), len(up), len(sp)
+        row_y = np.concatenate([by, uy[up], sy])
+        row_v = np.concatenate([bv, uv[up], sv])
+        row_kind = np.repeat([0, 1, 2], [n_buy, n_use, n_sell])
+        row_sub = np.concatenate([np.zeros(n_buy, dtype=int), up, np.zeros(n_sell, dtype=int)])
+        order = np.lexsort((row_sub, row_kind, row_v, row_y))
+        empty = np.full(n_buy + n_use + n_sell, '', dtype=object)
+        fuel, bucket = empty.copy(), empty.copy()
+        fuel[n_buy:n_buy + n_use] = fuels[uf[up]]
+        bucket[n_buy:n_buy + n_use] = distances[ud[up]]
+        dist = np.zeros(n_buy + n_use + n_sell, dtype=object)
+        dist[n_buy:n_buy + n_use] = (total_distance[up] / use[up]).astype(object)
+        num = np.round(np.concatenate([buy[bv], use[up], sell[sy, sv]])).astype(int)
+
+        # last year fleet must all be sold
+        last = fleet_arr[-1]
+        left = np.nonzero(in_fleet[-1] & (last > 0))[0]
+
         result_dict = {
-            'Year': [], 'ID': [], 'Num_Vehicles': [], 'Type': [], 'Fuel': [], 'Distance_bucket': [], 'Distance_per_vehicle(km)': []
+            'Year': years[row_y[order]].tolist() + [self.years[-1]] * len(left),
+            'ID': vehicle_ids[row_v[order]].tolist() + vehicle_ids[left].tolist(),
+            'Num_Vehicles': num[order].tolist() + last[left].tolist(),
+            'Type': np.array(['Buy', 'Use', 'Sell'], dtype=object)[row_kind[order]].tolist() + ['Sell'] * len(left),
+            'Fuel': fuel[order].tolist() + [''] * len(left),
+            'Distance_bucket': bucket[order].tolist() + [''] * len(left),
+            'Distance_per_vehicle(km)': dist[order].tolist() + [0] * len(left),
         }
-        for yr in self.years:
-            for v in self.vehicle_cost.keys():
-                if self.yrp[v] == yr and self.buy[v].x > 1e-4:
-                    self.insertRowToResult(result_dict, yr, v, int(np.round(self.buy[v].x)), 'Buy', '', '', 0)
-                    
-                for f in self.fuels:
-                    for d in self.distances:
-                        if self.use[yr, v, f, d].x > 1e-4:
-                            self.insertRowToResult(result_dict, yr, v, int(np.round(self.use[yr, v, f, d].x)), 'Use', f, d, self.total_distance[yr, v, f, d].x/ self.use[yr, v, f, d].x)
-        
-                if self.sell[yr, v].x > 1e-4:
-                    self.insertRowToResult(result_dict, yr, v, int(np.round(self.sell[yr, v].x)), 'Sell', '', '', 0)
-                    
-        yr = self.years[-1] # last year fleet must all be sold
-        for v in self.vehicle_cost.keys():
-            if fleet[yr][v] > 0:
-                self.insertRowToResult(result_dict, yr, v, fleet[yr][v], 'Sell', '', '', 0)
 
         self.result_dict = result_dict
         self.fleet = fleet
+        self.fleet_matrix = fleet_arr
         return
 
     def optGap(self):
+        if self.outcome is not None:
+            return self.outcome['gap']
+        if self.use_mode == 'aggregate' and self.relaxed_bound is not None:
+            return abs(self.model.ObjVal - self.relaxed_bound) / max(abs(self.model.ObjVal), 1e-10)
         return self.model.MIPGap
 
-    def create(self):
-        model_inputs = ModelInputs(self.demand_df, self.vehicles_df, self.fuels_df, self.vehicles_fuels_df, self.carbon_emissions_df, self.cost_profiles_df, self.start_df)
-        years, sizes, distances, fuels, demand, vehicle_cost, vehicle_range, sb, db, yrp, vehicle_fuel_consumption, fuel_emissions, fuel_cost, emissions_limit, resale_rates, insure_rates, maintain_rates = model_inputs.processInputs()
+    def loadInputs(self):
+        # parsed inputs (and the pruned vehicle set) without building the Gurobi model
+        inputs, arrays = process_inputs(self.demand_df, self.vehicles_df, self.fuels_df, self.vehicles_fuels_df, self.carbon_emissions_df, self.cost_profiles_df, self.start_df, self.time_buckets)
+        if self.prune:
+            self.pruner = DominancePruner(arrays)
+            pruned = self.pruner.prune()
+            if pruned:
+                vehicles = self.vehicles_df[~self.vehicles_df['ID'].isin(pruned)]
+                vehicles_fuels = self.vehicles_fuels_df[~self.vehicles_fuels_df['ID'].isin(pruned)]
+                inputs, arrays = process_inputs(self.demand_df, vehicles, self.fuels_df, vehicles_fuels, self.carbon_emissions_df, self.cost_profiles_df, self.start_df, self.time_buckets)
+        years, sizes, distances, fuels, demand, vehicle_cost, vehicle_range, sb, db, yrp, vehicle_fuel_consumption, fuel_emissions, fuel_cost, emissions_limit, resale_rates, insure_rates, maintain_rates = inputs
 
         self.years = years
         self.sizes = sizes 
@@ -235,192 +653,191 @@ class OptiModel:
         self.resale_rates = resale_rates
         self.insure_rates = insure_rates
         self.maintain_rates = maintain_rates
-        
+        self.arrays = arrays
+        self.year_weight = dict(zip(years, arrays.year_weight.tolist()))
+
+    def create(self, cache=None):
+        # a ModelCache reads back a model built before from the same inputs and options
+        if cache is not None and cache.load(self):
+            self.kpi = KpiEngine(self)
+            return
+        self.loadInputs()
+
         # Define decision variables
         NUM_UB = 100 # may vary
         DIST_UB = max(self.vehicle_range.values())
         TOTAL_DIST_UB = DIST_UB * NUM_UB
 
-        vehicle_ids = self.vehicle_cost.keys()
-        buy = self.model.addVars(vehicle_ids, lb=0, ub=NUM_UB, vtype=GRB.INTEGER, name="buy")
-        sell = self.model.addVars(self.years, vehicle_ids, lb=0, ub=NUM_UB, vtype=GRB.INTEGER, name="sell")
-        total_distance = self.model.addVars(self.years, vehicle_ids, self.fuels, self.distances, lb=0, ub=TOTAL_DIST_UB, vtype=GRB.CONTINUOUS, name="total_distance")
-        use = self.model.addVars(self.years, vehicle_ids, self.fuels, self.distances, lb=0, ub=NUM_UB, vtype=GRB.INTEGER, name="use")
+        self.buildIndex()
+        # starting fleet
+        self.fleet_start = self.startFleet()
+
+        if self.builder == 'matrix':
+            MatrixBuilder(self, names=self.names).build(NUM_UB, TOTAL_DIST_UB)
+        else:
+            self.addVariables(NUM_UB, TOTAL_DIST_UB)
+            fleet = self.addConstraints() 
+            self.setObjective(fleet) 
+
+        if self.tighten_bounds:
+            self.tightener = BoundTightener(self, NUM_UB, TOTAL_DIST_UB)
+            self.tightener.apply()
+        self.kpi = KpiEngine(self)
+        if cache is not None:
+            cache.save(self)
+
+    def addVariables(self, NUM_UB, TOTAL_DIST_UB):
+        buy = self.model.addVars(self.buy_index, lb=0, ub=NUM_UB, vtype=GRB.INTEGER, name="buy")
+        sell = self.model.addVars(self.sell_index, lb=0, ub=NUM_UB, vtype=GRB.INTEGER, name="sell")
+        total_distance = self.model.addVars(self.use_index, lb=0, ub=TOTAL_DIST_UB, vtype=GRB.CONTINUOUS, name="total_distance")
+        use = self.model.addVars(self.use_index, lb=0, ub=NUM_UB, vtype=GRB.INTEGER if self.use_mode == 'ceiling' else GRB.CONTINUOUS, name="use")
 
         self.buy = buy
         self.sell = sell
         self.total_distance = total_distance
         self.use = use
+        if self.fleet_state:
+            self.fleet_var = self.model.addVars(self.fleet_var_index, lb=0, vtype=GRB.CONTINUOUS, name="fleet")
+
+    def dispose(self):
+        # free the Gurobi model and the results
+        self.model.dispose()
+        self.result_dict = None
+        self.results_df = None
+        self.fleet = None
+        self.fleet_matrix = None
+        self.cube = None
+
+    def resultState(self):
+        # what the breakdowns, trends and the result cube need of a solved model, without the Gurobi model
+        self.getResults()
+        return {'result_dict': self.result_dict, 'fleet_matrix': self.fleet_matrix, 'fleet_ix': self.fleet_ix, 'stop_reason': self.stop_reason}
+
+    def restoreResults(self, state):
+        # a model with the inputs loaded gets the results of resultState(), e.g. from another process
+        self.result_dict = state['result_dict']
+        self.fleet_matrix = state['fleet_matrix']
+        self.fleet_ix = state['fleet_ix']
+        self.stop_reason = state['stop_reason']
+        self.results_df = None
+        self.cube = None
+        self.kpi = KpiEngine(self)
+
+    def boundReport(self, relaxation=True):
+        # what the bound tightening pass changed, and the root LP bound before/after
+        if self.tightener is None:
+            return {}
+        return self.tightener.report(relaxation)
         
-        # starting fleet
-        self.fleet_start = self.startFleet()
-        
-        fleet = self.addConstraints() 
-        self.setObjective(fleet) 
-        
-    def solve(self):
+    def pruneReport(self):
+        # vehicles dropped by the dominance pruning and the vehicles that dominate them
+        if self.pruner is None:
+            return pd.DataFrame(columns=['ID', 'Dominated_by'])
+        return pd.DataFrame(self.pruner.pruned, columns=['ID', 'Dominated_by'])
+
+    def replay(self, entry):
+        # the results of a SolutionCache entry in place of a solve
+        self.restoreResults(entry)
+        self.outcome = entry
+        self.stop_reason = f"{entry['stop_reason']}, cached"
+        self.resultCube()
+        return self.result_dict, self.objBound(), self.years[0], self.years[-1]
+
+    def solve(self, cache=None, lookup=True):
+        # a SolutionCache replays an identical earlier solve, or warm starts from the best cached plan of the model
+        # when no other start was given; lookup=False if the caller already looked for an identical solve
+        self.outcome = None
+        if cache is not None:
+            entry = cache.get(self) if lookup else None
+            if entry is not None:
+                return self.replay(entry)
+            if not self.start_given:
+                cache.warmStart(self)
+
         # solve
+        self.termination.reset()
         self.optimize()
+        self.start_given = False
+        self.stop_reason = self.termination.reason or STATUS_REASONS.get(self.model.Status, f'status {self.model.Status}')
 
         # reset
         self.result_dict = None
+        self.results_df = None
         self.fleet = None
+        self.fleet_matrix = None
+        self.cube = None
         self.getResults()
-        return self.result_dict, self.model.ObjBound, self.years[0], self.years[-1]
-
-    def cost_breakdown(self, r, t='All', s='All'):
+        self.resultCube()
+        if cache is not None:
+            cache.put(self)
+        return self.result_dict, self.objBound(), self.years[0], self.years[-1]
+
+    def resultsFrame(self):
+        # typed results, built once per solve and shared by the breakdown methods
+        if self.results_df is not None:
+            return self.results_df
         self.getResults()
         df = pd.DataFrame.from_dict(self.result_dict)
-        df = df[df['Year'].isin(range(r[0], r[1] + 1))]
-        
+        for col in ['ID', 'Type', 'Fuel', 'Distance_bucket']:
+            df[col] = df[col].astype('category')
+
+        # parse each distinct ID once: drivetrain_size_year
+        codes = df['ID'].cat.codes.to_numpy()
+        parts = pd.Series(df['ID'].cat.categories, dtype=object).str.split('_')
+        for col, i in [('Drivetrain', 0), ('Size', 1)]:
+            part_codes, part_values = pd.factorize(parts.str[i])
+            df[col] = pd.Categorical.from_codes(part_codes[codes], categories=part_values)
+        df['ID_Year'] = parts.str[2].astype(int).to_numpy()[codes]
+        self.results_df = df
+        return df
+
+    def resultCube(self):
+        # year prefix-summed totals behind the cost boxes and the trend charts, built once per solve
+        if self.cube is None:
+            self.getResults()
+            self.cube = ResultCube(self.kpi)
+        return self.cube
+
+    def filterResults(self, r, t='All', s='All', types=None):
+        df = self.resultsFrame()
+        mask = df['Year'].between(r[0], r[1])
+        if types is not None:
+            mask &= df['Type'].isin(types)
         if t != 'All':
-            df = df[df['ID'].str.split('_').str[0] == t]
-        if df.empty or len(df) == 0:
-            return {}
-        
+            mask &= df['Drivetrain'] == t
         if s != 'All':
-            df = df[df['ID'].str.split('_').str[1] == s]  
-        if df.empty or len(df) == 0:
-            return {}  
+            mask &= df['Size'] == s
+        return df[mask]
 
-        buy_mask = df['Type'] == 'Buy'
-        df.loc[buy_mask, 'cost'] = df.loc[buy_mask, 'Num_Vehicles'] * df.loc[buy_mask, 'ID'].map(self.vehicle_cost)
-        
-        sell_mask = df['Type'] == 'Sell'
-        df.loc[sell_mask, 'cost'] = df.loc[sell_mask, 'Num_Vehicles'] * df.loc[sell_mask, 'ID'].map(self.vehicle_cost) * (df.loc[sell_mask, 'Year'] - df.loc[sell_mask, 'ID'].map(self.yrp) + 1).map(self.resale_rates)
-        # df.loc[sell_mask, 'cost'] *= -1
-
-        use_mask = df['Type'] == 'Use'
-        df.loc[use_mask, 'cost'] = (
-            df.loc[use_mask, 'Distance_per_vehicle(km)'] * df.loc[use_mask, 'Num_Vehicles'] * 
-            df.loc[use_mask].apply(lambda row: self.vehicle_fuel_consumption[(row['ID'], row['Fuel'])], axis=1) *
-            df.loc[use_mask].apply(lambda row: self.fuel_cost[(row['Fuel'], row['Year'])], axis=1)
-        )
-        df['cost'] = df['cost'].round(1)
-    
-        cost_data = []
-        category_map = {'Buy': 'Buy<br>Cost', 'Sell': 'Sell<br>Revenue', 'Use': 'Fuel<br>Cost'}
-        for _, row in df.iterrows():
-            cost_data.append({
-                'Fuel': row['Fuel'] if row['Type'] == 'Use' else None,
-                'ID': row['ID'],
-                'Year': row['Year'],
-                'Cat': category_map[row['Type']],
-                'Cost': row['cost'], 
-                # 'Total': 'Total<br>Cost'
-            })
-
-        # insurance and maintenance costs
-        for yr in self.years:
-            if yr >= r[0] and yr <= r[1]:
-                for v in self.vehicle_cost.keys():
-                    if (t == 'All' or v.split('_')[0] == t) and (s == 'All' or v.split('_')[1] == s):
-                        cost_data.append({ 
-                            'Fuel': None, 
-                            'ID': v, 
-                            'Year': yr, 
-                            'Cat': 'Insurance<br>Cost', 
-                            'Cost': round(self.fleet[yr][v] * self.vehicle_cost[v] * self.insure_rates.get(yr - self.yrp[v] + 1, 0), 1), 
-                            # 'Total': 'Total<br>Cost'
-                        })
-                        cost_data.append({
-                            'Fuel': None, 
-                            'ID': v, 
-                            'Year': yr, 
-                            'Cat': 'Maintenance<br>Cost', 
-                            'Cost': round(self.fleet[yr][v] * self.vehicle_cost[v] * self.maintain_rates.get(yr - self.yrp[v] + 1, 0), 1), 
-                            # 'Total': 'Total<br>Cost'
-                        })
-        return pd.DataFrame(cost_data)
+    def cost_breakdown(self, r, t='All', s='All'):
+        self.getResults()
+        return self.kpi.costBreakdown(r, t, s)
 
     def emissions_breakdown(self, r, t='All', s='All'):
-        if t == 'BEV': # electric vehicles have no emissions
-            return {}
-
         self.getResults()
-        df = pd.DataFrame.from_dict(self.result_dict)
-        df = df[(df['Type'] == 'Use') & (df['Year'].isin(range(r[0], r[1] + 1)))]
-        
-        if t != 'All': 
-            df = df[(df['ID'].str.split('_').str[0] == t)]
-        if df.empty or len(df) == 0:
-            return {}
-        
-        if s != 'All': 
-            df = df[(df['ID'].str.split('_').str[1] == s)]
-        if df.empty or len(df) == 0:
-            return {}
-            
-        # print(df) 
-        df['Emissions'] = (
-            df['Distance_per_vehicle(km)'] * df['Num_Vehicles'] * 
-            df.apply(lambda row: self.vehicle_fuel_consumption[(row['ID'], row['Fuel'])], axis=1) *
-            df.apply(lambda row: self.fuel_emissions[(row['Fuel'], row['Year'])], axis=1)
-        )
-        df['Emissions'] = df['Emissions'].round(1) 
-        df['Total'] = 'Total<br>Emissions'
-        return df[['Fuel', 'ID', 'Year', 'Emissions', 'Total']]
+        return self.kpi.emissionsBreakdown(r, t, s)
 
     def distance_covered_breakdown(self, r, t='All', s='All'):
         self.getResults()
-        df = pd.DataFrame.from_dict(self.result_dict)
-        df = df[(df['Type'] == 'Use') & (df['Year'].isin(range(r[0], r[1] + 1)))]
-        
-        if t != 'All':   
-            df = df[(df['ID'].str.split('_').str[0] == t)]
-        if df.empty or len(df) == 0:
-            return {}
-        
-        if s != 'All':   
-            df = df[(df['ID'].str.split('_').str[1] == s)]
-        if df.empty or len(df) == 0:
-            return {}
-            
-        df['Size'] = df['ID'].str.split('_').str[1]
-        df['Distance'] = df['Num_Vehicles'] * df['Distance_per_vehicle(km)']
-        df['Distance'] = df['Distance'].round(1)
-        df['Total'] = 'Total<br>Distance'
-        
-        return df[['Fuel', 'ID', 'Distance_bucket', 'Size', 'Year', 'Distance', 'Total']]
+        return self.kpi.distanceBreakdown(r, t, s)
 
     def buy_sell_filtered(self, r, t, s): 
-        self.getResults()
-        df = pd.DataFrame.from_dict(self.result_dict)
-        df['ID_Year'] = df['ID'].str.split('_').str[2].astype(int)
-        return df[(
-            (df['Type'].isin(['Buy', 'Sell'])) & (df['Year'].isin(range(r[0], r[1] + 1))) & 
-            (df['ID'].str.split('_').str[0] == t) & (df['ID'].str.split('_').str[1] == s)
-        )][['Type', 'Year', 'Num_Vehicles', 'ID_Year']]
+        df = self.filterResults(r, t, s, types=['Buy', 'Sell'])
+        return plain_columns(df[['Type', 'Year', 'Num_Vehicles', 'ID_Year']])
   
     def use_filtered(self, r, t, s, f, d):
-        self.getResults()
-        df = pd.DataFrame.from_dict(self.result_dict)
-        df['ID_Year'] = df['ID'].str.split('_').str[2].astype(int)
-        return df[(
-            (df['Type'] == 'Use') & (df['Year'].isin(range(r[0], r[1] + 1))) & (df['ID'].str.split('_').str[0] == t) & 
-            (df['ID'].str.split('_').str[1] == s) & (df['Fuel'] == f) & (df['Distance_bucket'] == d)
-        )][['Year', 'ID_Year', 'Num_Vehicles']]
+        df = self.filterResults(r, t, s, types=['Use'])
+        return df[(df['Fuel'] == f) & (df['Distance_bucket'] == d)][['Year', 'ID_Year', 'Num_Vehicles']]
     
     def use_trend(self, r):
-        self.getResults()
-        df = pd.DataFrame.from_dict(self.result_dict)
-
-        df = df[(df['Type'] == 'Use') & (df['Year'].isin(range(r[0], r[1] + 1)))]
-        if df.empty or len(df) == 0:
+        df = self.resultCube().trend(r, 'vehicles', by='Drivetrain', Cat='Fuel<br>Cost')
+        df = df[df['vehicles'] > 0].rename(columns={'vehicles': 'Num_Vehicles'}).reset_index(drop=True)
+        if df.empty:
             return {}
-        
-        df['Drivetrain'] = df['ID'].str.split('_').str[0]
-        df = df.groupby(['Year', 'Drivetrain']).sum().reset_index()
-
-        new_df = df[['Year', 'Drivetrain', 'Num_Vehicles']]
-        # new_df = new_df.sort_values(['Year'])
-        return new_df
+        return df
 
     def emissions_trend(self, r):
-        df = self.emissions_breakdown(r)
-        df = df.groupby(['Year']).sum().reset_index()[['Year', 'Emissions']]
-
-        df['Emissions_limit'] = [self.emissions_limit[yr] for yr in range(r[0], r[1] + 1)]
+        df = self.resultCube().trend(r, 'emissions', Cat='Fuel<br>Cost').rename(columns={'emissions': 'Emissions'})
+        df['Emissions_limit'] = [self.emissions_limit[yr] for yr in df['Year']]
         df['Emissions_limit'] = df['Emissions_limit'].round(0)
         return df
-        
@@ -0,0 +1,164 @@
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Per-variable bounds derived from the inputs, applied after the variables are created.
+# Only bounds that keep at least one optimal plan feasible:
+#  - buy/sell/use/total_distance are 0 outside the vehicle's life window or for incompatible fuel/bucket
+#  - a single total_distance never needs to exceed the demand of its (year, size, bucket) cell
+#  - use never exceeds ceil(cell demand / vehicle range), by the use_ub ceiling
+#  - vehicles from the start file can only sell what is left of them
+class BoundTightener:
+    def __init__(self, opti, num_ub, total_dist_ub):
+        self.opti = opti
+        self.arr = opti.arrays
+        self.num_ub = num_ub
+        self.total_dist_ub = total_dist_ub
+        self.loose = None
+        self.tight = None
+
+    def computeBounds(self):
+        opti, arr = self.opti, self.arr
+        years = np.array(arr.years)
+        fleet_start = np.array([opti.fleet_start.get(v, 0) for v in arr.vehicle_ids], dtype=float)
+
+        buy_v = opti.buy_ix
+        buy_ub = np.where(np.isin(arr.yrp[buy_v], years), self.num_ub, 0.0)
+
+        ends = arr.yearEnds()
+        sy, sv = opti.sell_ix
+        age = years[sy] - arr.yrp[sv]
+        sell_ub = np.where((age >= 0) & (ends[sy] - arr.yrp[sv] < 10) & (years[sy] < years[-1]), self.num_ub, 0.0)
+        prev = ~np.isin(arr.yrp[sv], years)
+        sell_ub[prev] = np.minimum(sell_ub[prev], fleet_start[sv[prev]])
+
+        uy, uv, uf, ud = opti.use_ix
+        age = years[uy] - arr.yrp[uv]
+        alive = (age >= 0) & (ends[uy] - arr.yrp[uv] < 10) & opti.compatible[uv, uf, ud] & (arr.size_idx[uv] >= 0)
+        cell = np.where(alive, arr.demand[uy, np.maximum(arr.size_idx[uv], 0), ud], 0.0)
+        rng = arr.range[uv]
+        td_ub = np.minimum(np.minimum(cell, self.num_ub * rng), self.total_dist_ub)
+        use_ub = np.minimum(np.ceil(cell / rng), self.num_ub)
+
+        bounds = {'buy': buy_ub, 'sell': sell_ub, 'total_distance': td_ub, 'use': use_ub}
+        if opti.fleet_state:
+            fy, fv = opti.fleet_var_ix
+            bounds['fleet'] = fleet_start[fv] + np.where(np.isin(arr.yrp[fv], years), self.num_ub, 0.0)
+        return bounds
+
+    def variables(self):
+        opti = self.opti
+        families = {
+            'buy': [opti.buy[v] for v in opti.buy_index],
+            'sell': [opti.sell[k] for k in opti.sell_index],
+            'total_distance': [opti.total_distance[k] for k in opti.use_index],
+            'use': [opti.use[k] for k in opti.use_index],
+        }
+        if opti.fleet_state:
+            families['fleet'] = [opti.fleet_var[k] for k in opti.fleet_var_index]
+        return families
+
+    def apply(self):
+        model = self.opti.model
+        model.update()
+        self.tight = self.computeBounds()
+        self.loose = {}
+        for name, xs in self.variables().items():
+            self.loose[name] = np.array(model.getAttr('UB', xs))
+            model.setAttr('UB', xs, np.minimum(self.loose[name], self.tight[name]).tolist())
+        for name, counts in self.report(relaxation=False).items():
+            logger.info('tightened %d of %d %s upper bounds, %d fixed at 0', counts['tightened'], counts['vars'], name, counts['fixed_zero'])
+
+    def rootRelaxation(self, loose=False):
+        # LP relaxation objective, optionally with the untightened upper bounds
+        model = self.opti.model
+        model.update()
+        relaxed = model.relax()
+        relaxed.setParam('OutputFlag', 0)
+        if loose:
+            rvars = relaxed.getVars()
+            pos = {v.index: i for i, v in enumerate(model.getVars())}
+            for name, xs in self.variables().items():
+                relaxed.setAttr('UB', [rvars[pos[x.index]] for x in xs], self.loose[name].tolist())
+        relaxed.optimize()
+        obj = relaxed.ObjVal
+        relaxed.dispose()
+        return obj
+
+    def report(self, relaxation=True):
+        report = {}
+        for name, tight in self.tight.items():
+            loose = self.loose[name]
+            report[name] = {
+                'vars': len(loose),
+                'tightened': int((tight < loose).sum()),
+                'fixed_zero': int(((tight <= 0) & (loose > 0)).sum()),
+            }
+        if relaxation:
+            before, after = self.rootRelaxation(loose=True), self.rootRelaxation()
+            report['root_relaxation'] = {'before': before, 'after': after, 'improvement': after - before, 'improvement_pct': 100 * (after - before) / abs(before) if before else 0.0}
+        return report
+
+# Vehicle u is dominated by w when w can replace u one-for-one in any plan at no extra cost or emissions:
+# same size and purchase year, w covers every bucket u covers with at least u's range, w costs no more
+# (and the cost profiles make a vehicle's life cycle cost increase with its price), and every fuel u can
+# run has a fuel on w with lower-or-equal per-km cost and emissions in every year of the life window.
+class DominancePruner:
+    def __init__(self, arrays):
+        self.arr = arrays
+        self.pruned = []
+
+    def lifeCycleMonotone(self):
+        # cost * (1 + insurance + maintenance up to age a - resale at a) must be increasing in cost for every sale age
+        arr = self.arr
+        ages = np.arange(1, 11)
+        upkeep = np.cumsum(arr.ageRate(arr.insure_rate, ages) + arr.ageRate(arr.maintain_rate, ages))
+        return bool(np.all(1 + upkeep - arr.ageRate(arr.resale_rate, ages) >= 0))
+
+    def dominance(self):
+        arr = self.arr
+        years = np.array(arr.years)
+        per_km_cost = arr.consumption[:, :, None] * arr.fuel_cost[None, :, :] # V x F x Y
+        per_km_emissions = arr.consumption[:, :, None] * arr.fuel_emissions[None, :, :]
+        monotone = self.lifeCycleMonotone()
+
+        # only vehicles bought inside the horizon, grouped by (size, purchase year)
+        candidates = np.nonzero(np.isin(arr.yrp, years) & (arr.size_idx >= 0))[0]
+        keys = arr.size_idx[candidates] * 10000 + arr.yrp[candidates]
+        pairs = []
+        for key in np.unique(keys):
+            group = candidates[keys == key]
+            if len(group) < 2:
+                continue
+            life = (years >= arr.yrp[group[0]]) & (years < arr.yrp[group[0]] + 10)
+            cost, emis = per_km_cost[group][:, :, life], per_km_emissions[group][:, :, life] # k x F x L
+            ok = arr.fuel_ok[group] # k x F
+
+            # fuel_cover[u, w, f, g]: fuel g of w is no worse than fuel f of u in every year
+            better = np.all((cost[None, :, None, :, :] <= cost[:, None, :, None, :]) & (emis[None, :, None, :, :] <= emis[:, None, :, None, :]), axis=-1)
+            better &= ok[None, :, None, :]
+            fuels_covered = np.all(better.any(axis=-1) | ~ok[:, None, :], axis=-1) # k x k
+
+            c, r, d = arr.cost[group], arr.range[group], arr.dist_idx[group]
+            cheaper = (c[None, :] <= c[:, None]) if monotone else (c[None, :] == c[:, None])
+            dominated = fuels_covered & cheaper & (r[None, :] >= r[:, None]) & (d[None, :] >= d[:, None])
+            np.fill_diagonal(dominated, False)
+
+            # mutual dominance (identical vehicles): only the later one is dominated
+            mutual = dominated & dominated.T
+            dominated &= ~(mutual & (np.arange(len(group))[None, :] > np.arange(len(group))[:, None]))
+            for u, w in zip(*np.nonzero(dominated)):
+                pairs.append((group[u], group[w]))
+        return pairs
+
+    def prune(self):
+        arr = self.arr
+        dominators = {}
+        for u, w in self.dominance():
+            dominators.setdefault(u, []).append(w)
+        self.pruned = []
+        for u in sorted(dominators):
+            self.pruned.append({'ID': arr.vehicle_ids[u], 'Dominated_by': [arr.vehicle_ids[w] for w in dominators[u]]})
+            logger.info('pruned %s, dominated by %s', arr.vehicle_ids[u], ', '.join(arr.vehicle_ids[w] for w in dominators[u]))
+        return [p['ID'] for p in self.pruned]
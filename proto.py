@@ -6,6 +6,13 @@ import io
 import pandas as pd
 # import os
 from opti_model import OptiModel
+from cache import LRUCache
+from jobs import JobManager
+from sessions import SessionRegistry, new_session_id
+from result_store import ResultStore
+from model_cache import ModelCache
+from solution_cache import SolutionCache
+import os
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
@@ -273,6 +280,7 @@ def parse_contents(contents, filename):
 
 # Define the layout
 app.layout = dbc.Container([
+    dcc.Store(id='session-id', storage_type='session'), # per browser tab, key into the session registry
     navbar, 
     html.Div(style=background_style),
 
@@ -306,6 +314,11 @@ app.layout = dbc.Container([
                                 info_mark_text='(Optional) If you have updated data upto a particular year and want to run the model for future years, please upload the file here.', 
                                 info_mark_id='upload-data'
                             ), 
+                            create_upload_component(
+                                'prior', 'Prior Plan', 'file-pencil.png', 
+                                info_mark_text='(Optional) An earlier output.csv. Its decisions in the years shared with this run are the starting plan of the solver.', 
+                                info_mark_id='upload-prior'
+                            ), 
                             # info_mark()
                         ], 
                         style={
@@ -397,6 +410,33 @@ app.layout = dbc.Container([
                         'padding': '6px',
                         'marginTop': '16px'
                     }),
+                    html.Div([
+                        html.Div([
+                            html.Div(['Stop early'], style={'fontWeight': '400'}),
+                            info_mark(info_text='(Optional) Stop before the runtime ends: at a relative MIP gap (%), an absolute gap ($), after N seconds without a better solution, or after N seconds without the best bound moving.', id='stop-rules'),
+                        ], style={'width': '180px', 'display': 'flex', 'alignItems': 'center', 'marginRight': '8px', 'marginLeft': '6px'}),
+                        *[
+                            dbc.Input(id=id, type='number', placeholder=placeholder, min=0, style={
+                                'width': '110px', 
+                                'marginRight': '6px', 
+                                'padding': '2px 10px', 
+                            })
+                            for id, placeholder in [
+                                ('input-target-gap', 'gap %'), 
+                                ('input-abs-gap', 'gap $'), 
+                                ('input-no-improvement', 'no impr. s'), 
+                                ('input-bound-stagnation', 'bound s'), 
+                            ]
+                        ],
+                    ], style={
+                        'display': 'flex', 
+                        'flexDirection': 'row',
+                        'alignItems': 'center',
+                        'borderRadius': '5px',
+                        'backgroundColor': 'rgb(236 254 235)',
+                        'padding': '6px',
+                        'marginTop': '8px'
+                    }),
                     html.Div([
                         create_button(text='Set Runtime', id='set-params-btn'), 
                         html.Div(id='set-params-message', style={'fontSize': '14px', 'marginLeft': '10px',})
@@ -406,6 +446,8 @@ app.layout = dbc.Container([
                     create_button(text='Solve', id='solve-btn'), 
                     dbc.Progress(id="solve-progress", value=0, max=100, striped=True, animated=True, style={"display": "none"}), 
                     dcc.Interval(id="progress-interval", interval=2000, n_intervals=0, disabled=True), 
+                    dcc.Store(id='solve-job'), # {'job_id'} of the running solve
+                    dcc.Store(id='solve-done'), # {'job_id'} once it finished
                 ], style={'display': 'flex', 'flexDirection': 'row', 'alignItems': 'center', 'marginTop': '6px'})
             ], id='input-content', style=input_content_style),
         ], id='input-container', className="d-flex justify-content-center align-items-center", style={'paddingTop': '30px'}),
@@ -564,8 +606,89 @@ def toggle_content(n_clicks, button_text):
     button_style['fontWeight'] = '500'
     return inp_wrapper_style, out_wrapper_style, "Output", button_style
 
-model = None
-uploaded_data = {} # *addition*
+FIGURE_CACHE_SIZE = 256
+figure_cache = LRUCache(FIGURE_CACHE_SIZE)
+# solves, job status and session inputs shared by every worker process (gunicorn wsgi:server)
+RESULT_STORE_PATH = os.environ.get('FLEET_RESULT_STORE', os.path.join('data', 'results.sqlite'))
+store = ResultStore(RESULT_STORE_PATH)
+# built models by input content and build options, reloaded on Create instead of built again
+MODEL_CACHE_DIR = os.environ.get('FLEET_MODEL_CACHE', os.path.join('data', 'models'))
+model_cache = ModelCache(MODEL_CACHE_DIR)
+# finished solves by model and solver parameters, replayed instead of solved again
+SOLUTION_CACHE_DIR = os.environ.get('FLEET_SOLUTION_CACHE', os.path.join('data', 'solutions'))
+solution_cache = SolutionCache(SOLUTION_CACHE_DIR)
+SOLVE_WORKERS = 2 # concurrent background solves per worker process
+WEB_WORKERS = int(os.environ.get('FLEET_WORKERS', 1)) # dashboard worker processes, set by gunicorn.conf.py
+# Gurobi threads per solve: every worker process may run SOLVE_WORKERS solves at once, without oversubscribing the cores
+SOLVE_THREADS = max((os.cpu_count() or 1) // (WEB_WORKERS * SOLVE_WORKERS), 1)
+jobs = JobManager(max_workers=SOLVE_WORKERS, store=store, solutions=solution_cache)
+
+def job_running(job_id):
+    status = jobs.status(job_id) if job_id else None
+    return status is not None and status['status'] in ('queued', 'running')
+
+def solve_running(session):
+    # a solve of the session queued or running in any worker process, as the store says
+    return job_running(store.sessionJob(session.id))
+
+# inputs, model and results of each browser session
+MAX_SESSIONS = 32
+SESSION_MEMORY_BYTES = 4 * 1024 ** 3
+# sessions whose model a solve of this process is using are kept
+sessions = SessionRegistry(MAX_SESSIONS, SESSION_MEMORY_BYTES, in_use=lambda session: job_running(session.job_id), on_dispose=lambda session: jobs.forget(session.job_id))
+
+def session_inputs(session):
+    # the session's inputs as stored, copied again once another worker process has stored newer ones
+    version = store.inputsVersion(session.id)
+    if version != session.inputs_version:
+        session.inputs, session.inputs_version = store.loadInputs(session.id), version
+    return session.inputs
+
+def session_model(session_id):
+    # the session's model with the stored parameters; built again from the stored inputs if this worker process
+    # hasn't got it or built it from older inputs
+    session = sessions.get(session_id)
+    if session is None:
+        return None
+    inputs = session_inputs(session)
+    params = store.loadParams(session_id)
+    if params is None:
+        return None
+    if session.model is None or session.model_inputs != session.inputs_version:
+        if not all(k in inputs for k in ['demand', 'vehicles', 'fuels', 'vehicles_fuels', 'carbon_emissions', 'cost_profiles']):
+            return None
+        sessions.setModel(session_id, build_model(inputs))
+        session.model_inputs = session.inputs_version
+    session.model.setParams(**params, threads=SOLVE_THREADS)
+    return session.model
+
+def build_model(uploaded_data):
+    # instantiate model
+    model = OptiModel(
+        uploaded_data['demand'],
+        uploaded_data['vehicles'],
+        uploaded_data['fuels'],
+        uploaded_data['vehicles_fuels'],
+        uploaded_data['carbon_emissions'],
+        uploaded_data['cost_profiles'],
+        uploaded_data.get('start'), 
+        sparse=True, 
+        tighten_bounds=True, 
+    )
+
+    # add decision variables, constraints and objective, or read them back from the model cache
+    model.create(cache=model_cache)
+    return model
+
+# Callback to give each browser session its id
+@app.callback(
+    Output('session-id', 'data'),
+    Input('session-id', 'data'),
+)
+def init_session(session_id):
+    if session_id:
+        return dash.no_update
+    return new_session_id()
 
 # Callback to handle the submit button
 @app.callback(
@@ -578,9 +701,10 @@ uploaded_data = {} # *addition*
     State('upload-vehicles-fuels', 'filename'),
     State('upload-cost-profiles', 'filename'),
     State('upload-carbon-emissions', 'filename'),
-    State('upload-start', 'filename')
+    State('upload-start', 'filename'),
+    State('upload-prior', 'filename'),
 )
-def handle_submit(n_clicks, demand, fuels, vehicles, vehicles_fuels, cost_profiles, carbon_emissions, start):
+def handle_submit(n_clicks, demand, fuels, vehicles, vehicles_fuels, cost_profiles, carbon_emissions, start, prior):
     if n_clicks is None:
         return "", []
 
@@ -603,22 +727,43 @@ def handle_submit(n_clicks, demand, fuels, vehicles, vehicles_fuels, cost_profil
         options.append({'label': 'Carbon Emissions', 'value': 'carbon_emissions'})
     if start:
         options.append({'label': 'Updated Data', 'value': 'start'})
+    if prior:
+        options.append({'label': 'Prior Plan', 'value': 'prior'})
     return 'Click on "Create" to create model.', options
 
 @app.callback(
     Output('set-params-message', 'children'),
     Input('set-params-btn', 'n_clicks'),
     State('input-time-limit', 'value'), 
+    State('input-target-gap', 'value'), 
+    State('input-abs-gap', 'value'), 
+    State('input-no-improvement', 'value'), 
+    State('input-bound-stagnation', 'value'), 
+    State('session-id', 'data'), 
 )
-def handle_set_params(n_clicks, time_limit):
+def handle_set_params(n_clicks, time_limit, target_gap, abs_gap, no_improvement, bound_stagnation, session_id):
     if n_clicks is None:
         return ""
     if time_limit is None:
         return "Please set runtime."
+    session = sessions.get(session_id)
+    if session is None:
+        return "Please create the model."
+    if solve_running(session):
+        return 'A solve is still running, set the parameters once it is done.'
 
     # global disable_solve
     # disable_solve = True
-    model.setParams(time_limit=time_limit)
+    params = dict(
+        time_limit=time_limit, 
+        target_gap=target_gap / 100 if target_gap is not None else None, 
+        abs_gap=abs_gap, 
+        no_improvement=no_improvement, 
+        bound_stagnation=bound_stagnation, 
+    )
+    store.saveParams(session_id, params) # the worker process that gets the solve request may build the model again
+    if session_model(session_id) is None:
+        return "Please create the model."
     return 'Click on "Solve" to start optimization.'
 
 @app.callback(
@@ -629,6 +774,7 @@ def handle_set_params(n_clicks, time_limit):
     Output('file-name-cost-profiles', 'children'),
     Output('file-name-carbon-emissions', 'children'),
     Output('file-name-start', 'children'),
+    Output('file-name-prior', 'children'),
     Input('upload-demand', 'contents'),
     Input('upload-fuels', 'contents'),
     Input('upload-vehicles', 'contents'),
@@ -636,34 +782,41 @@ def handle_set_params(n_clicks, time_limit):
     Input('upload-cost-profiles', 'contents'),
     Input('upload-carbon-emissions', 'contents'),
     Input('upload-start', 'contents'),
+    Input('upload-prior', 'contents'),
     State('upload-demand', 'filename'),
     State('upload-fuels', 'filename'),
     State('upload-vehicles', 'filename'),
     State('upload-vehicles-fuels', 'filename'),
     State('upload-cost-profiles', 'filename'),
     State('upload-carbon-emissions', 'filename'),
-    State('upload-start', 'filename')
+    State('upload-start', 'filename'),
+    State('upload-prior', 'filename'),
+    State('session-id', 'data'),
 )
 def update_output(
-    demand_contents, fuels_contents, vehicles_contents, vehicles_fuels_contents, cost_profiles_contents, carbon_emissions_contents, start_contents, 
-    demand_filename, fuels_filename, vehicles_filename, vehicles_fuels_filename, cost_profiles_filename, carbon_emissions_filename, start_filename
+    demand_contents, fuels_contents, vehicles_contents, vehicles_fuels_contents, cost_profiles_contents, carbon_emissions_contents, start_contents, prior_contents, 
+    demand_filename, fuels_filename, vehicles_filename, vehicles_fuels_filename, cost_profiles_filename, carbon_emissions_filename, start_filename, prior_filename, 
+    session_id
 ):
-    global uploaded_data
+    session = sessions.get(session_id)
+    uploaded_data = session_inputs(session) if session is not None else {}
     for content, filename, key in zip(
         [demand_contents, fuels_contents, vehicles_contents, vehicles_fuels_contents,
-         cost_profiles_contents, carbon_emissions_contents, start_contents],
+         cost_profiles_contents, carbon_emissions_contents, start_contents, prior_contents],
         [demand_filename, fuels_filename, vehicles_filename, vehicles_fuels_filename,
-         cost_profiles_filename, carbon_emissions_filename, start_filename],
-        ['demand', 'fuels', 'vehicles', 'vehicles_fuels', 'cost_profiles', 'carbon_emissions', 'start']
+         cost_profiles_filename, carbon_emissions_filename, start_filename, prior_filename],
+        ['demand', 'fuels', 'vehicles', 'vehicles_fuels', 'cost_profiles', 'carbon_emissions', 'start', 'prior']
     ):
         if content is not None:
             df = parse_contents(content, filename)
             if df is not None:
                 uploaded_data[key] = df
+    if session is not None and any(c is not None for c in [demand_contents, fuels_contents, vehicles_contents, vehicles_fuels_contents, cost_profiles_contents, carbon_emissions_contents, start_contents, prior_contents]):
+        session.inputs_version = store.saveInputs(session_id, uploaded_data)
 
     return (demand_filename or '', fuels_filename or '', vehicles_filename or '', 
             vehicles_fuels_filename or '', cost_profiles_filename or '', 
-            carbon_emissions_filename or '', start_filename or '')
+            carbon_emissions_filename or '', start_filename or '', prior_filename or '')
 
 # Callback to toggle the overlay
 @app.callback(
@@ -679,12 +832,17 @@ def toggle_inputs_overlay(open_click, close_click, is_open):
 # Callback to display the data table
 @app.callback(
     Output('inputs-table-container', 'children'),
-    Input('inputs-dropdown', 'value')
+    Input('inputs-dropdown', 'value'),
+    State('session-id', 'data'),
 )
-def display_table(selected_filename):
-    if selected_filename is None:
+def display_table(selected_filename, session_id):
+    session = sessions.get(session_id)
+    if selected_filename is None or session is None:
+        return ''
+    inputs = session_inputs(session)
+    if selected_filename not in inputs:
         return ''
-    df = uploaded_data[selected_filename]
+    df = inputs[selected_filename]
     return dash_table.DataTable(data=df.to_dict('records'), page_size=5)
 
 @app.callback(
@@ -722,47 +880,71 @@ def disable_solve_button(params_n_clicks, params_disabled, time_limit):
 @app.callback(
     Output('model-message', 'children'), 
     Input('create-btn', 'n_clicks'), 
+    State('session-id', 'data'),
 )
-def create_model(n_clicks,):
+def create_model(n_clicks, session_id):
     if n_clicks is None:
         return ''
-        
-    global model, uploaded_data
-    # instantiate model
-    model = OptiModel(
-        uploaded_data['demand'],
-        uploaded_data['vehicles'],
-        uploaded_data['fuels'],
-        uploaded_data['vehicles_fuels'],
-        uploaded_data['carbon_emissions'],
-        uploaded_data['cost_profiles'],
-        uploaded_data.get('start'), 
-    )
 
-    # add decision variables, constraints and objective
-    model.create()
+    session = sessions.get(session_id)
+    if session is None:
+        return ''
+    if solve_running(session):
+        return 'A solve is still running for this model.'
+    sessions.setModel(session_id, build_model(session_inputs(session)))
+    session.model_inputs = session.inputs_version
     return 'Model created. Set model runtime.'
 
-# Callback to show the output content when the Solve button is clicked
+# Callback to start the solve as a background job when the Solve button is clicked
+@app.callback(
+    Output('solve-job', 'data'),
+    Input('solve-btn', 'n_clicks'),
+    State('session-id', 'data'),
+    State('solve-done', 'data'),
+)
+def start_solve(n_clicks, session_id, done):
+    session = sessions.get(session_id)
+    if n_clicks is None or session is None or solve_running(session):
+        return dash.no_update
+    model = session_model(session_id)
+    if model is None:
+        return dash.no_update
+
+    # warm start from the uploaded prior plan, else from the last solve of this browser session, else from the best
+    # cached plan of the model (set by the solve itself), else from the greedy plan
+    plan = session.inputs.get('prior')
+    if plan is None and done:
+        previous = jobs.result(done['job_id'])
+        plan = previous[0] if previous is not None else None
+    if plan is not None:
+        model.warmStart(plan)
+    elif solution_cache.best(model) is None:
+        model.greedyStart()
+    jobs.forget(session.job_id) # the previous solve is served from the store from now on
+    session.job_id = jobs.submit(model, session_id)
+    store.saveSessionJob(session_id, session.job_id)
+    return {'job_id': session.job_id}
+
+# Callback to show the output content once the solve job is done
 @app.callback(
     Output('decision-vars-container', 'children'), 
-    Output('figure-best-total', 'children'), 
     Output('time-slider', 'min'), 
     Output('time-slider', 'max'), 
     Output('time-slider', 'marks'), 
     Output('time-slider', 'value'),
-    Input('solve-btn', 'n_clicks'), 
+    Input('solve-done', 'data'), 
+    State('session-id', 'data'),
 )
-def solve_model_and_show_output_content(n_clicks):
-    global model
-    if n_clicks is None or model is None:
-        return {}, '-', 0, 0, {}, []
+def solve_model_and_show_output_content(done, session_id):
+    solved = jobs.result(done['job_id']) if done else None
+    if solved is None:
+        return {}, 0, 0, {}, []
 
-    result, best_bound, ymin, ymax = model.solve() # dictionary
+    result, best_bound, ymin, ymax = solved # dictionary
+    sessions.evict(keep=session_id) # the results add to the session's memory
     result_df = pd.DataFrame.from_dict(result)
     return (
         dash_table.DataTable(data=result_df.to_dict('records'), page_size=10), 
-        f'*Best Bound: {best_bound/ 1e6: .2f}M', 
         ymin, ymax, {i: str(i) for i in range(ymin, ymax+1)}, [ymin, ymax]
     )
 
@@ -774,20 +956,29 @@ def solve_model_and_show_output_content(n_clicks):
     Output('figure-ins', 'children'),
     Output('figure-mnt', 'children'),
     Input('time-slider', 'value'), 
+    Input('progress-interval', 'n_intervals'),
+    State('solve-job', 'data'),
+    State('solve-done', 'data'),
+    State('session-id', 'data'),
 )
-def update_subcosts(selected_range):
-    global model
-    if model is None:
-        return ['-'], ['-'], ['-'], ['-'], ['-'], ['-']
+def update_subcosts(selected_range, n_intervals, job, done, session_id):
+    status = jobs.status(job['job_id']) if job else None
+    if status is not None and status['status'] in ('queued', 'running'):
+        # incumbent of the running solve
+        incumbent = status['incumbent']
+        return [f'{incumbent/ 1e6: .2f}M' if incumbent is not None else '-'], ['-'], ['-'], ['-'], ['-'], ['-']
+    with sessions.using(session_id): # the model isn't disposed while its totals are read
+        model = jobs.model(done['job_id']) if done else None
+        if model is None or model.result_dict is None or not selected_range:
+            return ['-'], ['-'], ['-'], ['-'], ['-'], ['-']
+        cost = model.resultCube().total(selected_range, 'cost', by='Cat')
     
-    cost_df = model.cost_breakdown(selected_range, 'All', 'All')
-    cost_df = cost_df.groupby(['Cat']).sum()
     buy_cost, sell_rev, fuel_cost, ins_cost, mnt_cost = (
-        cost_df.loc['Buy<br>Cost', 'Cost'], 
-        cost_df.loc['Sell<br>Revenue', 'Cost'], 
-        cost_df.loc['Fuel<br>Cost', 'Cost'], 
-        cost_df.loc['Insurance<br>Cost', 'Cost'], 
-        cost_df.loc['Maintenance<br>Cost', 'Cost']
+        cost['Buy<br>Cost'], 
+        cost['Sell<br>Revenue'], 
+        cost['Fuel<br>Cost'], 
+        cost['Insurance<br>Cost'], 
+        cost['Maintenance<br>Cost']
     )
     total_cost = buy_cost + fuel_cost + ins_cost + mnt_cost - sell_rev
     return [f'{total_cost/ 1e6: .2f}M'], [f'{buy_cost/ 1e6: .2f}M'], [f'{sell_rev/ 1e6: .2f}M'], [f'{fuel_cost/ 1e6: .2f}M'], [f'{ins_cost/ 1e6: .2f}M'], [f'{mnt_cost/ 1e6: .2f}M']
@@ -799,27 +990,35 @@ def update_subcosts(selected_range):
     Output('solve-progress', 'animated'), 
     Output('progress-interval', 'disabled'), 
     Output('progress-interval', 'n_intervals'),
+    Output('figure-best-total', 'children'), 
+    Output('solve-done', 'data'),
     Input('progress-interval', 'n_intervals'),
-    Input('solve-btn', 'n_clicks'),
+    Input('solve-job', 'data'),
     # prevent_initial_call=True, 
 )
-def update_progress(n_intervals, n_clicks):
+def update_progress(n_intervals, job):
     base_style = {
         # 'marginTop': '8px', 
         'width': '100%', 
         'marginLeft': '20px',
     }
 
-    if n_clicks is None: 
-        return 0, '', {**base_style, 'display': 'none'}, False, True, 0
-        
-    time_limit = model.runtime()
-    progress = min(100, n_intervals * (2000/ (time_limit * 1000)) * 100) 
-    if progress >= 100:
-        return 100, '100%', {**base_style, 'display': 'block'}, False, True, 0
-    
+    status = jobs.status(job['job_id']) if job else None
+    if status is None: 
+        return 0, '', {**base_style, 'display': 'none'}, False, True, 0, '-', None
+
+    bound = f'*Best Bound: {status["bound"]/ 1e6: .2f}M' if status['bound'] is not None else '-'
+    if status['status'] == 'failed':
+        return 100, 'Failed', {**base_style, 'display': 'block'}, False, True, 0, status['error'], job
+    if status['status'] == 'done':
+        return 100, f'100% ({status["stop_reason"]})', {**base_style, 'display': 'block'}, False, True, 0, bound, job
+
+    # solver telemetry: elapsed share of the time limit, with the current MIP gap
+    progress = min(99, 100 * status['elapsed'] / status['time_limit']) if status['time_limit'] else 0
     progress_text = f'{int(progress)}%' if progress >= 5 else ''
-    return progress, progress_text, {**base_style, 'display': 'block'}, True, False, n_intervals
+    if status['gap'] is not None:
+        progress_text += f' (gap {100 * status["gap"]:.1f}%, {status["nodes"]} nodes)'
+    return progress, progress_text, {**base_style, 'display': 'block'}, True, False, n_intervals, bound, dash.no_update
     
 # Callback to toggle the overlay
 @app.callback(
@@ -903,12 +1102,27 @@ def link_type_and_fuel(selected_type):
     Input('size-filter', 'value'),
     Input('fuel-filter', 'value'),
     Input('dist-filter', 'value'),
-    Input('chart-dropdown', 'value')
+    Input('chart-dropdown', 'value'),
+    State('solve-done', 'data'),
+    State('session-id', 'data'),
 )
-def update_chart(selected_range, selected_type, selected_size, selected_fuel, selected_dist, selected_variable):
-    if not selected_variable:
+def update_chart(selected_range, selected_type, selected_size, selected_fuel, selected_dist, selected_variable, done, session_id):
+    if not selected_variable or not done:
         return {}
-        
+
+    # the job id identifies the solve in every worker process
+    key = (done['job_id'], selected_variable, tuple(selected_range or ()), selected_type, selected_size, selected_fuel, selected_dist)
+    fig = figure_cache.get(key)
+    if fig is None:
+        with sessions.using(session_id): # the model isn't disposed while the chart is built
+            model = jobs.model(done['job_id'])
+            if model is None:
+                return {}
+            fig = build_chart(model, selected_range, selected_type, selected_size, selected_fuel, selected_dist, selected_variable)
+        figure_cache.put(key, fig)
+    return fig
+
+def build_chart(model, selected_range, selected_type, selected_size, selected_fuel, selected_dist, selected_variable):
     fig = None
 
     if selected_variable == 'cost': 
@@ -1111,6 +1325,29 @@ def update_chart(selected_range, selected_type, selected_size, selected_fuel, se
             fig = update_bgcolor(fig)
     return fig
 
+# figure cache hit/miss counters
+@app.server.route('/stats/figure-cache')
+def figure_cache_stats():
+    return figure_cache.stats()
+
+@app.server.route('/stats/sessions')
+def session_stats():
+    return sessions.stats()
+
+@app.server.route('/stats/model-cache')
+def model_cache_stats():
+    return model_cache.stats()
+
+@app.server.route('/stats/solution-cache')
+def solution_cache_stats():
+    return solution_cache.stats()
+
+@app.server.route('/stats/result-store')
+def result_store_stats():
+    return store.stats()
+
+# WSGI entry point for production, see wsgi.py
+server = app.server
 
 # Run the app
 if __name__ == '__main__':
@@ -0,0 +1,147 @@
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from cache import LRUCache
+from model_cache import BUILD_OPTIONS
+from opti_model import OptiModel
+
+INPUT_KEYS = ['demand', 'vehicles', 'fuels', 'vehicles_fuels', 'carbon_emissions', 'cost_profiles', 'start']
+RESTORED_CACHE_SIZE = 8 # solved models rebuilt from the store, per process
+EXPIRE_SECONDS = 24 * 3600 # sessions and jobs not updated for this long are deleted
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (session_id TEXT PRIMARY KEY, inputs BLOB, inputs_version TEXT, params BLOB, job_id TEXT, updated REAL);
+CREATE TABLE IF NOT EXISTS jobs (job_id TEXT PRIMARY KEY, session_id TEXT, status BLOB, updated REAL);
+CREATE TABLE IF NOT EXISTS solves (solve_id TEXT PRIMARY KEY, session_id TEXT, created REAL, result BLOB, state BLOB);
+"""
+
+# Solves, job status and session inputs in one SQLite file shared by every dashboard worker process, so a
+# request can land on any worker: a worker that didn't run a solve serves its table, KPIs and charts from
+# here. Values are pickled; the file is only ever written by the dashboard itself. The store is the source
+# of truth for a session's inputs, parameters and current solve job; worker processes only keep copies.
+class ResultStore:
+    def __init__(self, path, max_solves=256):
+        self.path = path
+        self.max_solves = max_solves # oldest solves are deleted beyond this
+        self.restored = LRUCache(RESTORED_CACHE_SIZE)
+        self.lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        db = self.connect()
+        try:
+            db.execute('PRAGMA journal_mode=WAL') # readers don't block the writer
+            db.executescript(SCHEMA)
+            columns = [row[1] for row in db.execute('PRAGMA table_info(sessions)')]
+            for column in ('inputs_version', 'job_id'): # a store file written before these columns
+                if column not in columns:
+                    db.execute(f'ALTER TABLE sessions ADD COLUMN {column} TEXT')
+        finally:
+            db.close()
+
+    def connect(self):
+        # one connection per call: connections can't be shared between threads
+        return sqlite3.connect(self.path, timeout=30)
+
+    def fetch(self, query, *args):
+        db = self.connect()
+        try:
+            return db.execute(query, args).fetchone()
+        finally:
+            db.close()
+
+    def write(self, query, *args):
+        db = self.connect()
+        try:
+            with db:
+                db.execute(query, args)
+        finally:
+            db.close()
+
+    def saveInputs(self, session_id, inputs):
+        # returns the version of the inputs, their digest, to tell whether a worker's copy is current
+        blob = pickle.dumps(inputs)
+        version = hashlib.sha1(blob).hexdigest()
+        self.write('INSERT INTO sessions (session_id, inputs, inputs_version, updated) VALUES (?, ?, ?, ?) ON CONFLICT(session_id) DO UPDATE SET inputs = excluded.inputs, inputs_version = excluded.inputs_version, updated = excluded.updated',
+                   session_id, blob, version, time.time())
+        return version
+
+    def inputsVersion(self, session_id):
+        row = self.fetch('SELECT inputs_version FROM sessions WHERE session_id = ?', session_id)
+        return row[0] if row is not None else None
+
+    def loadInputs(self, session_id):
+        row = self.fetch('SELECT inputs FROM sessions WHERE session_id = ?', session_id)
+        return pickle.loads(row[0]) if row is not None and row[0] is not None else {}
+
+    def saveParams(self, session_id, params):
+        self.write('INSERT INTO sessions (session_id, params, updated) VALUES (?, ?, ?) ON CONFLICT(session_id) DO UPDATE SET params = excluded.params, updated = excluded.updated',
+                   session_id, pickle.dumps(params), time.time())
+
+    def loadParams(self, session_id):
+        row = self.fetch('SELECT params FROM sessions WHERE session_id = ?', session_id)
+        return pickle.loads(row[0]) if row is not None and row[0] is not None else None
+
+    def saveSessionJob(self, session_id, job_id):
+        # the session's current solve job, whichever worker process runs it
+        self.write('INSERT INTO sessions (session_id, job_id, updated) VALUES (?, ?, ?) ON CONFLICT(session_id) DO UPDATE SET job_id = excluded.job_id, updated = excluded.updated',
+                   session_id, job_id, time.time())
+
+    def sessionJob(self, session_id):
+        row = self.fetch('SELECT job_id FROM sessions WHERE session_id = ?', session_id)
+        return row[0] if row is not None else None
+
+    def saveJobStatus(self, job_id, status, session_id=None):
+        self.write('INSERT INTO jobs (job_id, session_id, status, updated) VALUES (?, ?, ?, ?) ON CONFLICT(job_id) DO UPDATE SET status = excluded.status, updated = excluded.updated',
+                   job_id, session_id, pickle.dumps(status), time.time())
+
+    def jobStatus(self, job_id):
+        row = self.fetch('SELECT status FROM jobs WHERE job_id = ?', job_id)
+        return pickle.loads(row[0]) if row is not None else None
+
+    def saveSolve(self, solve_id, model, result, session_id=None):
+        # result is the (result_dict, best bound, first year, last year) tuple of OptiModel.solve()
+        inputs = dict(zip(INPUT_KEYS, [model.demand_df, model.vehicles_df, model.fuels_df, model.vehicles_fuels_df, model.carbon_emissions_df, model.cost_profiles_df, model.start_df]))
+        state = {'inputs': inputs, 'options': {k: getattr(model, k) for k in BUILD_OPTIONS}, **model.resultState()}
+        with self.lock:
+            db = self.connect()
+            try:
+                with db:
+                    db.execute('INSERT OR REPLACE INTO solves (solve_id, session_id, created, result, state) VALUES (?, ?, ?, ?, ?)',
+                               (solve_id, session_id, time.time(), pickle.dumps(result), pickle.dumps(state)))
+                    db.execute('DELETE FROM solves WHERE solve_id NOT IN (SELECT solve_id FROM solves ORDER BY created DESC LIMIT ?)', (self.max_solves,))
+                    db.execute('DELETE FROM sessions WHERE updated < ?', (time.time() - EXPIRE_SECONDS,))
+                    db.execute('DELETE FROM jobs WHERE updated < ?', (time.time() - EXPIRE_SECONDS,))
+            finally:
+                db.close()
+
+    def result(self, solve_id):
+        row = self.fetch('SELECT result FROM solves WHERE solve_id = ?', solve_id)
+        return pickle.loads(row[0]) if row is not None else None
+
+    def model(self, solve_id):
+        # the solved model with its inputs loaded and results restored, for the KPIs and charts; None if unknown
+        model = self.restored.get(solve_id)
+        if model is not None:
+            return model
+        row = self.fetch('SELECT state FROM solves WHERE solve_id = ?', solve_id)
+        if row is None:
+            return None
+        state = pickle.loads(row[0])
+        inputs = state['inputs']
+        model = OptiModel(*[inputs[k] for k in INPUT_KEYS], **state['options'])
+        model.model.dispose() # never optimized, only the inputs are needed
+        model.loadInputs()
+        model.restoreResults(state)
+        self.restored.put(solve_id, model)
+        return model
+
+    def stats(self):
+        db = self.connect()
+        try:
+            counts = {table: db.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0] for table in ('sessions', 'jobs', 'solves')}
+        finally:
+            db.close()
+        return {'path': self.path, 'bytes': os.path.getsize(self.path), **counts, 'restored': self.restored.stats()}
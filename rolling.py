@@ -0,0 +1,93 @@
+import logging
+import time
+import pandas as pd
+from gurobipy import GRB
+from inputs import start_ending
+from model_cache import BUILD_OPTIONS
+
+logger = logging.getLogger(__name__)
+
+WINDOW = 4 # years solved in detail per window
+OVERLAP = 1 # years of a window solved again in the next one
+LOOKAHEAD = 2 # years after a window with integrality relaxed
+
+def window_starts(n_years, window, step):
+    # positions of the first year of each window: every one keeps `step` years or more
+    return list(range(0, max(n_years - window, 0) + 1, step))
+
+# Rolling horizon: each window solves `window` years in detail plus `lookahead` years with integer variables
+# relaxed, keeps the decisions of its first window - overlap years and moves on. The kept rows are the start
+# file of the next window, so its starting fleet comes from startFleet() as for an uploaded start file.
+# Windows start every window - overlap years; the last one runs to the end of the horizon, up to
+# window - overlap - 1 years longer than the others, and keeps everything.
+class RollingHorizon:
+    def __init__(self, opti, window=WINDOW, overlap=OVERLAP, lookahead=LOOKAHEAD):
+        if window - overlap < 1:
+            raise ValueError(f'window ({window}) must be longer than the overlap ({overlap})')
+        if overlap + lookahead < 1:
+            raise ValueError('overlap or lookahead must be at least 1: the last year of a window sells off its fleet')
+        if opti.time_buckets is not None:
+            raise ValueError('rolling horizon windows are whole years, not time buckets')
+        self.opti = opti
+        self.window = window
+        self.overlap = overlap
+        self.lookahead = lookahead
+        self.windows = [] # per window: first and last year solved, last year kept, seconds, objective, gap, stop reason
+
+    def windowInputs(self, last, start):
+        # the input frames up to year `last`, with the kept rows as start file
+        opti = self.opti
+        vehicles = opti.vehicles_df[opti.vehicles_df['Year'] <= last]
+        return (
+            opti.demand_df[opti.demand_df['Year'] <= last],
+            vehicles,
+            opti.fuels_df[opti.fuels_df['Year'] <= last],
+            opti.vehicles_fuels_df[opti.vehicles_fuels_df['ID'].isin(vehicles['ID'])],
+            opti.carbon_emissions_df[opti.carbon_emissions_df['Year'] <= last],
+            opti.cost_profiles_df,
+            start,
+        )
+
+    def relax(self, sub, first_relaxed):
+        # continuous buy/sell/use from year first_relaxed on
+        families = [(sub.buy, lambda k: sub.yrp[k]), (sub.sell, lambda k: k[0]), (sub.use, lambda k: k[0])]
+        xs = [x for family, year in families for k, x in family.items() if year(k) >= first_relaxed]
+        sub.model.setAttr('VType', xs, [GRB.CONTINUOUS] * len(xs))
+
+    def run(self):
+        from opti_model import OptiModel
+        opti = self.opti
+        years = opti.years
+        step = self.window - self.overlap
+        firsts = window_starts(len(years), self.window, step)
+        time_limit = opti.model.Params.TimeLimit / len(firsts)
+        options = {k: getattr(opti, k) for k in BUILD_OPTIONS} # time_buckets is None
+
+        kept = []
+        start = opti.start_df
+        for n, fi in enumerate(firsts):
+            final = n == len(firsts) - 1
+            last_detailed = years[-1] if final else years[fi + self.window - 1]
+            last = years[min(fi + self.window + self.lookahead, len(years)) - 1] if not final else years[-1]
+            keep_until = years[-1] if final else years[firsts[n + 1] - 1]
+            t0 = time.time()
+            sub = OptiModel(*self.windowInputs(last, start), **options)
+            sub.model.setParam('OutputFlag', 0)
+            sub.create()
+            sub.setParams(time_limit)
+            if last > last_detailed:
+                self.relax(sub, last_detailed + 1)
+            sub.solve()
+            if sub.model.SolCount == 0:
+                self.windows.append((years[fi], last, keep_until, time.time() - t0, None, None, sub.stop_reason))
+                return None
+            self.windows.append((years[fi], last, keep_until, time.time() - t0, sub.objVal(), sub.optGap(), sub.stop_reason))
+            logger.info('rolling horizon %d-%d: kept to %d, %s', years[fi], last, keep_until, sub.stop_reason)
+
+            plan = pd.DataFrame(sub.result_dict)
+            plan = plan[plan['Year'] <= keep_until]
+            kept.append(plan)
+            start = pd.concat(([opti.start_df] if opti.start_df is not None else []) + kept, ignore_index=True).sort_values('Year', kind='stable')
+            start = start_ending(start, keep_until, opti.vehicles_df) # the next window starts right after keep_until
+            sub.model.dispose()
+        return pd.concat(kept, ignore_index=True)
@@ -0,0 +1,119 @@
+import itertools
+import logging
+import os
+import time
+import numpy as np
+import pandas as pd
+from worker_pool import process_pool, worker
+
+logger = logging.getLogger(__name__)
+
+FUEL_SHOCKS = (-1.0, 0.0, 1.0) # multiples of a fuel's cost uncertainty band
+CARBON_TIGHTENING = (0.0, 0.1) # share cut from every year's carbon limit
+DEMAND_GROWTH = (0.0, 0.02) # extra yearly demand growth, compounded from the first year
+THREADS_PER_JOB = 2 # Gurobi threads per pool worker
+TIME_LIMIT = 60 # seconds per scenario solve
+
+def scenario_grid(fuel_shocks=FUEL_SHOCKS, carbon_tightening=CARBON_TIGHTENING, demand_growth=DEMAND_GROWTH):
+    # every combination, the same shock for all fuels
+    return [
+        {'name': f'fuel {f:+g}, carbon -{c:g}, demand +{g:g}', 'fuel_shock': f, 'carbon_tightening': c, 'demand_growth': g}
+        for f, c, g in itertools.product(fuel_shocks, carbon_tightening, demand_growth)
+    ]
+
+def scenario_samples(n, fuels, carbon_tightening=(0.0, 0.2), demand_growth=(0.0, 0.04), seed=0):
+    # n random scenarios: a shock per fuel, uniform within its band, and uniform carbon and demand changes in the ranges
+    rng = np.random.default_rng(seed)
+    return [
+        {
+            'name': f'sample {i}',
+            'fuel_shock': dict(zip(fuels, rng.uniform(-1, 1, len(fuels)).round(3).tolist())),
+            'carbon_tightening': round(float(rng.uniform(*carbon_tightening)), 3),
+            'demand_growth': round(float(rng.uniform(*demand_growth)), 4),
+        }
+        for i in range(n)
+    ]
+
+def apply_scenario(inputs, scenario):
+    # the input frames of a scenario; fuel_shock is one multiple of the Cost Uncertainty (±%) band or one per fuel
+    fuels = inputs['fuels'].copy()
+    shock = scenario.get('fuel_shock', 0.0)
+    if isinstance(shock, dict):
+        shock = fuels['Fuel'].map(shock).fillna(0.0).astype(float)
+    fuels['Cost ($/unit_fuel)'] = fuels['Cost ($/unit_fuel)'] * (1 + shock * fuels['Cost Uncertainty (±%)'] / 100)
+
+    carbon = inputs['carbon_emissions'].copy()
+    carbon['Carbon emission CO2/kg'] = carbon['Carbon emission CO2/kg'] * (1 - scenario.get('carbon_tightening', 0.0))
+
+    demand = inputs['demand'].copy()
+    growth = (1 + scenario.get('demand_growth', 0.0)) ** (demand['Year'] - demand['Year'].min())
+    demand['Demand (km)'] = np.round(demand['Demand (km)'] * growth)
+    return {**inputs, 'fuels': fuels, 'carbon_emissions': carbon, 'demand': demand}
+
+def worker_inputs(inputs, options, threads):
+    # the base inputs and model options of a pool worker
+    return {'inputs': inputs, 'options': options, 'threads': threads}
+
+def kpi_summary(opti):
+    # totals over the horizon of the solved plan: cost per category, emissions, distance and vehicles bought
+    cube = opti.resultCube()
+    r = (opti.years[0], opti.years[-1])
+    costs = cube.total(r, 'cost', by='Cat')
+    summary = {cat.replace('<br>', ' '): cost for cat, cost in costs.items()}
+    summary['Emissions'] = cube.total(r, 'emissions')
+    summary['Distance (km)'] = cube.total(r, 'distance')
+    summary['Vehicles bought'] = cube.total(r, 'vehicles', Cat='Buy<br>Cost')
+    return summary
+
+def solve_scenario(scenario, time_limit):
+    # one row of the sweep table; a scenario that fails (no plan in the time limit, bad inputs) has its error
+    from opti_model import OptiModel
+    from result_store import INPUT_KEYS
+    start = time.time()
+    row = {'Scenario': scenario['name']}
+    opti = None
+    try:
+        inputs = apply_scenario(worker['inputs'], scenario)
+        opti = OptiModel(*[inputs[k] for k in INPUT_KEYS], **worker['options'])
+        opti.model.setParam('OutputFlag', 0)
+        opti.create()
+        opti.setParams(time_limit)
+        opti.model.setParam('Threads', worker['threads'])
+        opti.solve()
+        row.update(objective=opti.objVal(), bound=opti.objBound(), gap=opti.optGap(), stop_reason=opti.stop_reason)
+        row.update(kpi_summary(opti))
+    except Exception as e:
+        row['error'] = f'{type(e).__name__}: {e}'
+    finally:
+        if opti is not None:
+            opti.dispose()
+    row['seconds'] = time.time() - start
+    return row
+
+# Scenario sweep: the base inputs solved again under every scenario of a grid or a sample, each scenario a
+# job of a process pool. Every job builds and solves its own OptiModel with `threads` Gurobi threads, and
+# there are cores // threads workers by default, so a many-core machine is kept busy without Gurobi threads
+# competing for cores. run() returns one row per scenario, in the scenarios' order.
+class ScenarioSweep:
+    def __init__(self, inputs, options=None, workers=None, threads=THREADS_PER_JOB, time_limit=TIME_LIMIT):
+        if threads < 1:
+            raise ValueError(f'threads must be at least 1, not {threads}')
+        cores = os.cpu_count() or 1
+        self.inputs = inputs # frames by result_store.INPUT_KEYS
+        self.options = options or {}
+        self.threads = threads
+        self.workers = workers or max(cores // threads, 1)
+        self.time_limit = time_limit
+        if self.workers * threads > cores:
+            logger.warning('scenario sweep: %d workers x %d threads on %d cores', self.workers, threads, cores)
+
+    def run(self, scenarios):
+        if not scenarios:
+            return pd.DataFrame()
+        with process_pool(min(self.workers, len(scenarios)), worker_inputs, self.inputs, self.options, self.threads) as pool:
+            futures = [pool.submit(solve_scenario, scenario, self.time_limit) for scenario in scenarios]
+            rows = []
+            for future in futures:
+                rows.append(future.result())
+                logger.info('scenario %s: %s', rows[-1]['Scenario'], rows[-1].get('stop_reason', rows[-1].get('error')))
+        return pd.DataFrame(rows).set_index('Scenario')
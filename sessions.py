@@ -0,0 +1,137 @@
+import threading
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+
+# rough per-element footprint of a built gurobipy model, for the memory budget
+VAR_BYTES = 300
+CONSTR_BYTES = 300
+NZ_BYTES = 24
+
+def new_session_id():
+    return uuid.uuid4().hex
+
+def frame_bytes(df):
+    return int(df.memory_usage(deep=True).sum()) if df is not None else 0
+
+def model_bytes(opti):
+    m = opti.model
+    return m.NumVars * VAR_BYTES + m.NumConstrs * CONSTR_BYTES + m.NumNZs * NZ_BYTES
+
+# Everything one browser session works with: uploaded inputs, the built model and its results
+class Session:
+    def __init__(self, session_id):
+        self.id = session_id
+        self.inputs = {}
+        self.inputs_version = None # of the stored inputs copied to inputs
+        self.model = None
+        self.model_bytes = 0 # model_bytes() of the model, read when it was set: a solve thread may be using it now
+        self.model_inputs = None # inputs version the model was built from
+        self.job_id = None
+        self.users = 0 # callbacks reading the model right now, see SessionRegistry.using()
+        self.retired = [] # models replaced or evicted while in use, disposed when the last user is done
+
+    def size(self):
+        # approximate memory held by the session, in bytes
+        size = sum(frame_bytes(df) for df in self.inputs.values())
+        if self.model is not None:
+            size += self.model_bytes + frame_bytes(self.model.results_df)
+        return size
+
+    def setModel(self, model):
+        self.dispose()
+        self.model = model
+        self.model_bytes = model_bytes(model) # built, not solving yet
+
+    def dispose(self):
+        # free the Gurobi model now instead of waiting for garbage collection, or once no callback reads it
+        if self.model is not None:
+            if self.users:
+                self.retired.append(self.model)
+            else:
+                self.model.dispose()
+        self.model = None
+        self.model_bytes = 0
+        self.job_id = None
+
+    def release(self):
+        self.users -= 1
+        if not self.users:
+            for model in self.retired:
+                model.dispose()
+            self.retired = []
+
+# Sessions by id, least recently used first. Sessions are evicted (and their models disposed) once there are
+# more than max_sessions or their estimated memory exceeds max_bytes; sessions for which in_use(session) is
+# true, e.g. with a running solve, or that a callback is using() are never evicted. on_dispose(session) runs
+# before a session's model is disposed, to release whatever else refers to it; a model replaced while a
+# callback uses the session is disposed when the callback is done.
+class SessionRegistry:
+    def __init__(self, max_sessions=32, max_bytes=4 * 1024 ** 3, in_use=None, on_dispose=None):
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.in_use = in_use or (lambda session: False)
+        self.on_dispose = on_dispose or (lambda session: None)
+        self.sessions = OrderedDict()
+        self.lock = threading.RLock()
+
+    def get(self, session_id):
+        # the session, created on first use; None without a session id
+        if not session_id:
+            return None
+        with self.lock:
+            session = self.sessions.get(session_id)
+            if session is None:
+                session = self.sessions[session_id] = Session(session_id)
+            self.sessions.move_to_end(session_id)
+            return session
+
+    @contextmanager
+    def using(self, session_id):
+        # the session (None without a session id), neither evicted nor its model disposed within the block
+        with self.lock:
+            session = self.get(session_id)
+            if session is not None:
+                session.users += 1
+        try:
+            yield session
+        finally:
+            if session is not None:
+                with self.lock:
+                    session.release()
+
+    def setModel(self, session_id, model):
+        with self.lock:
+            session = self.get(session_id)
+            self.on_dispose(session)
+            session.setModel(model)
+            self.evict(keep=session_id)
+
+    def evict(self, keep=None):
+        with self.lock:
+            sizes = {sid: s.size() for sid, s in self.sessions.items()}
+            total = sum(sizes.values())
+            for sid in list(self.sessions):
+                if len(self.sessions) <= self.max_sessions and total <= self.max_bytes:
+                    break
+                session = self.sessions[sid]
+                if sid == keep or session.users or self.in_use(session):
+                    continue
+                self.on_dispose(session)
+                session.dispose()
+                del self.sessions[sid]
+                total -= sizes[sid]
+
+    def dispose(self, session_id):
+        with self.lock:
+            session = self.sessions.pop(session_id, None)
+            if session is not None:
+                self.on_dispose(session)
+                session.dispose()
+
+    def __len__(self):
+        return len(self.sessions)
+
+    def stats(self):
+        with self.lock:
+            return {'sessions': len(self.sessions), 'max_sessions': self.max_sessions, 'bytes': sum(s.size() for s in self.sessions.values()), 'max_bytes': self.max_bytes}
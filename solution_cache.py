@@ -0,0 +1,81 @@
+import glob
+import hashlib
+import json
+import os
+import pickle
+import numpy as np
+from cache import DiskCache
+from model_cache import model_key, variable_families
+
+# Gurobi parameters that change what a solve returns
+SOLVER_PARAMS = ['TimeLimit', 'WorkLimit', 'MIPGap', 'MIPGapAbs', 'MIPFocus', 'Heuristics', 'NumericFocus', 'IntegralityFocus', 'Seed', 'Threads']
+TERMINATION_RULES = ['target_gap', 'abs_gap', 'no_improvement', 'bound_stagnation']
+
+def params_key(opti):
+    params = {p: opti.model.getParamInfo(p)[2] for p in SOLVER_PARAMS}
+    params.update({r: getattr(opti.termination, r) for r in TERMINATION_RULES})
+    return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()[:16]
+
+# Finished solves on disk, as <model key>-<params key>.pkl: the results (result_dict, fleet, bound, gap,
+# objective, stop reason) and the solution values of every variable family. A solve of the same model
+# with the same parameters is replayed from here; a solve of the same model with other parameters (e.g.
+# a longer time limit) starts from the best cached solution of that model.
+class SolutionCache(DiskCache):
+    EXTENSIONS = ('.pkl',)
+
+    def __init__(self, directory, max_bytes=512 * 1024 ** 2):
+        super().__init__(directory, max_bytes)
+
+    def key(self, opti):
+        return f'{model_key(opti)}-{params_key(opti)}'
+
+    def read(self, path):
+        try:
+            with open(path, 'rb') as f:
+                return pickle.load(f)
+        except FileNotFoundError: # evicted meanwhile
+            return None
+
+    def get(self, opti):
+        # cached solve of opti with its current parameters, None if there is none
+        key = self.key(opti)
+        entry = self.read(self.paths(key)[0])
+        self.count(hit=entry is not None)
+        if entry is not None:
+            self.touch(key)
+        return entry
+
+    def put(self, opti):
+        # only solves that found a plan
+        if opti.model.SolCount == 0:
+            return
+        entry = {
+            **opti.resultState(),
+            'objective': opti.objVal(),
+            'bound': opti.objBound(),
+            'gap': opti.optGap(),
+            'years': (opti.years[0], opti.years[-1]),
+            'x': {family: np.array(opti.model.getAttr('X', xs)) for family, index, xs in variable_families(opti)},
+        }
+        tmp = self.tmpPath('.pkl')
+        with open(tmp, 'wb') as f:
+            pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self.paths(self.key(opti))[0])
+        self.evict()
+
+    def best(self, opti):
+        # lowest objective cached solve of opti's model, whatever the parameters
+        entries = [self.read(path) for path in glob.glob(os.path.join(self.directory, f'{model_key(opti)}-*.pkl'))]
+        entries = [e for e in entries if e is not None]
+        return min(entries, key=lambda e: e['objective']) if entries else None
+
+    def warmStart(self, opti):
+        # the best cached solution of opti's model as MIP start, False if there is none
+        entry = self.best(opti)
+        if entry is None:
+            return False
+        opti.model.update()
+        for family, index, xs in variable_families(opti):
+            if family in entry['x']:
+                opti.model.setAttr('Start', xs, entry['x'][family].tolist())
+        return True
@@ -0,0 +1,74 @@
+from gurobipy import GRB
+
+STATUS_REASONS = {
+    GRB.OPTIMAL: 'optimal',
+    GRB.TIME_LIMIT: 'time limit',
+    GRB.INTERRUPTED: 'interrupted',
+    GRB.INFEASIBLE: 'infeasible',
+    GRB.INF_OR_UNBD: 'infeasible or unbounded',
+    GRB.UNBOUNDED: 'unbounded',
+    GRB.SOLUTION_LIMIT: 'solution limit',
+    GRB.NODE_LIMIT: 'node limit',
+}
+IMPROVEMENT_TOL = 1e-6 # relative change that counts as a new incumbent / a moving bound
+
+# Early stop rules checked from the Gurobi MIP callback; the first rule that fires terminates the solve.
+#  - target_gap: relative MIP gap (0.01 = 1%)
+#  - abs_gap: incumbent - bound in $
+#  - no_improvement: seconds without a better incumbent
+#  - bound_stagnation: seconds without the best bound moving
+class TerminationPolicy:
+    def __init__(self, target_gap=None, abs_gap=None, no_improvement=None, bound_stagnation=None):
+        self.target_gap = target_gap
+        self.abs_gap = abs_gap
+        self.no_improvement = no_improvement
+        self.bound_stagnation = bound_stagnation
+        self.reset()
+
+    def active(self):
+        return any(x is not None for x in (self.target_gap, self.abs_gap, self.no_improvement, self.bound_stagnation))
+
+    def reset(self):
+        self.reason = None
+        self.restart()
+
+    def restart(self):
+        # state of one optimize call (the aggregate use mode runs several)
+        self.runtime = 0.0
+        self.incumbent, self.incumbent_time = None, 0.0
+        self.bound, self.bound_time = None, 0.0
+
+    def moved(self, old, new):
+        return old is None or abs(new - old) > IMPROVEMENT_TOL * max(abs(old), 1.0)
+
+    def check(self, incumbent, bound, runtime):
+        # reason to stop, or None
+        if runtime < self.runtime:
+            self.restart()
+        self.runtime = runtime
+        if self.moved(self.incumbent, incumbent):
+            self.incumbent, self.incumbent_time = incumbent, runtime
+        if self.moved(self.bound, bound):
+            self.bound, self.bound_time = bound, runtime
+
+        if incumbent >= GRB.INFINITY: # nothing to stop with yet
+            return None
+        gap = abs(incumbent - bound)
+        if self.target_gap is not None and gap <= self.target_gap * max(abs(incumbent), 1e-10):
+            return f'target gap {100 * self.target_gap:g}% reached'
+        if self.abs_gap is not None and gap <= self.abs_gap:
+            return f'absolute gap ${self.abs_gap:,.0f} reached'
+        if self.no_improvement is not None and runtime - self.incumbent_time >= self.no_improvement:
+            return f'no incumbent improvement for {self.no_improvement:g}s'
+        if self.bound_stagnation is not None and runtime - self.bound_time >= self.bound_stagnation:
+            return f'best bound stagnant for {self.bound_stagnation:g}s'
+        return None
+
+    def __call__(self, model, where):
+        if where != GRB.Callback.MIP:
+            return
+        reason = self.check(model.cbGet(GRB.Callback.MIP_OBJBST), model.cbGet(GRB.Callback.MIP_OBJBND), model.cbGet(GRB.Callback.RUNTIME))
+        if reason is not None:
+            if self.reason is None:
+                self.reason = reason
+            model.terminate()
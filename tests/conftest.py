@@ -0,0 +1,12 @@
+import pytest
+from benchmark import make_dataset
+
+# Instances small enough for the size limited Gurobi license and to solve in seconds
+
+@pytest.fixture(scope='session')
+def data():
+    return make_dataset(n_years=2, n_sizes=1)
+
+@pytest.fixture(scope='session')
+def data3():
+    return make_dataset(n_years=3, n_sizes=1)
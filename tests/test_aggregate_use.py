@@ -0,0 +1,26 @@
+import pytest
+from benchmark import build_model
+
+def test_repair_is_undone_before_the_next_solve(data3):
+    m = build_model(data3, sparse=True, use_mode='aggregate')
+    m.setParams(60)
+    rows, integer = m.model.NumConstrs, m.model.NumIntVars
+    m.solve()
+    first = (m.objVal(), m.objBound())
+    assert m.repaired is not None
+
+    m.solve()
+    assert m.objBound() == pytest.approx(first[1], rel=1e-4)
+    assert m.objVal() == pytest.approx(first[0], rel=1e-4)
+    m.undoRepair()
+    m.model.update()
+    assert (m.model.NumConstrs, m.model.NumIntVars) == (rows, integer)
+
+def test_repaired_solution_stays_readable(data):
+    m = build_model(data, sparse=True, use_mode='aggregate')
+    m.setParams(60)
+    plan = m.solve()[0]
+    assert m.objVal() is not None
+    assert sum(n for n, t in zip(plan['Num_Vehicles'], plan['Type']) if t == 'Buy') > 0
+    # the repaired Use rows are whole vehicles
+    assert all(float(n).is_integer() for n, t in zip(plan['Num_Vehicles'], plan['Type']) if t == 'Use')
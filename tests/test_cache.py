@@ -0,0 +1,17 @@
+from cache import LRUCache
+
+def test_lru_cache_round_trips_and_counts():
+    cache = LRUCache(maxsize=2)
+    cache.put('a', 1)
+    assert cache.get('a') == 1
+    assert cache.get('b', 'missing') == 'missing'
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+
+def test_lru_cache_evicts_the_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    cache.get('a')
+    cache.put('c', 3)
+    assert 'a' in cache and 'c' in cache and 'b' not in cache
+    assert len(cache) == 2
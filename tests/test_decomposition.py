@@ -0,0 +1,62 @@
+import pandas as pd
+import pytest
+from gurobipy import GRB
+from benchmark import build_model, make_dataset, model_args
+from decomposition import SizeDecomposition, size_inputs
+from inputs import process_inputs
+from opti_model import OptiModel
+from result_store import INPUT_KEYS
+
+def with_s1_start(data):
+    # a start file holding S1 vehicles only, bought in the first year
+    vehicles = data['vehicles']
+    ids = vehicles[(vehicles['Size'] == 'S1') & (vehicles['Year'] == vehicles['Year'].min())]['ID']
+    return {**data, 'start': pd.DataFrame({'Year': vehicles['Year'].min(), 'ID': ids.tolist(), 'Num_Vehicles': 1, 'Type': 'Buy'})}
+
+def test_every_size_keeps_the_start_horizon():
+    data = with_s1_start(make_dataset(n_years=3, n_sizes=2))
+    inputs, arrays = process_inputs(*[data[k] for k in INPUT_KEYS])
+    assert arrays.years == [2024, 2025]
+    for size in ('S1', 'S2'):
+        sub = size_inputs(data, size)
+        inputs, arrays = process_inputs(*[sub[k] for k in INPUT_KEYS])
+        assert arrays.years == [2024, 2025] and arrays.sizes == [size]
+
+@pytest.fixture(scope='module')
+def coupled():
+    # two sizes over one year, with demand small enough to solve to optimality and a carbon limit the
+    # sizes' own optima break together, so the emissions row couples them
+    data = with_s1_start(make_dataset(n_years=2, n_sizes=2))
+    col = 'Carbon emission CO2/kg'
+    return {
+        **data,
+        'demand': data['demand'].assign(**{'Demand (km)': data['demand']['Demand (km)'] * 0.05}),
+        'carbon_emissions': data['carbon_emissions'].assign(**{col: data['carbon_emissions'][col] * 0.025}),
+    }
+
+def test_bound_below_the_optimum_and_repaired_plan_feasible(coupled):
+    m = build_model(coupled, sparse=True)
+    m.model.optimize()
+    assert m.model.Status == GRB.OPTIMAL
+    optimum = m.model.ObjVal
+
+    opti = OptiModel(*model_args(coupled), sparse=True)
+    opti.model.setParam('OutputFlag', 0)
+    opti.model.setParam('TimeLimit', 30)
+    search = SizeDecomposition(opti, workers=2)
+    plan = search.run()
+    assert len(search.history) > 1
+    assert search.bound <= optimum + 1e-6 * abs(optimum)
+    assert plan is not None and search.objective >= optimum - 1e-6 * abs(optimum)
+
+    # the plan's buy/sell/use decisions keep every row of the full model
+    full = build_model(coupled, sparse=True)
+    full.warmStart(plan)
+    full.model.update()
+    xs = [x for x in full.model.getVars() if x.VType != GRB.CONTINUOUS]
+    values = full.model.getAttr('Start', xs)
+    full.model.setAttr('LB', xs, values)
+    full.model.setAttr('UB', xs, values)
+    full.model.optimize()
+    assert full.model.Status == GRB.OPTIMAL
+    assert full.model.ObjVal <= search.objective + 1e-6 * abs(search.objective)
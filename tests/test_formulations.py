@@ -0,0 +1,23 @@
+import pytest
+from benchmark import build_model, relaxed_objective
+
+# the sparse index only drops variables fixed at 0 and the fleet_state balance only names the cumulative
+# fleet sums: every formulation has the dense model's LP relaxation
+FORMULATIONS = {
+    'sparse': {'sparse': True},
+    'fleet': {'sparse': True, 'fleet_state': True},
+    'fleet_dense': {'fleet_state': True},
+    'tight': {'sparse': True, 'tighten_bounds': True},
+    'matrix': {'sparse': True, 'builder': 'matrix'},
+}
+
+@pytest.fixture(scope='module')
+def dense_relaxation(data3):
+    return relaxed_objective(build_model(data3).model)
+
+def test_dense_relaxation(dense_relaxation):
+    assert dense_relaxation == pytest.approx(5138793.07, abs=0.01)
+
+@pytest.mark.parametrize('name', FORMULATIONS)
+def test_formulations_have_the_dense_relaxation(data3, dense_relaxation, name):
+    assert relaxed_objective(build_model(data3, **FORMULATIONS[name]).model) == pytest.approx(dense_relaxation, rel=1e-9)
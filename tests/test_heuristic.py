@@ -0,0 +1,31 @@
+import pytest
+from gurobipy import GRB
+from benchmark import build_model
+
+def fix_to_start(m):
+    # every buy/sell/use/total_distance variable held at its Start value
+    m.model.update()
+    for family in (m.buy, m.sell, m.use, m.total_distance):
+        xs = list(family.values())
+        start = m.model.getAttr('Start', xs)
+        m.model.setAttr('LB', xs, start)
+        m.model.setAttr('UB', xs, start)
+
+@pytest.mark.parametrize('options', [{'sparse': True}, {'sparse': True, 'fleet_state': True}, {}])
+def test_greedy_plan_is_feasible(data3, options):
+    m = build_model(data3, **options)
+    planner = m.greedyStart()
+    assert planner.violations == []
+    fix_to_start(m)
+    m.model.optimize()
+    assert m.model.Status == GRB.OPTIMAL
+    m.heuristicSolve()
+    assert m.model.ObjVal == pytest.approx(m.objVal(), rel=1e-6) # the plan's cost, as the model prices it
+
+def test_greedy_start_is_accepted(data3):
+    m = build_model(data3, sparse=True)
+    m.greedyStart()
+    m.model.setParam('NodeLimit', 0)
+    m.model.setParam('Heuristics', 0)
+    m.model.optimize()
+    assert m.model.SolCount >= 1
@@ -0,0 +1,74 @@
+import pandas as pd
+import pytest
+from benchmark import build_model, random_plan
+
+# the breakdowns as computed row by row before KpiEngine, the reference for the vectorized ones
+
+ROUND_TOL = 0.5 # rows are rounded to 0.1; a product taken in another order can round a row the other way
+
+def old_rows(m, r, t, s, types):
+    df = pd.DataFrame(m.result_dict)
+    df = df[df['Type'].isin(types) & df['Year'].between(*r)]
+    if t != 'All':
+        df = df[df['ID'].str.split('_').str[0] == t]
+    if s != 'All':
+        df = df[df['ID'].str.split('_').str[1] == s]
+    return df
+
+def old_cost_breakdown(m, r, t='All', s='All'):
+    rows = []
+    for _, row in old_rows(m, r, t, s, ['Buy', 'Sell', 'Use']).iterrows():
+        v, yr, n = row['ID'], row['Year'], row['Num_Vehicles']
+        if row['Type'] == 'Buy':
+            rows.append((yr, 'Buy<br>Cost', round(n * m.vehicle_cost[v], 1)))
+        elif row['Type'] == 'Sell':
+            rows.append((yr, 'Sell<br>Revenue', round(n * m.vehicle_cost[v] * m.resale_rates[yr - m.yrp[v] + 1], 1)))
+        else:
+            cost = row['Distance_per_vehicle(km)'] * n * m.vehicle_fuel_consumption[v, row['Fuel']] * m.fuel_cost[row['Fuel'], yr]
+            rows.append((yr, 'Fuel<br>Cost', round(cost, 1)))
+    for yr in range(r[0], r[1] + 1):
+        for v in m.vehicle_cost:
+            if (t == 'All' or v.split('_')[0] == t) and (s == 'All' or v.split('_')[1] == s):
+                n = m.fleet[yr][v] if v in m.fleet[yr] else 0
+                rows.append((yr, 'Insurance<br>Cost', round(n * m.vehicle_cost[v] * m.insure_rates.get(yr - m.yrp[v] + 1, 0), 1)))
+                rows.append((yr, 'Maintenance<br>Cost', round(n * m.vehicle_cost[v] * m.maintain_rates.get(yr - m.yrp[v] + 1, 0), 1)))
+    return pd.DataFrame(rows, columns=['Year', 'Cat', 'Cost']).groupby(['Year', 'Cat'])['Cost'].sum()
+
+def old_use_totals(m, r, t='All', s='All'):
+    df = old_rows(m, r, t, s, ['Use'])
+    emissions = [round(row['Distance_per_vehicle(km)'] * row['Num_Vehicles'] * m.vehicle_fuel_consumption[row['ID'], row['Fuel']] * m.fuel_emissions[row['Fuel'], row['Year']], 1) for _, row in df.iterrows()]
+    distance = (df['Num_Vehicles'] * df['Distance_per_vehicle(km)']).round(1)
+    return sum(emissions), distance.sum()
+
+@pytest.fixture(scope='module')
+def planned(data3):
+    m = build_model(data3, sparse=True)
+    random_plan(m)
+    return m
+
+FILTERS = [('All', 'All'), ('Diesel', 'All'), ('LNG', 'S1'), ('BEV', 'S1')]
+
+@pytest.mark.parametrize('t, s', FILTERS)
+def test_cost_breakdown_matches_the_row_by_row_totals(planned, t, s):
+    r = (planned.years[0], planned.years[-1])
+    old = old_cost_breakdown(planned, r, t, s)
+    new = planned.cost_breakdown(r, t, s).groupby(['Year', 'Cat'])['Cost'].sum()
+    pd.testing.assert_series_equal(new.reindex(old.index, fill_value=0), old, check_dtype=False, check_names=False, atol=ROUND_TOL)
+
+@pytest.mark.parametrize('t, s', FILTERS)
+def test_result_cube_matches_the_row_by_row_totals(planned, t, s):
+    cube = planned.resultCube()
+    for r in [(planned.years[0], planned.years[-1]), (planned.years[1], planned.years[1])]:
+        old = old_cost_breakdown(planned, r, t, s).groupby('Cat').sum()
+        new = cube.total(r, 'cost', by='Cat', Drivetrain=t, Size=s)
+        for cat, cost in old.items():
+            assert new.get(cat, 0) == pytest.approx(cost, abs=ROUND_TOL)
+        emissions, distance = old_use_totals(planned, r, t, s)
+        assert cube.total(r, 'emissions', Drivetrain=t, Size=s) == pytest.approx(0 if t == 'BEV' else emissions, abs=ROUND_TOL)
+        assert cube.total(r, 'distance', Drivetrain=t, Size=s) == pytest.approx(distance, abs=ROUND_TOL)
+
+def test_use_breakdowns_match_the_row_by_row_totals(planned):
+    r = (planned.years[0], planned.years[-1])
+    emissions, distance = old_use_totals(planned, r)
+    assert planned.emissions_breakdown(r)['Emissions'].sum() == pytest.approx(emissions, abs=ROUND_TOL)
+    assert planned.distance_covered_breakdown(r)['Distance'].sum() == pytest.approx(distance, abs=ROUND_TOL)
@@ -0,0 +1,34 @@
+import pytest
+from gurobipy import GRB
+from benchmark import build_model
+from lns import LargeNeighborhoodSearch
+
+def plan_objective(data, x, **options):
+    # objective of the full model with the buy/sell/use decisions held at x; None if they break a constraint
+    m = build_model(data, **options)
+    xs = [v for v in m.model.getVars() if v.VType != GRB.CONTINUOUS]
+    values = [x[v.index] for v in xs]
+    m.model.setAttr('LB', xs, values)
+    m.model.setAttr('UB', xs, values)
+    m.model.optimize()
+    return m.model.ObjVal if m.model.Status == GRB.OPTIMAL else None
+
+def test_lns_never_worsens_and_stays_feasible(data3):
+    m = build_model(data3, sparse=True)
+    # the greedy plan as the incumbent to improve
+    m.greedyStart()
+    m.model.setParam('NodeLimit', 0)
+    m.model.setParam('Heuristics', 0)
+    m.model.optimize()
+    greedy = m.model.ObjVal
+    m.model.resetParams()
+    m.model.setParam('OutputFlag', 0)
+    m.model.setParam('TimeLimit', 20)
+
+    search = LargeNeighborhoodSearch(m, workers=2, sub_time_limit=2)
+    objective, bound, x = search.run()
+    objectives = [o for seconds, o, name in search.history]
+    assert search.history[0][2] == 'initial' and objectives[0] == greedy and objectives[-1] == objective
+    assert len(objectives) > 1 and all(later < earlier for earlier, later in zip(objectives, objectives[1:]))
+    assert bound <= objective
+    assert plan_objective(data3, x, sparse=True) == pytest.approx(objective, rel=1e-6)
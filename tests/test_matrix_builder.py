@@ -0,0 +1,18 @@
+import pytest
+from benchmark import build_model, same_model, relaxed_objective
+
+@pytest.mark.parametrize('options', [{}, {'sparse': True}, {'sparse': True, 'fleet_state': True}, {'sparse': True, 'use_mode': 'aggregate'}])
+def test_matrix_builder_builds_the_expression_model(data, options):
+    expr = build_model(data, **options)
+    matrix = build_model(data, builder='matrix', **options)
+    assert same_model(expr.model, matrix.model)
+    assert relaxed_objective(matrix.model) == pytest.approx(relaxed_objective(expr.model), rel=1e-9)
+
+def test_matrix_builder_reaches_the_same_optimum(data):
+    objectives = []
+    for builder in ('expr', 'matrix'):
+        m = build_model(data, sparse=True, use_mode='aggregate', builder=builder)
+        m.setParams(60)
+        m.solve()
+        objectives.append(m.objBound())
+    assert objectives[1] == pytest.approx(objectives[0], rel=1e-4)
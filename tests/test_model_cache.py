@@ -0,0 +1,58 @@
+import os
+from benchmark import model_args, relaxed_objective, same_model
+from cache import DiskCache
+from model_cache import ModelCache
+from opti_model import OptiModel
+
+class BlobCache(DiskCache):
+    EXTENSIONS = ('.bin',)
+
+    def put(self, key, size, mtime):
+        path, = self.paths(key)
+        with open(path, 'wb') as f:
+            f.write(b'x' * size)
+        os.utime(path, (mtime, mtime))
+        self.evict()
+
+def test_disk_cache_evicts_the_least_recently_used(tmp_path):
+    cache = BlobCache(str(tmp_path), max_bytes=250)
+    cache.put('a', 100, 1000)
+    cache.put('b', 100, 2000)
+    cache.touch('a') # used after b
+    cache.put('c', 100, 3000)
+    assert cache.exists('a') and cache.exists('c') and not cache.exists('b')
+    assert cache.stats()['bytes'] == 200
+
+def test_disk_cache_ignores_files_being_written(tmp_path):
+    cache = BlobCache(str(tmp_path), max_bytes=50)
+    open(cache.tmpPath('.bin'), 'wb').write(b'x' * 100)
+    assert cache.files() == []
+
+def cached_model(data, cache, **options):
+    opti = OptiModel(*model_args(data), **options)
+    opti.model.setParam('OutputFlag', 0)
+    opti.create(cache=cache)
+    opti.model.update()
+    return opti
+
+def test_model_cache_reads_back_the_same_model(tmp_path, data):
+    cache = ModelCache(str(tmp_path))
+    options = dict(sparse=True, names=True)
+    built = cached_model(data, cache, **options) # saved by create()
+    loaded = cached_model(data, cache, **options)
+    assert cache.stats()['hits'] == 1
+    assert same_model(built.model, loaded.model)
+    assert relaxed_objective(built.model) == relaxed_objective(loaded.model)
+    for family in ('buy', 'sell', 'use'):
+        assert {k: x.VarName for k, x in getattr(built, family).items()} == {k: x.VarName for k, x in getattr(loaded, family).items()}
+
+def test_model_cache_misses_other_options(tmp_path, data):
+    cache = ModelCache(str(tmp_path))
+    cached_model(data, cache, sparse=True)
+    cached_model(data, cache, sparse=True, use_mode='aggregate')
+    assert cache.stats()['misses'] == 2 and cache.stats()['entries'] == 2
+
+def test_model_cache_evicts_within_max_bytes(tmp_path, data):
+    cache = ModelCache(str(tmp_path), max_bytes=1)
+    cached_model(data, cache, sparse=True)
+    assert cache.stats()['entries'] == 0
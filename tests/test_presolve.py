@@ -0,0 +1,32 @@
+import pytest
+from benchmark import build_model, with_dominated_copies
+
+def optimum(data, **options):
+    # optimal objective of the aggregate use formulation, which Gurobi proves within seconds here
+    m = build_model(data, sparse=True, use_mode='aggregate', **options)
+    m.setParams(60)
+    m.model.setParam('MIPGap', 1e-6)
+    m.solve()
+    return m, m.objBound()
+
+def test_bound_tightening_keeps_the_optimum(data):
+    loose, base = optimum(data)
+    tight, tightened = optimum(data, tighten_bounds=True)
+    assert tightened == pytest.approx(base, rel=1e-5)
+    assert tight.boundReport(relaxation=False)
+
+def test_dominance_pruning_keeps_the_optimum(data):
+    data = with_dominated_copies(data)
+    full, base = optimum(data)
+    pruned, after = optimum(data, prune=True)
+    assert len(pruned.pruneReport()) > 0
+    assert pruned.model.NumVars < full.model.NumVars
+    assert after == pytest.approx(base, rel=1e-5)
+
+def test_bound_tightening_logs_its_report(data, caplog):
+    with caplog.at_level('INFO', logger='presolve'):
+        m = build_model(data, sparse=True, tighten_bounds=True)
+    report = m.boundReport(relaxation=False)
+    logged = [r.getMessage() for r in caplog.records if r.name == 'presolve']
+    assert len(logged) == len(report)
+    assert f"tightened {report['use']['tightened']} of {report['use']['vars']} use upper bounds" in ' '.join(logged)
@@ -0,0 +1,44 @@
+import sqlite3
+from benchmark import build_model
+from result_store import ResultStore
+
+def test_inputs_version_follows_the_stored_inputs(tmp_path, data):
+    store = ResultStore(str(tmp_path / 'results.sqlite'))
+    assert store.inputsVersion('s') is None and store.loadInputs('s') == {}
+    version = store.saveInputs('s', data)
+    assert store.inputsVersion('s') == version
+    assert store.saveInputs('s', data) == version # same inputs, same version
+    changed = store.saveInputs('s', {k: v for k, v in data.items() if k != 'demand'})
+    assert changed != version and store.inputsVersion('s') == changed
+    assert list(store.loadInputs('s')) == list(data)[1:]
+
+def test_session_job_is_shared_through_the_store(tmp_path):
+    path = str(tmp_path / 'results.sqlite')
+    store = ResultStore(path)
+    store.saveParams('s', {'time_limit': 10})
+    store.saveSessionJob('s', 'job')
+    store.saveJobStatus('job', {'status': 'running'}, 's')
+    other = ResultStore(path) # another worker process
+    assert other.sessionJob('s') == 'job' and other.jobStatus('job')['status'] == 'running'
+    assert other.loadParams('s') == {'time_limit': 10}
+
+def test_store_file_without_the_new_columns(tmp_path):
+    path = str(tmp_path / 'results.sqlite')
+    db = sqlite3.connect(path)
+    db.execute('CREATE TABLE sessions (session_id TEXT PRIMARY KEY, inputs BLOB, params BLOB, updated REAL)')
+    db.close()
+    store = ResultStore(path)
+    store.saveSessionJob('s', 'job')
+    assert store.sessionJob('s') == 'job'
+
+def test_solve_is_restored_from_the_store(tmp_path, data):
+    store = ResultStore(str(tmp_path / 'results.sqlite'))
+    m = build_model(data, sparse=True, use_mode='aggregate')
+    m.setParams(30)
+    result = m.solve()
+    store.saveSolve('job', m, result, 's')
+    assert store.result('job')[1] == result[1]
+    restored = ResultStore(store.path).model('job')
+    assert restored.use_mode == 'aggregate' and restored.names == m.names
+    r = (m.years[0], m.years[-1])
+    assert restored.resultCube().total(r, 'cost', by='Cat').equals(m.resultCube().total(r, 'cost', by='Cat'))
@@ -0,0 +1,44 @@
+import pytest
+from gurobipy import GRB
+from benchmark import build_model, make_dataset, model_args
+from opti_model import OptiModel
+from rolling import RollingHorizon, window_starts
+
+@pytest.mark.parametrize('n_years', range(1, 13))
+@pytest.mark.parametrize('window, overlap', [(2, 1), (3, 1), (4, 1), (4, 2), (5, 2)])
+def test_windows_keep_a_step_each_without_gaps(n_years, window, overlap):
+    step = window - overlap
+    firsts = window_starts(n_years, window, step)
+    keeps = [(fi, nxt - 1) for fi, nxt in zip(firsts, firsts[1:] + [n_years])]
+    assert firsts[0] == 0 and keeps[-1][1] == n_years - 1
+    assert all(last - fi + 1 >= min(step, n_years) for fi, last in keeps)
+    assert all(fi + window <= max(n_years, window) for fi in firsts)
+
+@pytest.fixture(scope='module')
+def data8():
+    return make_dataset(n_years=8, n_sizes=1)
+
+def test_stitched_plan_feasible_in_the_full_model(data8):
+    opti = OptiModel(*model_args(data8), sparse=True)
+    opti.model.setParam('OutputFlag', 0)
+    opti.model.setParam('TimeLimit', 10)
+    search = RollingHorizon(opti, window=4, overlap=1, lookahead=2)
+    opti.loadIndex()
+    plan = search.run()
+    assert plan is not None
+
+    # 2023-2026 kept to 2025, then the last window 2026-2030 keeps the rest: no year kept twice or skipped
+    assert [(first, kept) for first, last, kept, *rest in search.windows] == [(2023, 2025), (2026, 2030)]
+    assert sorted(set(plan['Year'])) == list(range(2023, 2031))
+
+    # the plan's buy/sell/use decisions keep every row of the full model
+    full = build_model(data8, sparse=True)
+    full.warmStart(plan)
+    full.model.update()
+    xs = [x for x in full.model.getVars() if x.VType != GRB.CONTINUOUS]
+    values = full.model.getAttr('Start', xs)
+    assert max(values) < GRB.UNDEFINED
+    full.model.setAttr('LB', xs, values)
+    full.model.setAttr('UB', xs, values)
+    full.model.optimize()
+    assert full.model.Status == GRB.OPTIMAL
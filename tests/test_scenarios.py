@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+from benchmark import model_args
+from result_store import INPUT_KEYS
+from scenarios import ScenarioSweep, apply_scenario, scenario_grid, scenario_samples
+
+@pytest.fixture
+def inputs(data):
+    return dict(zip(INPUT_KEYS, model_args(data)))
+
+def test_scenario_grid_is_every_combination():
+    grid = scenario_grid(fuel_shocks=(-1.0, 1.0), carbon_tightening=(0.0, 0.1, 0.2), demand_growth=(0.0,))
+    assert len(grid) == 6 and len({s['name'] for s in grid}) == 6
+    assert {(s['fuel_shock'], s['carbon_tightening']) for s in grid} == {(f, c) for f in (-1.0, 1.0) for c in (0.0, 0.1, 0.2)}
+    assert len(scenario_grid()) == 12
+
+def test_scenario_samples_are_seeded_and_in_range():
+    fuels = ['Electricity', 'HVO']
+    samples = scenario_samples(20, fuels, carbon_tightening=(0.0, 0.2), demand_growth=(0.0, 0.04), seed=3)
+    assert samples == scenario_samples(20, fuels, carbon_tightening=(0.0, 0.2), demand_growth=(0.0, 0.04), seed=3)
+    assert samples != scenario_samples(20, fuels, seed=4)
+    for s in samples:
+        assert set(s['fuel_shock']) == set(fuels) and all(-1 <= x <= 1 for x in s['fuel_shock'].values())
+        assert 0 <= s['carbon_tightening'] <= 0.2 and 0 <= s['demand_growth'] <= 0.04
+
+def test_neutral_scenario_keeps_the_inputs(inputs):
+    shocked = apply_scenario(inputs, {'name': 'base'})
+    for key in ('fuels', 'carbon_emissions', 'demand'):
+        assert shocked[key].equals(inputs[key])
+
+def test_apply_scenario(inputs):
+    before = {k: df.copy() for k, df in inputs.items() if df is not None}
+    shocked = apply_scenario(inputs, {'fuel_shock': 1.0, 'carbon_tightening': 0.1, 'demand_growth': 0.02})
+    fuels = inputs['fuels']
+    expected = fuels['Cost ($/unit_fuel)'] * (1 + fuels['Cost Uncertainty (±%)'] / 100)
+    assert np.allclose(shocked['fuels']['Cost ($/unit_fuel)'], expected)
+    carbon = inputs['carbon_emissions']['Carbon emission CO2/kg']
+    assert np.allclose(shocked['carbon_emissions']['Carbon emission CO2/kg'], 0.9 * carbon)
+    demand = inputs['demand']
+    growth = 1.02 ** (demand['Year'] - demand['Year'].min())
+    assert np.array_equal(shocked['demand']['Demand (km)'], np.round(demand['Demand (km)'] * growth))
+    assert all(inputs[k].equals(df) for k, df in before.items()) # the base inputs are copied, not changed
+
+def test_per_fuel_shock(inputs):
+    fuels = inputs['fuels']
+    first = fuels['Fuel'].iloc[0]
+    shocked = apply_scenario(inputs, {'fuel_shock': {first: -1.0}})['fuels']
+    hit = fuels['Fuel'] == first
+    expected = fuels['Cost ($/unit_fuel)'] * (1 - fuels['Cost Uncertainty (±%)'] / 100)
+    assert np.allclose(shocked['Cost ($/unit_fuel)'][hit], expected[hit])
+    assert np.allclose(shocked['Cost ($/unit_fuel)'][~hit], fuels['Cost ($/unit_fuel)'][~hit])
+
+def test_sweep_returns_a_row_per_scenario(inputs):
+    sweep = ScenarioSweep(inputs, {'sparse': True, 'use_mode': 'aggregate'}, workers=2, threads=1, time_limit=20)
+    scenarios = scenario_grid(fuel_shocks=(0.0, 1.0), carbon_tightening=(0.0,), demand_growth=(0.0,))
+    table = sweep.run(scenarios)
+    assert list(table.index) == [s['name'] for s in scenarios]
+    assert 'error' not in table.columns and table['objective'].notna().all()
+    assert table['objective'].iloc[1] >= table['objective'].iloc[0] * (1 - 1e-4) # dearer fuel, no cheaper plan
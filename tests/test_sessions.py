@@ -0,0 +1,66 @@
+from benchmark import build_model
+import gurobipy as gp
+from sessions import SessionRegistry
+
+def model_size(data):
+    registry = SessionRegistry()
+    registry.setModel('probe', build_model(data, sparse=True))
+    return registry.stats()['bytes']
+
+def freed(opti):
+    try:
+        opti.model.NumVars
+    except gp.GurobiError:
+        return True
+    return False
+
+def test_registry_evicts_within_its_memory_budget(data):
+    size = model_size(data)
+    models = {}
+    registry = SessionRegistry(max_bytes=int(2.5 * size))
+    for sid in 'abcd':
+        models[sid] = build_model(data, sparse=True)
+        registry.setModel(sid, models[sid])
+        assert registry.stats()['bytes'] <= registry.max_bytes
+    assert list(registry.sessions) == ['c', 'd']
+    assert freed(models['a']) and freed(models['b']) and not freed(models['c'])
+
+def test_registry_evicts_beyond_max_sessions(data):
+    registry = SessionRegistry(max_sessions=2)
+    for sid in 'abc':
+        registry.get(sid)
+        registry.evict()
+    assert list(registry.sessions) == ['b', 'c']
+
+def test_sessions_in_use_are_kept(data):
+    size = model_size(data)
+    registry = SessionRegistry(max_bytes=int(1.5 * size), in_use=lambda session: session.id == 'solving')
+    registry.setModel('solving', build_model(data, sparse=True))
+    registry.setModel('b', build_model(data, sparse=True))
+    assert 'solving' in registry.sessions
+
+    with registry.using('b') as session:
+        model = session.model
+        registry.setModel('c', build_model(data, sparse=True))
+        assert 'b' in registry.sessions
+        # replaced while a callback reads it: disposed when the callback is done
+        registry.setModel('b', build_model(data, sparse=True))
+        assert model in session.retired and not freed(model)
+    assert freed(model) and session.retired == [] and session.users == 0
+
+class Solving:
+    # a Gurobi model that a solve thread is using: not to be touched
+    def __getattr__(self, name):
+        raise AssertionError(f'{name} read while solving')
+
+def test_size_is_read_when_the_model_is_set(data):
+    registry = SessionRegistry()
+    opti = build_model(data, sparse=True)
+    registry.setModel('a', opti)
+    size = registry.stats()['bytes']
+    model, opti.model = opti.model, Solving()
+    try:
+        assert registry.stats()['bytes'] == size
+        registry.evict()
+    finally:
+        opti.model = model
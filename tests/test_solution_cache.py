@@ -0,0 +1,64 @@
+import pytest
+from benchmark import build_model
+from jobs import JobManager
+from solution_cache import SolutionCache
+
+class CountingCache(SolutionCache):
+    def __init__(self, directory, max_bytes=512 * 1024 ** 2):
+        super().__init__(directory, max_bytes)
+        self.warm_starts = 0
+
+    def warmStart(self, opti):
+        self.warm_starts += 1
+        return super().warmStart(opti)
+
+def aggregate_model(data, time_limit=30):
+    m = build_model(data, sparse=True, use_mode='aggregate')
+    m.setParams(time_limit)
+    return m
+
+def test_solution_cache_replays_the_same_solve(tmp_path, data):
+    cache = SolutionCache(str(tmp_path))
+    solved = aggregate_model(data)
+    result, bound, *years = solved.solve(cache=cache)
+    assert cache.stats()['entries'] == 1
+
+    replayed = aggregate_model(data)
+    again, again_bound, *again_years = replayed.solve(cache=cache)
+    assert replayed.stop_reason.endswith(', cached') and cache.stats()['hits'] == 1
+    assert again == result and again_bound == bound and again_years == years
+    assert replayed.objVal() == pytest.approx(solved.objVal())
+
+def test_solution_cache_keys_on_parameters(tmp_path, data):
+    cache = SolutionCache(str(tmp_path))
+    aggregate_model(data).solve(cache=cache)
+    longer = aggregate_model(data, time_limit=60)
+    assert cache.get(longer) is None
+    assert cache.best(longer) is not None # same model: a warm start
+
+def test_explicit_start_is_kept(tmp_path, data):
+    cache = CountingCache(str(tmp_path))
+    aggregate_model(data).solve(cache=cache)
+    warm = aggregate_model(data, time_limit=60)
+    warm.solve(cache=cache)
+    assert cache.warm_starts == 2 # the first solve had nothing cached yet
+
+    greedy = aggregate_model(data, time_limit=90)
+    greedy.greedyStart()
+    greedy.solve(cache=cache)
+    assert cache.warm_starts == 2 and not greedy.start_given
+
+def test_solution_cache_evicts_within_max_bytes(tmp_path, data):
+    cache = SolutionCache(str(tmp_path), max_bytes=1)
+    aggregate_model(data).solve(cache=cache)
+    assert cache.stats()['entries'] == 0
+
+def test_job_manager_replays_a_cached_solve_inline(tmp_path, data):
+    cache = SolutionCache(str(tmp_path))
+    jobs = JobManager(max_workers=1, solutions=cache)
+    first = jobs.submit(aggregate_model(data))
+    jobs.get(first).future.result()
+    replayed = jobs.submit(aggregate_model(data))
+    job = jobs.get(replayed)
+    assert job.future is None and job.status() == 'done'
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
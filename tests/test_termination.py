@@ -0,0 +1,48 @@
+from gurobipy import GRB
+from benchmark import build_model
+from termination import TerminationPolicy
+
+def test_inactive_policy_never_stops():
+    policy = TerminationPolicy()
+    assert not policy.active()
+    assert policy.check(100.0, 0.0, 1000.0) is None
+
+def test_no_incumbent_never_stops():
+    policy = TerminationPolicy(target_gap=0.5, no_improvement=1)
+    assert policy.check(GRB.INFINITY, 0.0, 0.0) is None
+    assert policy.check(GRB.INFINITY, 0.0, 10.0) is None
+
+def test_gap_rules():
+    assert TerminationPolicy(target_gap=0.02).check(100.0, 97.0, 1.0) is None
+    assert TerminationPolicy(target_gap=0.02).check(100.0, 98.5, 1.0).startswith('target gap')
+    assert TerminationPolicy(abs_gap=5).check(100.0, 94.0, 1.0) is None
+    assert TerminationPolicy(abs_gap=5).check(100.0, 96.0, 1.0).startswith('absolute gap')
+
+def test_no_improvement_counts_from_the_last_better_incumbent():
+    policy = TerminationPolicy(no_improvement=5)
+    assert policy.check(100.0, 0.0, 0.0) is None
+    assert policy.check(90.0, 0.0, 4.0) is None
+    assert policy.check(90.0, 0.0, 8.0) is None
+    assert policy.check(90.0, 0.0, 9.0).startswith('no incumbent improvement')
+
+def test_bound_stagnation_and_restart():
+    policy = TerminationPolicy(bound_stagnation=3)
+    assert policy.check(100.0, 50.0, 0.0) is None
+    assert policy.check(100.0, 60.0, 2.0) is None
+    assert policy.check(100.0, 60.0, 5.0).startswith('best bound stagnant')
+    # a new optimize call (runtime back to 0) starts the clocks again
+    assert policy.check(100.0, 60.0, 1.0) is None
+
+def test_solve_stops_at_the_target_gap(data3):
+    m = build_model(data3, sparse=True)
+    m.setParams(60, target_gap=0.05)
+    m.solve()
+    assert m.stop_reason == 'target gap 5% reached'
+    assert m.optGap() <= 0.05
+
+def test_set_params_threads(data):
+    m = build_model(data, sparse=True)
+    m.setParams(10)
+    assert m.model.Params.Threads == 0 # Gurobi's default: every core
+    m.setParams(10, threads=2)
+    assert m.model.Params.Threads == 2 and m.model.Params.TimeLimit == 10
@@ -0,0 +1,45 @@
+import pytest
+from benchmark import build_model, make_dataset, same_model
+
+TIME_BUCKETS = (2, 3) # 2023, 2024, then 2025-2027, 2028-2030, 2031-2033 and 2034
+
+@pytest.fixture(scope='module')
+def data12():
+    return make_dataset(n_years=12, n_sizes=1)
+
+def test_life_counts_to_the_last_year_of_a_bucket(data12):
+    m = build_model(data12, sparse=True, time_buckets=TIME_BUCKETS)
+    assert m.years == [2023, 2024, 2025, 2028, 2031, 2034]
+    assert all(m.yrp[v] <= yr and m.lastYear(yr) < m.yrp[v] + 10 for yr, v in m.fleet_index)
+
+    # a 2023 vehicle's life ends in 2032, inside the 2031-2033 bucket: sold by the 2028-2030 one
+    v = next(v for v in m.buy_index if m.yrp[v] == 2023)
+    assert (2028, v) in m.sell and (2031, v) not in m.sell
+    assert m.model.getConstrByName(f'sell_curr_by_10th_year_{v}') is not None
+    # a 2025 vehicle's life runs to 2034, the end of the horizon: kept
+    v = next(v for v in m.buy_index if m.yrp[v] == 2025)
+    assert (2034, v) in m.fleet_index
+    assert m.model.getConstrByName(f'sell_curr_by_10th_year_{v}') is None
+
+def test_sale_priced_at_the_last_year_of_a_bucket(data12):
+    bucketed = build_model(data12, sparse=True, time_buckets=TIME_BUCKETS)
+    yearly = build_model(data12, sparse=True)
+    # a 2024 vehicle's life ends with the 2031-2033 bucket: its last sale there is the yearly model's in 2033,
+    # with no fleet year after it in either model
+    for v in bucketed.buy_index:
+        if bucketed.yrp[v] == 2024:
+            assert bucketed.lastYear(2031) == 2033
+            assert bucketed.sell[2031, v].Obj == pytest.approx(yearly.sell[2033, v].Obj)
+            assert bucketed.sell[2031, v].Obj != pytest.approx(yearly.sell[2031, v].Obj)
+
+def test_builders_agree_on_buckets(data12):
+    expr = build_model(data12, sparse=True, time_buckets=TIME_BUCKETS)
+    matrix = build_model(data12, sparse=True, time_buckets=TIME_BUCKETS, builder='matrix')
+    assert same_model(expr.model, matrix.model)
+
+def test_aggregate_start_of_a_fleet_state_model(data3):
+    m = build_model(data3, sparse=True, fleet_state=True, use_mode='aggregate')
+    bucketed = m.aggregateStart((1, 2), 30)
+    assert bucketed.time_buckets == (1, 2) and not bucketed.fleet_state
+    assert bucketed.use_mode == 'aggregate' and bucketed.sparse
+    assert m.start_given
@@ -0,0 +1,36 @@
+import pandas as pd
+from gurobipy import GRB
+from benchmark import build_model, first_years, make_dataset
+
+def test_plan_of_an_earlier_horizon_maps_onto_the_shifted_model():
+    # a plan for 2023-2025, the horizon shifted to 2024-2026 with the 2023 rows as start file
+    data = make_dataset(n_years=4, n_sizes=1)
+    base = build_model(first_years(data, 3), sparse=True, use_mode='aggregate')
+    base.setParams(30)
+    plan = pd.DataFrame(base.solve()[0])
+    first, second, third = base.years
+    shifted = build_model({**data, 'start': plan[(plan['Year'] == first) & plan['Type'].isin(['Buy', 'Sell'])]}, sparse=True)
+    assert list(shifted.years) == [second, third, third + 1]
+    assert shifted.warmStart(plan) > 0
+    shifted.model.update()
+
+    rows = plan[plan['Year'] == second]
+    buys = rows[rows['Type'] == 'Buy'].groupby('ID')['Num_Vehicles'].sum()
+    assert len(buys) > 0
+    for v, n in buys.items():
+        assert shifted.buy[v].Start == n
+    sells = rows[rows['Type'] == 'Sell'].groupby('ID')['Num_Vehicles'].sum()
+    for (yr, v), x in shifted.sell.items():
+        if yr == second:
+            assert x.Start == sells.get(v, 0)
+    uses = rows[rows['Type'] == 'Use']
+    assert len(uses) > 0
+    for r in uses.head(5).to_dict('records'):
+        key = (second, r['ID'], r['Fuel'], r['Distance_bucket'])
+        assert shifted.use[key].Start == r['Num_Vehicles']
+        assert shifted.total_distance[key].Start == r['Num_Vehicles'] * r['Distance_per_vehicle(km)']
+
+    # a vehicle of a year the plan doesn't have, and the sell-off of the plan's last year, are left open
+    v = next(v for v in shifted.buy_index if shifted.yrp[v] == third + 1)
+    assert shifted.buy[v].Start == GRB.UNDEFINED
+    assert all(x.Start == GRB.UNDEFINED for (yr, _), x in shifted.sell.items() if yr == third)
@@ -0,0 +1,12 @@
+from worker_pool import process_pool, worker
+
+def setup(value, threads):
+    return {'value': value, 'threads': threads}
+
+def read(key):
+    return worker[key]
+
+def test_workers_are_set_up_once_per_process():
+    with process_pool(2, setup, 'inputs', 1) as pool:
+        assert list(pool.map(read, ['value', 'threads'] * 2)) == ['inputs', 1] * 2
+    assert worker == {} # not in this process
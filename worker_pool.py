@@ -0,0 +1,14 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+# the state of this pool worker process, filled once by its initializer
+worker = {}
+
+def init_worker(setup, args):
+    worker.update(setup(*args))
+
+def process_pool(workers, setup, *args):
+    # a pool of `workers` processes, each with worker filled from setup(*args); setup must be a module-level
+    # function, to be pickled to the workers
+    ctx = multiprocessing.get_context('spawn') # no fork of a process holding a Gurobi environment
+    return ProcessPoolExecutor(workers, mp_context=ctx, initializer=init_worker, initargs=(setup, args))
@@ -0,0 +1,4 @@
+# Production entry point: gunicorn -c gunicorn.conf.py wsgi:server
+# Worker processes share solves and session inputs through the result store (FLEET_RESULT_STORE),
+# so any worker can serve the table, KPIs and charts of any completed solve.
+from proto import server